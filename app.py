@@ -1,15 +1,41 @@
 import streamlit as st
-import google.generativeai as genai
 import os
-import re
-import json
-from datetime import datetime
-from pathlib import Path
-
-# 저장 디렉토리 설정 (현재 파일 위치 기준)
-BASE_DIR = Path(__file__).parent.absolute()
-STORAGE_DIR = BASE_DIR / "saved_stories"
-STORAGE_DIR.mkdir(exist_ok=True)
+import shlex
+from datetime import date, datetime, timedelta
+from functools import partial
+
+# 생성 관련 모듈(generation, 모델 클라이언트, Gemini SDK)은 처음 생성할 때 불러옴
+# (저장된 콘티만 보는 세션의 첫 화면을 빠르게)
+from backends import FAST_MODEL_NAME, get_backend
+from export import EXPORT_LAYOUTS, export_zip_file, sheet_bytes, sheet_filename
+from metrics import RunMetrics, get_metrics_log, log_run, summarize
+from response_cache import get_response_cache, make_cache_key
+from storage import (
+    STORAGE_DIR,
+    count_stories,
+    get_story_writer,
+    list_stories,
+    list_stories_between,
+    refresh_catalog,
+    search_stories,
+)
+from prompts import CUT_PROMPT, SCENE_PROMPT, SYSTEM_PROMPT
+from story_html import render_cut_html, render_story_html
+from story_parser import compose_response_text, iter_story_events, parse_story_parts
+from svg_optimizer import optimize_parts
+from thumbnails import ensure_thumbnail, get_thumbnail
+
+# 저장된 콘티 목록 한 페이지에 보여줄 개수
+PAGE_SIZE = 20
+# 갤러리 한 줄에 놓는 썸네일 수 (좁은 화면에서는 Streamlit 이 세로로 쌓음)
+GALLERY_COLUMNS = 3
+# 내보내기 기간의 기본값 (오늘부터 며칠 전까지)
+EXPORT_DEFAULT_DAYS = 7
+# 앱에서 ZIP 으로 한 번에 내보내는 최대 편수 (Streamlit 은 다운로드 파일을 통째로 메모리에 들고 있음)
+# 더 많으면 export.py 로 파일에 바로 쓰게 안내
+EXPORT_APP_MAX_STORIES = 40
+# 진단 패널에서 p50/p95 를 계산할 최근 기록 수
+DIAGNOSTICS_WINDOW = 200
 
 # 1. 페이지 설정 (모바일 친화적)
 st.set_page_config(
@@ -30,358 +56,593 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# 3. 시스템 프롬프트 (SVG 생성 포함)
-SYSTEM_PROMPT = """
-당신은 프로페셔널 인스타툰 콘티 작가입니다.
-⚠️⚠️⚠️ 절대적으로 중요: 각 컷의 SVG 그림은 반드시 완전하고 상세한 캐릭터(두더지 또는 페럿)를 포함해야 합니다.
-배경색, 텍스트, 단순한 도형만으로는 절대 안 됩니다. 반드시 완전한 사람처럼 보이는 캐릭터를 제대로 그려야 합니다.
-간단하게 그리지 말고, 상세하고 완전하게 그려야 합니다.
-
-사용자의 입력을 바탕으로 4컷 만화를 위한 상세하고 완전한 콘티를 작성하세요.
-
-[콘티 작성 가이드 - 필수! 반드시 모든 항목을 상세히 작성하세요!]
-
-각 컷마다 다음 정보를 반드시 포함하되, 각 항목을 최소 2-3문장으로 상세히 설명하세요:
-
-1. **상황 설명**: 
-   - 장면이 어디서 일어나는지 (구체적인 장소: 공항 대합실, 집 거실, 카페 등)
-   - 시간대 (아침/점심/저녁, 계절 등)
-   - 전체적인 분위기와 기분 (긴장감, 여유로움, 당황스러움 등)
-   - 이전 컷과의 연결성
-
-2. **캐릭터 위치**: 
-   - 화면 내에서 정확한 위치 (왼쪽 상단, 중앙, 오른쪽 하단 등)
-   - 캐릭터 간의 거리와 관계
-   - 카메라 각도 (정면, 측면, 위에서 내려다봄 등)
-
-3. **캐릭터 표정**: 
-   - 구체적인 감정 상태 (예: "두더지는 눈이 크게 뜨이고 입이 벌어진 당황한 표정")
-   - 눈의 모양 (크게 뜬 눈, 찡그린 눈, 웃는 눈 등)
-   - 입의 모양 (벌어진 입, 찡그린 입, 웃는 입 등)
-   - 얼굴 전체의 분위기
-
-4. **캐릭터 포즈**: 
-   - 신체의 자세 (서있음, 앉음, 뛰는 중, 구부린 자세 등)
-   - 팔과 다리의 위치 (팔을 뻗음, 손을 머리에 대고 있음 등)
-   - 몸의 방향 (정면, 측면, 뒤돌아봄 등)
-   - 움직임이 있다면 그 방향과 속도감
-
-5. **배경 요소**: 
-   - 배경에 필요한 모든 소품 (테이블, 의자, 가방, 핸드폰, 표지판 등)
-   - 각 소품의 위치와 크기
-   - 배경의 색상과 분위기
-   - 배경이 스토리에 미치는 영향
-
-6. **구도**: 
-   - 샷의 종류 (클로즈업: 얼굴만, 미디엄샷: 상반신, 풀샷: 전신, 와이드샷: 배경 포함 등)
-   - 초점이 맞춰진 대상
-   - 배경의 흐림 정도 (초점 밖의 배경은 흐리게)
-
-7. **대사**: 
-   - 누가 말하는지 명확히 표시 (두더지/페럿/기타 등장인물)
-   - 대사의 톤과 감정 (큰 소리로, 작은 목소리로, 화가 나서 등)
-   - 말풍선의 위치와 크기
-
-8. **효과음/의성어**: 
-   - 필요한 경우 효과음 (탕!, 쾅!, 휙! 등)
-   - 효과음의 위치와 크기
-   - 시각적 효과 (번쩍임, 먼지, 바람 등)
-
-[SVG 그림 - 절대 필수 체크리스트!]
-⚠️⚠️⚠️ 경고: 이 체크리스트를 모두 만족하지 않으면 안 됩니다! ⚠️⚠️⚠️
-⚠️ 간단하게 그리지 말고, 완전하고 상세하게 그려야 합니다! ⚠️
-
-각 SVG 그림은 반드시 다음을 모두 포함해야 합니다 (하나라도 빠지면 안 됩니다):
-각 요소를 제대로 그리고, 상세하게 표현해야 합니다.
-
-✅ 체크리스트:
-□ 1. 흰색 배경: <rect width="400" height="400" fill="white"/>
-□ 2. 바닥: <rect x="0" y="300" width="400" height="100" fill="#ddd"/>
-□ 3. 벽 또는 배경: <rect x="0" y="0" width="400" height="300" fill="#f0f0f0"/>
-□ 4. 캐릭터 몸통: <ellipse cx="200" cy="220" rx="50" ry="70" fill="#999"/>
-□ 5. 캐릭터 머리: <ellipse cx="200" cy="120" rx="35" ry="40" fill="#aaa"/>
-□ 6. 코: <circle cx="200" cy="120" r="6" fill="black"/>
-□ 7. 왼쪽 눈: <circle cx="185" cy="110" r="5" fill="black"/>
-□ 8. 오른쪽 눈: <circle cx="215" cy="110" r="5" fill="black"/>
-□ 9. 입: <ellipse cx="200" cy="135" rx="8" ry="12" fill="black"/> 또는 <path>로 웃는 모양
-□ 10. 왼쪽 팔: <line x1="150" y1="200" x2="130" y2="180" stroke="#666" stroke-width="8" stroke-linecap="round"/>
-□ 11. 오른쪽 팔: <line x1="250" y1="200" x2="270" y2="180" stroke="#666" stroke-width="8" stroke-linecap="round"/>
-□ 12. 왼쪽 다리: <line x1="170" y1="290" x2="160" y2="350" stroke="#666" stroke-width="10" stroke-linecap="round"/>
-□ 13. 오른쪽 다리: <line x1="230" y1="290" x2="240" y2="350" stroke="#666" stroke-width="10" stroke-linecap="round"/>
-
-⚠️ 위 13개 항목을 모두 그려야 합니다! 하나라도 빠지면 안 됩니다!
-
-- **좌표계:** 반드시 viewBox="0 0 400 400" 기준. (0~400 사이 좌표만 사용)
-- **필수 요소:** 모든 SVG는 <rect width="400" height="400" fill="white"/> 로 시작해서 흰 배경을 깔아야 함.
-
-- **배경 (필수!):** 
-  * 바닥: <rect x="0" y="300" width="400" height="100" fill="#ddd"/> (또는 상황에 맞는 색상)
-  * 벽: <rect x="0" y="0" width="400" height="300" fill="#f0f0f0"/> (또는 상황에 맞는 색상)
-  * 소품: 상황에 맞는 테이블, 의자, 표지판 등을 반드시 그려야 함
-  * 배경이 없으면 절대 안 됩니다!
-
-- **캐릭터 디자인 - 두더지 (절대 필수! 모든 부위를 그려야 함!):**
-  ⚠️ 두더지는 반드시 다음 모든 부위를 그려야 합니다:
-  
-  * 몸통 (가장 먼저): <ellipse cx="200" cy="220" rx="50" ry="70" fill="#999"/>
-  * 머리 (몸통 위에): <ellipse cx="200" cy="120" rx="35" ry="40" fill="#aaa"/>
-  * 코 (머리 중앙): <circle cx="200" cy="120" r="6" fill="black"/>
-  * 눈 (머리 위쪽, 코 양옆): 
-    - 기본: <circle cx="185" cy="110" r="5" fill="black"/> 와 <circle cx="215" cy="110" r="5" fill="black"/>
-    - 당황: <circle cx="185" cy="110" r="8" fill="black"/> 와 <circle cx="215" cy="110" r="8" fill="black"/>
-    - 기쁨: <path d="M 180 110 Q 185 105 190 110" stroke="black" fill="none" stroke-width="2"/>
-  * 입 (머리 아래쪽, 코 아래):
-    - 당황: <ellipse cx="200" cy="135" rx="8" ry="12" fill="black"/>
-    - 기쁨: <path d="M 185 130 Q 200 140 215 130" stroke="black" fill="none" stroke-width="2"/>
-  * 왼쪽 팔 (필수!): <line x1="150" y1="200" x2="130" y2="180" stroke="#666" stroke-width="8" stroke-linecap="round"/>
-  * 오른쪽 팔 (필수!): <line x1="250" y1="200" x2="270" y2="180" stroke="#666" stroke-width="8" stroke-linecap="round"/>
-  * 왼쪽 다리 (필수!): <line x1="170" y1="290" x2="160" y2="350" stroke="#666" stroke-width="10" stroke-linecap="round"/>
-  * 오른쪽 다리 (필수!): <line x1="230" y1="290" x2="240" y2="350" stroke="#666" stroke-width="10" stroke-linecap="round"/>
-  
-  ⚠️ 팔과 다리를 그리지 않으면 안 됩니다! 팔 2개, 다리 2개 모두 필수입니다!
-
-- **캐릭터 디자인 - 페럿 (매우 중요!):**
-  * 얼굴: 역삼각형, 중심 (cx="200" cy="130")
-    <polygon points="200,80 160,150 240,150" fill="#fff" stroke="#333" stroke-width="2"/>
-  * 머리카락: 긴 타원형 또는 여러 선
-    <ellipse cx="200" cy="90" rx="45" ry="25" fill="#ffd700" opacity="0.8"/>
-  * 눈: 날카로운 형태, 다각형 또는 타원
-    <polygon points="185,120 190,115 195,120 190,125" fill="black"/>
-  * 입: 작은 선 또는 다각형
-
-- **표정 표현 (구체적 예시):**
-  - 기쁨: 눈을 반원(^)으로, 입을 웃는 모양(∩)으로
-  - 슬픔: 눈에 눈물 추가 (<circle cx="185" cy="115" r="2" fill="blue"/>), 입을 아래로(∩)
-  - 화남: 눈을 찡그린 모양(/\ /\), 입을 크게 벌림
-  - 당황: 눈을 크게 뜸(큰 원), 입을 벌림(타원형)
-
-- **포즈 표현 (구체적 예시):**
-  - 서있음: 다리를 똑바로, 팔을 몸통 옆에
-  - 앉음: 다리를 구부림, 몸통을 낮춤
-  - 뛰는 중: 다리를 앞뒤로, 팔을 뻗음, 몸을 앞으로 기울임
-  - 손 뻗음: 팔을 특정 방향으로 <line>으로 표현
-
-- **배경 요소 (구체적 예시):**
-  - 테이블: <rect x="50" y="300" width="300" height="20" fill="#8B4513"/>
-  - 의자: <rect x="100" y="280" width="60" height="80" fill="#654321"/>
-  - 핸드폰: <rect x="180" y="200" width="40" height="60" fill="#333" rx="3"/>
-  - 표지판: <rect x="300" y="50" width="80" height="100" fill="#fff" stroke="#000"/>
-  - 원근감: 멀리 있는 것은 작고, 가까운 것은 크게
-
-- **구도 표현:**
-  - 클로즈업: 캐릭터를 크게 (머리만 또는 상반신만, 크기 200x200 정도)
-  - 풀샷: 캐릭터 전체와 배경 포함 (전신, 크기 100x200 정도)
-  - 미디엄샷: 상반신과 일부 배경 (상반신, 크기 150x200 정도)
-
-[SVG 코드 작성 예시 - 반드시 이 형식을 정확히 따라하세요!]
-
-⚠️⚠️⚠️ 필수: 아래 예시 코드를 정확히 복사해서 사용하되, 표정과 포즈만 상황에 맞게 수정하세요! ⚠️⚠️⚠️
-간단하게 그리지 말고, 완전하고 상세하게 그려야 합니다!
-
-```svg
-<svg width="400" height="400" viewBox="0 0 400 400" xmlns="http://www.w3.org/2000/svg">
-  <!-- 1. 흰 배경 (필수) -->
-  <rect width="400" height="400" fill="white"/>
-  
-  <!-- 2. 바닥 (필수) -->
-  <rect x="0" y="300" width="400" height="100" fill="#ddd"/>
-  
-  <!-- 3. 벽/배경 (필수) -->
-  <rect x="0" y="0" width="400" height="300" fill="#e8f4f8"/>
-  
-  <!-- 4. 캐릭터 몸통 (필수) -->
-  <ellipse cx="200" cy="220" rx="50" ry="70" fill="#999"/>
-  
-  <!-- 5. 캐릭터 머리 (필수) -->
-  <ellipse cx="200" cy="120" rx="35" ry="40" fill="#aaa"/>
-  
-  <!-- 6. 코 (필수) -->
-  <circle cx="200" cy="120" r="6" fill="black"/>
-  
-  <!-- 7. 왼쪽 눈 (필수) - 표정에 따라 크기 변경 -->
-  <circle cx="185" cy="110" r="8" fill="black"/>
-  
-  <!-- 8. 오른쪽 눈 (필수) - 표정에 따라 크기 변경 -->
-  <circle cx="215" cy="110" r="8" fill="black"/>
-  
-  <!-- 9. 입 (필수) - 표정에 따라 모양 변경 -->
-  <ellipse cx="200" cy="135" rx="8" ry="12" fill="black"/>
-  
-  <!-- 10. 왼쪽 팔 (필수) - 포즈에 따라 위치 변경 -->
-  <line x1="150" y1="200" x2="130" y2="180" stroke="#666" stroke-width="8" stroke-linecap="round"/>
-  
-  <!-- 11. 오른쪽 팔 (필수) - 포즈에 따라 위치 변경 -->
-  <line x1="250" y1="200" x2="270" y2="180" stroke="#666" stroke-width="8" stroke-linecap="round"/>
-  
-  <!-- 12. 왼쪽 다리 (필수) -->
-  <line x1="170" y1="290" x2="160" y2="350" stroke="#666" stroke-width="10" stroke-linecap="round"/>
-  
-  <!-- 13. 오른쪽 다리 (필수) -->
-  <line x1="230" y1="290" x2="240" y2="350" stroke="#666" stroke-width="10" stroke-linecap="round"/>
-</svg>
-```
-
-⚠️⚠️⚠️ 위 13개 요소를 모두 제대로 그리고 상세하게 그려야 합니다! 하나라도 빠지면 안 됩니다! ⚠️⚠️⚠️
-간단하게 그리지 말고, 완전하고 상세하게 그려야 합니다!
-
-[출력 포맷]
-반드시 아래 형식을 지키세요.
-
-⚠️⚠️⚠️ 중요: SVG 그림을 그릴 때는 간단하게 그리지 말고, 완전하고 상세하게 그려야 합니다! ⚠️⚠️⚠️
-모든 캐릭터 부위를 제대로 그리고, 배경도 상세하게 표현해야 합니다!
-
-제목: [제목]
-||||
-## 1컷
-**상황:** [최소 2-3문장으로 상세히: 장소, 시간, 분위기, 이전 컷과의 연결]
-**캐릭터 위치:** [최소 2문장으로: 화면 내 위치, 캐릭터 간 거리, 카메라 각도]
-**표정:** [최소 2문장으로: 구체적인 감정, 눈과 입의 모양, 얼굴 분위기]
-**포즈:** [최소 2문장으로: 신체 자세, 팔과 다리 위치, 몸의 방향, 움직임]
-**배경:** [최소 2-3문장으로: 모든 소품과 위치, 색상과 분위기, 스토리와의 연관성]
-**구도:** [샷의 종류, 초점, 배경 처리]
-**대사:** [누가 말하는지, 대사 내용, 톤과 감정]
-**효과음:** [필요한 경우 위치와 크기]
-```svg
-<svg width="400" height="400" viewBox="0 0 400 400" xmlns="http://www.w3.org/2000/svg">
-  <rect width="400" height="400" fill="white"/>
-  <rect x="0" y="300" width="400" height="100" fill="#ddd"/>
-  <rect x="0" y="0" width="400" height="300" fill="#e8f4f8"/>
-  <ellipse cx="200" cy="220" rx="50" ry="70" fill="#999"/>
-  <ellipse cx="200" cy="120" rx="35" ry="40" fill="#aaa"/>
-  <circle cx="200" cy="120" r="6" fill="black"/>
-  <circle cx="185" cy="110" r="8" fill="black"/>
-  <circle cx="215" cy="110" r="8" fill="black"/>
-  <ellipse cx="200" cy="135" rx="8" ry="12" fill="black"/>
-  <line x1="150" y1="200" x2="130" y2="180" stroke="#666" stroke-width="8" stroke-linecap="round"/>
-  <line x1="250" y1="200" x2="270" y2="180" stroke="#666" stroke-width="8" stroke-linecap="round"/>
-  <line x1="170" y1="290" x2="160" y2="350" stroke="#666" stroke-width="10" stroke-linecap="round"/>
-  <line x1="230" y1="290" x2="240" y2="350" stroke="#666" stroke-width="10" stroke-linecap="round"/>
-</svg>
-```
-
-⚠️ 위 코드는 기본 예시입니다. 상황에 맞게 표정, 포즈, 배경을 상세하게 수정하되, 13개 요소는 반드시 모두 제대로 그리고 완전하게 포함해야 합니다!
-간단하게 그리지 말고, 완전하고 상세하게 그려야 합니다!
-||||
-## 2컷
-(위와 동일 형식으로, 각 항목을 최소 2-3문장으로 상세히 작성)
-...
-"""
-
-def save_story(title, episode, response_text, parts_data):
-    """콘티를 JSON 파일로 저장"""
-    # 저장 디렉토리 확인 및 생성
-    try:
-        STORAGE_DIR.mkdir(parents=True, exist_ok=True)
-    except Exception as e:
-        raise Exception(f"저장 디렉토리 생성 실패: {e}")
+
+def _iter_response_text(response):
+    """스트리밍 응답에서 텍스트 조각만 꺼냄 (텍스트가 없는 조각은 건너뜀)"""
+    for chunk in response:
+        try:
+            text = chunk.text
+        except ValueError:
+            continue
+        if text:
+            yield text
+
+def display_title(title):
+    """콘티 제목 표시"""
+    st.header(title)
+    st.markdown("---")
+
+def display_cut(part, svg_html=None):
+    """컷 하나를 화면에 표시 (svg_html 이 없으면 여기서 조립)"""
+    st.subheader(f"{part['cut_number']}컷")
+    st.markdown(part['text_content'])
     
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    # 파일명에 사용할 수 없는 문자 제거
-    safe_title = re.sub(r'[<>:"/\\|?*]', '', title[:20])
-    safe_title = safe_title.strip()
-    if not safe_title:
-        safe_title = "제목없음"
-    filename = f"{timestamp}_{safe_title}.json"
-    filepath = STORAGE_DIR / filename
+    for html in render_cut_html(part) if svg_html is None else svg_html:
+        st.markdown(html, unsafe_allow_html=True)
     
-    story_data = {
-        "title": title,
-        "episode": episode,
-        "created_at": datetime.now().isoformat(),
-        "response_text": response_text,
-        "parts": parts_data
-    }
+    st.markdown("---")
+
+def display_story(title, parts_data):
+    """콘티를 화면에 표시"""
+    display_title(title)
+    
+    # 여러 컷에 반복되는 캐릭터 부품은 한 번만 보내고 <use>로 참조
+    sprite, cut_html = render_story_html(parts_data)
+    if sprite:
+        st.markdown(sprite, unsafe_allow_html=True)
+    
+    for part, svg_html in zip(parts_data, cut_html):
+        display_cut(part, svg_html)
+
+def stream_story(response, metrics=None):
+    """스트리밍 응답을 받으면서 제목과 컷을 도착하는 대로 화면에 그림
+
+    다 받은 뒤 전체 응답 텍스트를 반환한다. metrics 가 있으면 첫 조각
+    도착 시각(TTFT)을 기록한다.
+    """
+    title_slot = st.empty()
+    cuts_area = st.container()
+    cut_slots = {}
+    received = []
+    
+    def chunks():
+        for text in _iter_response_text(response):
+            if metrics is not None:
+                metrics.mark_first_token()
+            received.append(text)
+            yield text
+    
+    for kind, payload in iter_story_events(chunks()):
+        if kind == "title":
+            with title_slot.container():
+                display_title(payload)
+        else:
+            slot = cut_slots.get(payload['cut_number'])
+            if slot is None:
+                slot = cut_slots[payload['cut_number']] = cuts_area.empty()
+            with slot.container():
+                display_cut(payload)
+    
+    return "".join(received)
+
+def render_parallel_story(outline_model, cut_model, episode, metrics=None):
+    """컷별 병렬 생성을 하면서 제목과 컷을 완성되는 대로 화면에 그림
+
+    다 받은 뒤 합쳐진 응답 텍스트를 반환한다.
+    """
+    title_slot = st.empty()
+    cuts_area = st.container()
+    cut_slots = []
+    
+    def on_outline(title, outlines):
+        if metrics is not None:
+            metrics.mark_first_token()
+        with title_slot.container():
+            display_title(title)
+        for i, outline in enumerate(outlines, 1):
+            slot = cuts_area.empty()
+            slot.info(f"✏️ {i}컷 그리는 중... {outline}")
+            cut_slots.append(slot)
+    
+    def on_cut(part):
+        with cut_slots[part['cut_number'] - 1].container():
+            display_cut(part)
+    
+    from generation import generate_story_parallel
+
+    return generate_story_parallel(
+        outline_model,
+        cut_model,
+        episode,
+        on_outline=on_outline,
+        on_cut=on_cut,
+        on_response=metrics.record_usage if metrics is not None else None,
+    )
+
+def generate_story(api_key, episode, parallel_mode, system_prompt, stream_mode, regenerate, tier="quality"):
+    """콘티를 생성해서 session_state['last_story'] 에 저장
+
+    스트리밍/병렬 모드에서 생성 중에 그린 화면은 임시이고, 끝나면 지운 뒤
+    show_last_story() 가 세션 상태를 기준으로 다시 그린다.
+    모델 호출은 마감 시간/재시도/헤징이 붙은 클라이언트(model_client)로 한다.
+    """
+    from generation import (
+        MODEL_TIERS,
+        PARALLEL_PROMPT_KEY,
+        create_client,
+        create_parallel_clients,
+        repair_story_parts,
+    )
+
+    response_cache = get_response_cache()
+    live_area = st.empty()
+    if parallel_mode:
+        mode = "parallel"
+    else:
+        mode = "scene" if system_prompt == SCENE_PROMPT else "single"
+    metrics = RunMetrics("generate", mode=mode, stream=bool(stream_mode and not parallel_mode), tier=tier)
+    model_name = MODEL_TIERS[tier][0]
+    clients = []
     
     try:
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(story_data, f, ensure_ascii=False, indent=2)
+        # 같은 에피소드 + 같은 모델/프롬프트면 캐시된 응답 사용 (API 호출 없음)
+        with metrics.stage("cache"):
+            if parallel_mode:
+                cache_key = make_cache_key(episode, model_name, PARALLEL_PROMPT_KEY)
+            else:
+                cache_key = make_cache_key(episode, model_name, system_prompt)
+            response_text = None if regenerate else response_cache.get(cache_key)
+        from_cache = response_text is not None
         
-        # 파일이 실제로 저장되었는지 확인
-        if not filepath.exists():
-            raise Exception(f"파일 저장 후 확인 실패: {filepath}")
+        with st.spinner("🐭 두더지가 그림 그리는 중..."), live_area.container():
+            # 스트리밍/병렬 모드에서는 생성 중 화면 그리기 시간도 gemini 단계에 포함됨
+            with metrics.stage("gemini"):
+                if from_cache:
+                    pass  # 캐시된 응답은 아래에서 파싱만 함
+                elif parallel_mode:
+                    # 줄거리 → 컷 4개 동시 생성, 완성되는 컷부터 그림
+                    outline_model, cut_model = create_parallel_clients(api_key, tier)
+                    clients += [outline_model, cut_model]
+                    response_text = render_parallel_story(outline_model, cut_model, episode, metrics)
+                else:
+                    model = create_client(api_key, system_prompt, tier)
+                    clients.append(model)
+                    
+                    if stream_mode:
+                        # 컷이 완성되는 대로 바로 그림
+                        response = model.generate_content(episode, stream=True)
+                        response_text = stream_story(response, metrics)
+                    else:
+                        response = model.generate_content(episode)
+                        metrics.mark_first_token()
+                        response_text = response.text
+                    metrics.record_usage(response)
+                    metrics.set(model=response.model_name)
+            
+            # 응답 파싱 + SVG 검사/수리
+            with metrics.stage("parse"):
+                title, parts_data = parse_story_parts(response_text)
+            with metrics.stage("repair"):
+                parts_data, regenerated, failed = repair_story_parts(episode, title, parts_data)
         
-        # 파일 크기 확인 (빈 파일이 아닌지)
-        if filepath.stat().st_size == 0:
-            raise Exception(f"저장된 파일이 비어있음: {filepath}")
+        if failed and not from_cache:
+            # 로컬에서 못 고친 컷만 다시 그림 (통과한 컷은 그대로)
+            # 캐시된 응답은 API 를 부르지 않고 로컬 수리만 함 (다시 그리려면 '새로 뽑기')
+            with st.spinner(f"🔧 {', '.join(map(str, failed))}컷 그림을 다시 그리는 중..."), metrics.stage("regenerate"):
+                cut_model = create_client(api_key, CUT_PROMPT, tier)
+                clients.append(cut_model)
+                parts_data, regenerated, failed = repair_story_parts(
+                    episode, title, parts_data, cut_model, on_response=metrics.record_usage
+                )
+            if regenerated:
+                response_text = compose_response_text(title, parts_data)
         
-        return filepath
+        # SVG 최적화 (표시/저장 모두 최적화된 SVG 사용)
+        with metrics.stage("optimize"):
+            parts_data = optimize_parts(parts_data)
+        
+        # 컷이 하나라도 나온 응답만 캐시에 저장 (다시 그린 컷이 있으면 고친 응답으로)
+        if not from_cache and parts_data:
+            response_cache.put(cache_key, response_text, model_name)
+    
     except Exception as e:
-        raise Exception(f"파일 저장 실패: {e}, 경로: {filepath}")
-
-def load_saved_stories():
-    """저장된 콘티 목록 불러오기"""
-    stories = []
-    if STORAGE_DIR.exists():
-        for filepath in sorted(STORAGE_DIR.glob("*.json"), reverse=True):
+        live_area.empty()
+        metrics.set(error=str(e)[:200], **_client_stats(clients))
+        log_run(metrics)
+        st.error(f"에러 발생: {e}")
+        return
+    
+    live_area.empty()
+    metrics.set(
+        **_client_stats(clients),
+        from_cache=from_cache,
+        cuts=len(parts_data),
+        regenerated=len(regenerated),
+        response_chars=len(response_text or ""),
+        svg_chars=sum(len(part.get('svg_code') or "") for part in parts_data),
+    )
+    # 세션 상태에 저장 (화면 표시와 저장 버튼에서 사용)
+    st.session_state['last_story'] = {
+        'title': title,
+        'episode': episode,
+        'response_text': response_text,
+        'parts': parts_data,
+        'from_cache': from_cache,
+        'regenerated': regenerated,
+        'failed': failed,
+        'metrics': log_run(metrics),
+    }
+    st.session_state['save_success'] = False
+
+def _client_stats(clients):
+    """이번 생성에서 쓴 클라이언트들의 재시도/헤징/대체/시간 초과 횟수 합계"""
+    totals = {}
+    for client in clients:
+        for name, count in client.stats.items():
+            if name != "calls" and count:
+                totals[name] = totals.get(name, 0) + count
+    return totals
+
+def save_last_story(story):
+    """마지막으로 생성한 콘티를 저장 큐에 넣고 결과를 story 에 기록
+
+    파일 기록, 카탈로그 커밋, 썸네일은 백그라운드에서 하므로 바로 돌아온다.
+    기록이 실패하면 다음에 화면을 그릴 때 오류를 보여주고 다시 저장할 수 있게 한다.
+    저장 버튼의 on_click 콜백이라 화면에 직접 쓰지 않고, 큐에 넣지 못한 오류는
+    story['save_error'] 에 남겨서 show_last_story() 가 보여준다.
+    """
+    metrics = RunMetrics("save")
+    
+    def on_saved(filepath, size):
+        # 갤러리 썸네일을 미리 만들어 둠 (실패해도 갤러리에서 처음 볼 때 다시 만듦)
+        with metrics.stage("thumbnail"):
             try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    data["filename"] = filepath.name
-                    stories.append(data)
-            except:
-                continue
-    return stories
-
-def parse_story_parts(response_text):
-    """응답 텍스트를 파싱하여 구조화된 데이터로 변환"""
-    parts = response_text.split("|||")
-    title_raw = parts[0].strip() if len(parts) > 0 else "제목 없음"
-    # "제목:" 부분 제거
-    if title_raw.startswith("제목:"):
-        title = title_raw.replace("제목:", "").strip()
-    else:
-        title = title_raw
-    if not title:
-        title = "제목 없음"
+                ensure_thumbnail(story['parts'])
+            except (OSError, ValueError):
+                pass
+        metrics.set(file_bytes=size)
+        log_run(metrics)
     
-    parsed_parts = []
-    for i, part in enumerate(parts[1:], 1):
-        # SVG 추출
-        svg_match = None
-        svg_code = None
-        
-        pattern1 = re.search(r'```svg\s*(<svg[\s\S]*?<\/svg>)\s*```', part, re.IGNORECASE | re.DOTALL)
-        if pattern1:
-            svg_code = pattern1.group(1).strip()
-            svg_match = pattern1
-        else:
-            pattern2 = re.search(r'```xml\s*(<svg[\s\S]*?<\/svg>)\s*```', part, re.IGNORECASE | re.DOTALL)
-            if pattern2:
-                svg_code = pattern2.group(1).strip()
-                svg_match = pattern2
-            else:
-                pattern3 = re.search(r'(<svg[\s\S]*?<\/svg>)', part, re.IGNORECASE | re.DOTALL)
-                if pattern3:
-                    svg_code = pattern3.group(1).strip()
-                    svg_match = pattern3
+    try:
+        with metrics.stage("queue"):
+            filepath, future = get_story_writer().save(
+                story['title'], 
+                story['episode'], 
+                story['response_text'], 
+                story['parts'],
+                on_saved=on_saved,
+            )
+    except Exception as e:
+        story['save_error'] = e
+        return False
+    
+    story['saved_filename'] = filepath.name
+    story['save_future'] = future
+    
+    # 저장 성공 표시를 위해 세션 상태에 저장 완료 플래그 설정
+    st.session_state['save_success'] = True
+    st.session_state['saved_filename'] = filepath.name
+    st.session_state['show_balloons'] = True
+    return True
+
+def _check_saved(story):
+    """백그라운드 기록 결과 확인, 실패했으면 오류를 보여주고 다시 저장할 수 있게 함"""
+    future = story.get('save_future')
+    if future is None or not future.done():
+        return
+    error = future.exception()
+    if error is None:
+        story['saved_size'] = future.result()
+        return
+    st.error(f"❌ 저장 중 오류 발생: {error}")
+    st.write(f"📂 저장 디렉토리: {STORAGE_DIR.absolute()}")
+    story.pop('saved_filename', None)
+    story.pop('save_future', None)
+
+def show_diagnostics(story):
+    """이번 생성의 단계별 시간과 최근 기록의 p50/p95 를 보여주는 진단 패널"""
+    with st.expander("🩺 진단 정보 (느린 요청 확인용)"):
+        record = story.get('metrics') or {}
+        st.markdown("**이번 생성**")
+        stages = record.get('stages') or {}
+        if stages:
+            st.table([{"단계": name, "시간(초)": round(seconds, 3)} for name, seconds in stages.items()])
+        details = [f"전체 {record.get('total', 0):.2f}초"]
+        if record.get('ttft') is not None:
+            details.append(f"첫 응답(TTFT) {record['ttft']:.2f}초")
+        tokens = record.get('tokens') or {}
+        if tokens:
+            details.append(
+                f"토큰 입력 {tokens.get('prompt', 0)} (캐시 {tokens.get('cached', 0)}) / "
+                f"출력 {tokens.get('output', 0)} / 합계 {tokens.get('total', 0)}"
+            )
+        details.append(f"응답 {record.get('response_chars', 0)}자, SVG {record.get('svg_chars', 0)}자")
+        if record.get('model'):
+            details.append(f"모델 {record['model']}")
+        retries = [
+            f"{label} {record[key]}회"
+            for key, label in (("retries", "재시도"), ("hedges", "헤징"), ("fallbacks", "빠른 모델 대체"), ("timeouts", "시간 초과"))
+            if record.get(key)
+        ]
+        if retries:
+            details.append(", ".join(retries))
+        st.caption(" · ".join(details))
         
-        text_content = part.replace(svg_match.group(0), "").strip() if svg_match else part.strip()
+        recent = get_metrics_log().recent(DIAGNOSTICS_WINDOW)
+        if recent:
+            st.markdown(f"**최근 {len(recent)}건 단계별 p50/p95**")
+            st.table(summarize(recent))
         
-        parsed_parts.append({
-            "cut_number": i,
-            "text_content": text_content,
-            "svg_code": svg_code
-        })
+        st.markdown("**원본 응답**")
+        st.code(story['response_text'])
+
+@st.fragment
+def show_last_story():
+    """세션 상태의 마지막 콘티를 표시하고 저장 버튼 제공
+
+    fragment 라서 저장 버튼을 눌러도 페이지 전체가 아니라 이 부분만 다시 실행된다.
+    """
+    story = st.session_state.get('last_story')
+    if not story:
+        return
     
-    return title, parsed_parts
-
-def display_story(title, parts_data):
-    """콘티를 화면에 표시"""
-    st.header(title)
+    if story.get('from_cache'):
+        st.info("♻️ 같은 에피소드로 뽑았던 결과를 불러왔어요. 새로 뽑으려면 '새로 뽑기'를 체크하세요.")
+    
+    # 진단: 단계별 시간, 토큰, 원본 응답
+    show_diagnostics(story)
+    
+    st.success("생성 완료! 🎉")
+    if story.get('regenerated'):
+        st.info(f"🔧 그림이 불완전했던 {', '.join(map(str, story['regenerated']))}컷만 다시 그렸어요.")
+    for cut_number, problems in (story.get('failed') or {}).items():
+        st.warning(f"⚠️ {cut_number}컷 그림에 문제가 남아 있어요: {', '.join(problems)}")
+    render_metrics = RunMetrics("render")
+    with render_metrics.stage("render"):
+        display_story(story['title'], story['parts'])
+    # 같은 콘티를 다시 그릴 때마다 쌓이지 않도록 처음 한 번만 기록
+    if not story.get('render_logged'):
+        story['render_logged'] = True
+        log_run(render_metrics)
+    
+    # 저장 버튼 (항상 표시)
     st.markdown("---")
+    st.markdown("### 💾 콘티 저장하기")
+    
+    # 저장은 버튼 콜백에서 (이 fragment 만 다시 실행되기 전에 끝나므로 같은 실행에서 완료 표시,
+    # 저장된 콘티 탭은 다음 실행 때 저장 대기 중인 콘티까지 보여줌)
+    save_error = story.pop('save_error', None)
+    if save_error is not None:
+        st.error(f"❌ 저장 중 오류 발생: {save_error}")
+        st.exception(save_error)  # 상세한 에러 정보 표시
+        st.write(f"📂 저장 디렉토리: {STORAGE_DIR.absolute()}")
+        st.write(f"📂 디렉토리 존재 여부: {STORAGE_DIR.exists()}")
+    _check_saved(story)
+    saved_filename = story.get('saved_filename')
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.button(
+            "💾 저장하기",
+            use_container_width=True,
+            key="save_story",
+            disabled=bool(saved_filename),
+            on_click=save_last_story,
+            args=(story,),
+        )
+    
+    if saved_filename:
+        if story.get('saved_size') is not None:
+            st.success(f"✅ 저장 완료! 📁 {saved_filename} ({story['saved_size']} bytes)")
+        else:
+            st.success(f"✅ 저장 완료! 📁 {saved_filename}")
+        st.info("💡 '저장된 콘티 보기' 탭에서 확인할 수 있습니다.")
+        if st.session_state.pop('show_balloons', False):
+            st.balloons()
+
+def show_generate_form(api_key):
+    """새 콘티 만들기 탭의 입력 화면 + 마지막 결과"""
+    st.markdown("### 오늘의 에피소드는?")
+    episode = st.text_area(
+        label="에피소드 입력",
+        label_visibility="collapsed",
+        placeholder="예: 쌀국수 먹다 옷에 튀어서 페럿한테 혼난 이야기",
+        height=150
+    )
+    generation_mode = st.radio(
+        "생성 방식",
+        ["한 번에 생성", "컷별 병렬 생성 (더 빠름)", "간단 장면 (가장 빠름)"],
+        horizontal=True,
+        help=(
+            "컷별 병렬 생성은 줄거리를 먼저 짧게 뽑은 뒤 네 컷을 동시에 그립니다. "
+            "간단 장면은 모델이 짧은 장면 설명만 쓰고 그림은 앱에서 정해진 캐릭터 디자인으로 그립니다."
+        )
+    )
+    parallel_mode = generation_mode == "컷별 병렬 생성 (더 빠름)"
+    # 간단 장면 모드는 SVG 대신 장면 설명(JSON)을 받아서 scene_renderer 로 그림
+    system_prompt = SCENE_PROMPT if generation_mode == "간단 장면 (가장 빠름)" else SYSTEM_PROMPT
+    stream_mode = st.toggle("⚡ 완성된 컷부터 바로 보기", value=True, disabled=parallel_mode)
+    fast_model = st.toggle(
+        f"🚀 빠른 모델 ({FAST_MODEL_NAME})",
+        value=False,
+        help="그림 품질은 조금 떨어지지만 훨씬 빨리 끝납니다. 꺼져 있어도 응답이 늦어지면 자동으로 빠른 모델로 바꿉니다."
+    )
+    tier = "fast" if fast_model else "quality"
+    regenerate = st.checkbox("🔄 저장된 응답 무시하고 새로 뽑기", value=False)
+    
+    response_cache = get_response_cache()
+    st.caption(f"♻️ 응답 캐시: 적중 {response_cache.hits}회 / 미스 {response_cache.misses}회")
+    
+    # 실행 버튼 (생성 결과는 세션 상태에 한 번만 저장하고, 화면은 상태로 그림)
+    if st.button("콘티 & 그림 뽑기 🎨", use_container_width=True):
+        if not episode.strip():
+            st.warning("내용을 입력해줘! ✍️")
+        else:
+            generate_story(api_key, episode, parallel_mode, system_prompt, stream_mode, regenerate, tier)
+    
+    # 마지막 결과 표시 + 저장 (저장 버튼은 이 부분만 다시 실행됨)
+    show_last_story()
+
+def _select_gallery_story(filename):
+    st.session_state['gallery_selected'] = filename
+
+def show_gallery(page_stories):
+    """현재 페이지 콘티들의 썸네일 격자, 보기로 고른 콘티의 핸들 반환 (없으면 None)
+
+    이 페이지의 썸네일만 읽고, 캐시에 없는 것만 그 자리에서 만든다.
+    """
+    selected = st.session_state.get('gallery_selected')
+    gallery_metrics = RunMetrics("gallery", stories=len(page_stories))
+    with gallery_metrics.stage("thumbnails"):
+        for row_start in range(0, len(page_stories), GALLERY_COLUMNS):
+            columns = st.columns(GALLERY_COLUMNS)
+            for column, handle in zip(columns, page_stories[row_start:row_start + GALLERY_COLUMNS]):
+                with column:
+                    thumbnail = get_thumbnail(handle)
+                    if thumbnail is None:
+                        st.caption("⚠️ 읽을 수 없음")
+                    else:
+                        st.image(thumbnail, width="stretch")
+                    st.caption(f"{handle.title} ({handle.created_at[:10]})")
+                    st.button(
+                        "✅ 보는 중" if handle.filename == selected else "👀 보기",
+                        key=f"open_{handle.filename}",
+                        on_click=_select_gallery_story,
+                        args=(handle.filename,),
+                        use_container_width=True,
+                    )
+    # 페이지가 바뀔 때만 기록 (보기 버튼 등으로 다시 실행될 때는 기록 안 함)
+    page_key = [handle.filename for handle in page_stories]
+    if st.session_state.get('gallery_logged') != page_key:
+        st.session_state['gallery_logged'] = page_key
+        log_run(gallery_metrics)
+    return next((handle for handle in page_stories if handle.filename == selected), None)
+
+def show_saved_story(selected_handle, browse_metrics):
+    """저장된 콘티 한 편 (삭제 버튼 + 본문)"""
+    # 선택된 콘티만 본문을 읽음 (프로세스 공유 LRU 캐시)
+    with browse_metrics.stage("load"):
+        selected_story = selected_handle.load()
+    
+    # 삭제 버튼
+    col1, col2 = st.columns([3, 1])
+    with col2:
+        if st.button("🗑️ 삭제", key=f"delete_{selected_handle.filename}"):
+            # 목록에서는 바로 빠지고 파일 삭제는 백그라운드에서
+            get_story_writer().delete(selected_handle.filename)
+            st.success("삭제 완료!")
+            st.rerun()
     
-    for part in parts_data:
-        st.subheader(f"{part['cut_number']}컷")
-        st.markdown(part['text_content'])
+    if selected_story is None:
+        st.warning("⚠️ 콘티 파일을 읽을 수 없습니다. 목록을 새로고침해주세요.")
+    else:
+        # 콘티 표시
+        st.markdown("---")
+        st.markdown(f"**원본 에피소드:** {selected_story['episode']}")
+        st.markdown(f"**생성일시:** {selected_story['created_at']}")
+        st.markdown("---")
         
-        if part['svg_code']:
-            st.markdown(f"""
-                <div style="width: 100%; max-width: 400px; height: 400px; margin: 10px auto; border: 2px solid #eee; border-radius: 10px; overflow: hidden; background-color: white; display: flex; align-items: center; justify-content: center;">
-                    {part['svg_code']}
-                </div>
-            """, unsafe_allow_html=True)
+        with browse_metrics.stage("render"):
+            display_story(selected_story['title'], selected_story['parts'])
         
-        st.markdown("---")
+        # 다른 위젯 때문에 다시 실행될 때마다 쌓이지 않도록 선택이 바뀔 때만 기록
+        if st.session_state.get('browse_logged') != selected_handle.filename:
+            st.session_state['browse_logged'] = selected_handle.filename
+            log_run(browse_metrics)
+
+def _export_sheet(handle, layout):
+    """다운로드 버튼을 누를 때 실행: 콘티 한 편의 이미지"""
+    export_metrics = RunMetrics("export", stories=1, layout=layout)
+    with export_metrics.stage("render"):
+        story = handle.load()
+        if story is None:
+            raise Exception(f"콘티를 읽을 수 없습니다: {handle.filename}")
+        data = sheet_bytes(story, layout)
+    log_run(export_metrics)
+    return data
+
+def _export_zip(handles, layout):
+    """다운로드 버튼을 누를 때 실행: 여러 편을 묶은 ZIP
+
+    ZIP 은 한 편씩 디스크 임시 파일에 쓰고, 앱에서 읽지 않고 그 파일을 그대로
+    넘긴다. Streamlit 이 한 번에 읽어 간 뒤 파일이 닫히면 지워진다.
+    다만 Streamlit 은 다운로드 파일을 메모리에 들고 있으므로 show_export() 는
+    EXPORT_APP_MAX_STORIES 편까지만 여기로 보낸다.
+    """
+    export_metrics = RunMetrics("export", stories=len(handles), layout=layout)
+    with export_metrics.stage("zip"):
+        fileobj = export_zip_file(handles, layout)
+    log_run(export_metrics)
+    # 버퍼 없는 원본 파일 (FileIO) 로 넘겨야 Streamlit 이 크기만큼 한 번에 읽음
+    return fileobj.detach()
+
+def show_export(selected_handle, page_stories, query):
+    """인스타그램용 내보내기 (고른 콘티 / 기간 / 검색 결과)
+
+    이미지는 다운로드 버튼을 누를 때 그린다 (화면을 다시 그릴 때는 그리지 않음).
+    """
+    with st.expander("📤 인스타그램용 내보내기"):
+        targets = ["고른 콘티", "기간"] + (["검색 결과"] if query.strip() else [])
+        target = st.radio("내보낼 콘티", targets, horizontal=True, key="export_target")
+        layout = st.radio(
+            "배치",
+            list(EXPORT_LAYOUTS),
+            format_func=EXPORT_LAYOUTS.get,
+            horizontal=True,
+            key="export_layout",
+        )
+        
+        if target == "고른 콘티":
+            if selected_handle is None:
+                st.caption("먼저 위에서 콘티를 골라 주세요.")
+                return
+            handles = [selected_handle]
+        elif target == "기간":
+            today = date.today()
+            period = st.date_input(
+                "기간",
+                (today - timedelta(days=EXPORT_DEFAULT_DAYS), today),
+                max_value=today,
+                key="export_period",
+            )
+            if len(period) != 2:
+                st.caption("끝 날짜도 골라 주세요.")
+                return
+            handles = list_stories_between(*period)
+            command = f"python export.py --output stories.zip --since {period[0]} --until {period[1]}"
+        else:
+            handles = page_stories
+            command = f"python export.py --output stories.zip --query {shlex.quote(query.strip())}"
+        
+        if not handles:
+            st.caption("내보낼 콘티가 없습니다.")
+            return
+        if len(handles) > EXPORT_APP_MAX_STORIES:
+            st.warning(
+                f"앱에서는 한 번에 {EXPORT_APP_MAX_STORIES}편까지 내보낼 수 있어요 ({len(handles)}편). "
+                "기간을 줄이거나, 서버에서 아래 명령으로 ZIP 파일을 바로 만들어 주세요."
+            )
+            st.code(command, language="bash")
+            return
+        if len(handles) == 1:
+            st.download_button(
+                "🖼️ 이미지 받기 (PNG)",
+                data=partial(_export_sheet, handles[0], layout),
+                file_name=sheet_filename(handles[0]),
+                mime="image/png",
+                on_click="ignore",
+                use_container_width=True,
+                key="export_download",
+            )
+        else:
+            st.download_button(
+                f"📦 {len(handles)}편 ZIP 받기",
+                data=partial(_export_zip, handles, layout),
+                file_name=f"콘티_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
+                mime="application/zip",
+                on_click="ignore",
+                use_container_width=True,
+                key="export_download",
+            )
 
 def main():
     # 탭 생성
@@ -398,102 +659,20 @@ def main():
         except FileNotFoundError:
             api_key = os.environ.get("GEMINI_API_KEY")
         
-        if not api_key:
-            st.error("🚨 API 키가 설정되지 않았습니다.")
-            st.stop()
-        
-        # 입력창
-        st.markdown("### 오늘의 에피소드는?")
-        episode = st.text_area(
-            label="에피소드 입력",
-            label_visibility="collapsed",
-            placeholder="예: 쌀국수 먹다 옷에 튀어서 페럿한테 혼난 이야기",
-            height=150
-        )
-        
-        # 실행 버튼
-        if st.button("콘티 & 그림 뽑기 🎨", use_container_width=True):
-            if not episode.strip():
-                st.warning("내용을 입력해줘! ✍️")
-                return
-            
-            try:
-                genai.configure(api_key=api_key)
-                model = genai.GenerativeModel(
-                    model_name="gemini-2.5-pro",  # 더 강력한 모델 사용
-                    system_instruction=SYSTEM_PROMPT
-                )
-                
-                with st.spinner("🐭 두더지가 그림 그리는 중..."):
-                    response = model.generate_content(episode)
-                    
-                    # 디버깅: 원본 데이터 확인
-                    with st.expander("디버깅용 원본 데이터 (클릭해서 확인)"):
-                        st.code(response.text)
-                    
-                    # 응답 파싱
-                    title, parts_data = parse_story_parts(response.text)
-                    
-                    # 세션 상태에 저장 (저장 버튼에서 사용)
-                    st.session_state['last_story'] = {
-                        'title': title,
-                        'episode': episode,
-                        'response_text': response.text,
-                        'parts': parts_data
-                    }
-                    
-                    # 콘티 표시
-                    st.success("생성 완료! 🎉")
-                    display_story(title, parts_data)
-                    
-                    # 저장 버튼 (항상 표시)
-                    st.markdown("---")
-                    st.markdown("### 💾 콘티 저장하기")
-                    
-                    col1, col2 = st.columns([3, 1])
-                    with col1:
-                        if st.button("💾 저장하기", use_container_width=True, key="save_story"):
-                            if 'last_story' in st.session_state:
-                                story = st.session_state['last_story']
-                                try:
-                                    # 저장 디렉토리 확인
-                                    st.write(f"📂 저장 위치: {STORAGE_DIR.absolute()}")
-                                    
-                                    filepath = save_story(
-                                        story['title'], 
-                                        story['episode'], 
-                                        story['response_text'], 
-                                        story['parts']
-                                    )
-                                    
-                                    # 저장 후 즉시 확인
-                                    if filepath.exists():
-                                        file_size = filepath.stat().st_size
-                                        st.success(f"✅ 저장 완료! 📁 {filepath.name} ({file_size} bytes)")
-                                        st.info("💡 '저장된 콘티 보기' 탭에서 확인할 수 있습니다.")
-                                        
-                                        # 저장 성공 표시를 위해 세션 상태에 저장 완료 플래그 설정
-                                        st.session_state['save_success'] = True
-                                        st.session_state['saved_filename'] = filepath.name
-                                        
-                                        # 자동으로 탭2로 이동하도록 안내
-                                        st.balloons()
-                                    else:
-                                        st.error(f"❌ 파일이 저장되지 않았습니다! 경로: {filepath.absolute()}")
-                                        
-                                except Exception as e:
-                                    st.error(f"❌ 저장 중 오류 발생: {e}")
-                                    st.exception(e)  # 상세한 에러 정보 표시
-                                    st.write(f"📂 저장 디렉토리: {STORAGE_DIR.absolute()}")
-                                    st.write(f"📂 디렉토리 존재 여부: {STORAGE_DIR.exists()}")
-                            else:
-                                st.warning("⚠️ 저장할 콘티가 없습니다. 먼저 콘티를 생성해주세요.")
-            
-            except Exception as e:
-                st.error(f"에러 발생: {e}")
+        # 가짜 백엔드(STORY_BACKEND=fake)는 키 없이 동작
+        # (키가 없어도 저장된 콘티 보기 탭은 그려야 하므로 st.stop() 하지 않음)
+        if not api_key and get_backend().requires_api_key:
+            st.error("🚨 API 키가 설정되지 않았습니다. 저장된 콘티 보기 탭은 쓸 수 있어요.")
+        else:
+            show_generate_form(api_key)
     
     with tab2:
         st.title("📚 저장된 콘티 목록")
+        browse_metrics = RunMetrics("browse")
+        
+        # 카탈로그 기준 개수 (파일을 다시 glob 하지 않음)
+        with browse_metrics.stage("list"):
+            total = count_stories()
         
         # 저장 경로 및 상태 표시
         col1, col2 = st.columns(2)
@@ -501,50 +680,57 @@ def main():
             st.caption(f"📂 저장 위치: {STORAGE_DIR.absolute()}")
         with col2:
             if STORAGE_DIR.exists():
-                files = list(STORAGE_DIR.glob("*.json"))
-                st.caption(f"📁 파일 개수: {len(files)}개")
+                st.caption(f"📁 파일 개수: {total}개")
             else:
                 st.caption("⚠️ 저장 디렉토리 없음")
         
-        # 새로고침 버튼
+        # 새로고침 버튼 (직접 수정한 파일까지 mtime으로 다시 확인)
         if st.button("🔄 목록 새로고침", use_container_width=True):
+            refresh_catalog(force=True)
             st.rerun()
         
-        saved_stories = load_saved_stories()
-        
-        if not saved_stories:
+        if total == 0:
             st.info("저장된 콘티가 없습니다. 새 콘티를 만들어보세요! 🎨")
         else:
-            st.markdown(f"총 {len(saved_stories)}개의 콘티가 저장되어 있습니다.")
+            st.markdown(f"총 {total}개의 콘티가 저장되어 있습니다.")
+            view_mode = st.radio("보기 방식", ["🖼️ 갤러리", "📄 목록"], horizontal=True)
             
-            # 콘티 선택
-            story_options = [f"{s['title']} ({s['created_at'][:10]})" for s in saved_stories]
-            selected_idx = st.selectbox(
-                "콘티 선택",
-                range(len(story_options)),
-                format_func=lambda x: story_options[x]
+            # 검색 (제목/에피소드/컷 내용, 카탈로그 색인 사용)
+            query = st.text_input(
+                "🔍 검색",
+                placeholder="예: 쌀국수, 페럿 화남",
+                help="제목, 원본 에피소드, 컷 내용(대사/상황/배경)에서 찾습니다."
             )
             
-            if selected_idx is not None:
-                selected_story = saved_stories[selected_idx]
-                
-                # 삭제 버튼
-                col1, col2 = st.columns([3, 1])
-                with col2:
-                    if st.button("🗑️ 삭제", key=f"delete_{selected_idx}"):
-                        filepath = STORAGE_DIR / selected_story['filename']
-                        if filepath.exists():
-                            filepath.unlink()
-                            st.success("삭제 완료!")
-                            st.rerun()
-                
-                # 콘티 표시
-                st.markdown("---")
-                st.markdown(f"**원본 에피소드:** {selected_story['episode']}")
-                st.markdown(f"**생성일시:** {selected_story['created_at']}")
-                st.markdown("---")
-                
-                display_story(selected_story['title'], selected_story['parts'])
+            if query.strip():
+                with browse_metrics.stage("search"):
+                    page_stories = search_stories(query, limit=PAGE_SIZE)
+                st.caption(f"검색 결과 {len(page_stories)}개 (관련도 순, 최대 {PAGE_SIZE}개)")
+            else:
+                # 페이지 선택 (목록 비용은 페이지 크기에만 비례)
+                page_count = (total + PAGE_SIZE - 1) // PAGE_SIZE
+                page = 1
+                if page_count > 1:
+                    page = st.number_input("페이지", min_value=1, max_value=page_count, value=1, step=1)
+                with browse_metrics.stage("list"):
+                    page_stories = list_stories((page - 1) * PAGE_SIZE, PAGE_SIZE)
+            
+            if view_mode == "🖼️ 갤러리":
+                selected_handle = show_gallery(page_stories)
+            else:
+                # 콘티 선택
+                story_options = [f"{s.title} ({s.created_at[:10]})" for s in page_stories]
+                selected_idx = st.selectbox(
+                    "콘티 선택",
+                    range(len(story_options)),
+                    format_func=lambda x: story_options[x]
+                )
+                selected_handle = page_stories[selected_idx] if selected_idx is not None else None
+            
+            if selected_handle is not None:
+                show_saved_story(selected_handle, browse_metrics)
+            
+            show_export(selected_handle, page_stories, query)
 
 if __name__ == "__main__":
     main()
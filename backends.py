@@ -0,0 +1,389 @@
+"""콘티 생성 모델 백엔드
+
+STORY_BACKEND 환경 변수로 고른다.
+- gemini (기본): google.generativeai 로 실제 Gemini API 호출
+- fake: 네트워크 없이 녹화된(또는 합성한) 응답을 돌려주는 로컬 가짜 백엔드.
+  부하 테스트(loadtest.py)나 API 키 없이 화면을 확인할 때 쓴다.
+
+fake 백엔드 설정 (환경 변수, 모두 선택):
+- FAKE_GEMINI_REPLAY_DIR: 돌려줄 응답 디렉토리. response_cache 항목(*.json)이나
+  응답 텍스트(*.txt)를 읽는다. 없으면 benchmarks.synthetic 으로 합성한다.
+- FAKE_GEMINI_LATENCY: 첫 조각까지 걸리는 초. "2" 또는 "0.5-3" 범위
+- FAKE_GEMINI_CHUNK_CHARS: 스트리밍 조각 길이 (기본 200)
+- FAKE_GEMINI_CHUNK_DELAY: 스트리밍 조각 사이 초 (기본 0)
+- FAKE_GEMINI_ERROR_RATE: 일시적 오류(503)를 낼 비율 (0~1)
+- FAKE_GEMINI_RATE_LIMIT_RATE: 요청 한도 초과(429)를 낼 비율 (0~1)
+- FAKE_GEMINI_STALL_RATE: 응답이 FAKE_GEMINI_STALL_SECONDS(기본 60)초 멈추는 비율 (꼬리 지연)
+- FAKE_GEMINI_CONTEXT_CACHE: 0 이면 컨텍스트 캐시를 지원하지 않는 것처럼 동작
+- FAKE_GEMINI_SEED: 지연/오류/합성 응답 seed
+
+모델 객체는 generate_content(contents, stream=False) 와 응답의 .text,
+조각 반복, usage_metadata 만 쓰므로 두 백엔드가 같은 모양으로 돌려준다.
+create_model() 은 시스템 프롬프트를 컨텍스트 캐시에 올려 쓰는
+context_cache.ContextCachedModel 을 돌려주고, 백엔드는 캐시 생성/갱신/삭제
+(create_context_cache 등)만 구현한다.
+
+앱 첫 화면(저장된 콘티 보기)이 이 모듈을 불러오므로, Gemini SDK 와
+google.api_core(grpc 포함)는 모델을 만들거나 오류를 낼 때 불러온다.
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from pathlib import Path
+
+from prompts import CUT_PROMPT, OUTLINE_PROMPT, SCENE_PROMPT
+from story_parser import compose_response_text, parse_story_parts
+
+# 콘티 생성에 사용하는 모델
+MODEL_NAME = "gemini-2.5-pro"  # 더 강력한 모델 사용
+# 빠른 모델 (속도 우선 단계, 품질 우선 단계가 늦어질 때 대체)
+FAST_MODEL_NAME = "gemini-2.5-flash"
+
+# 합성 응답 개수 (에피소드 해시로 하나를 고름)
+FAKE_SYNTHETIC_STORIES = 32
+# 컷 요청에서 "[이번에 작성할 컷]\n3컷: ..." 의 컷 번호
+_CUT_REQUEST = re.compile(r"\[이번에 작성할 컷\]\s*(\d+)\s*컷")
+_EPISODE_REQUEST = re.compile(r"\[에피소드\]\n(.*?)\n\n", re.DOTALL)
+
+
+class GeminiBackend:
+    """실제 Gemini API"""
+
+    name = "gemini"
+    requires_api_key = True
+
+    def __init__(self):
+        self._api_key = None
+        self._lock = threading.Lock()
+
+    def create_model(self, api_key, model_name, system_prompt):
+        import google.generativeai as genai
+
+        from context_cache import ContextCachedModel
+
+        # genai.configure 는 프로세스 전체 설정이라 키가 바뀔 때만 다시 함
+        with self._lock:
+            if api_key != self._api_key:
+                genai.configure(api_key=api_key)
+                self._api_key = api_key
+        return ContextCachedModel(self, model_name, system_prompt)
+
+    def create_inline_model(self, model_name, system_prompt):
+        import google.generativeai as genai
+
+        return genai.GenerativeModel(
+            model_name=model_name,
+            system_instruction=system_prompt
+        )
+
+    def create_context_cache(self, model_name, system_prompt, ttl):
+        from google.generativeai import caching
+
+        return caching.CachedContent.create(
+            model=model_name,
+            display_name="story-system-prompt",
+            system_instruction=system_prompt,
+            ttl=timedelta(seconds=ttl),
+        )
+
+    def renew_context_cache(self, cache, ttl):
+        cache.update(ttl=timedelta(seconds=ttl))
+
+    def delete_context_cache(self, cache):
+        cache.delete()
+
+    def model_from_cache(self, cache):
+        import google.generativeai as genai
+
+        return genai.GenerativeModel.from_cached_content(cached_content=cache)
+
+
+@dataclass
+class FakeSettings:
+    """가짜 백엔드 설정 (지연 시간은 초)"""
+
+    latency: tuple = (0.0, 0.0)  # (최소, 최대) 사이 균등 분포
+    chunk_chars: int = 200
+    chunk_delay: float = 0.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    stall_rate: float = 0.0
+    stall_seconds: float = 60.0
+    context_cache: bool = True
+    replay_dir: str = None
+    seed: int = 0
+
+    @classmethod
+    def from_env(cls, environ=None):
+        """FAKE_GEMINI_* 환경 변수로 설정 만들기"""
+        environ = os.environ if environ is None else environ
+        latency = environ.get("FAKE_GEMINI_LATENCY", "").strip()
+        low, _, high = latency.partition("-") if latency else ("0", "", "")
+        return cls(
+            latency=(float(low), float(high or low)),
+            chunk_chars=max(1, int(environ.get("FAKE_GEMINI_CHUNK_CHARS") or 200)),
+            chunk_delay=float(environ.get("FAKE_GEMINI_CHUNK_DELAY") or 0.0),
+            error_rate=float(environ.get("FAKE_GEMINI_ERROR_RATE") or 0.0),
+            rate_limit_rate=float(environ.get("FAKE_GEMINI_RATE_LIMIT_RATE") or 0.0),
+            stall_rate=float(environ.get("FAKE_GEMINI_STALL_RATE") or 0.0),
+            stall_seconds=float(environ.get("FAKE_GEMINI_STALL_SECONDS") or 60.0),
+            context_cache=environ.get("FAKE_GEMINI_CONTEXT_CACHE", "1").strip() != "0",
+            replay_dir=environ.get("FAKE_GEMINI_REPLAY_DIR") or None,
+            seed=int(environ.get("FAKE_GEMINI_SEED") or 0),
+        )
+
+
+class _FakeUsage:
+    def __init__(self, prompt_chars, output_chars, cached_chars=0):
+        # 한글 기준 대략 2~3자 = 1토큰, Gemini 처럼 입력 토큰에 캐시 토큰도 포함
+        self.prompt_token_count = max(1, prompt_chars // 3)
+        self.cached_content_token_count = cached_chars // 3
+        self.candidates_token_count = max(1, output_chars // 3)
+        self.total_token_count = self.prompt_token_count + self.candidates_token_count
+
+
+class _FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeResponse:
+    """genai 응답처럼 .text / 조각 반복 / usage_metadata 를 제공"""
+
+    def __init__(self, text, prompt_chars, chunk_chars, chunk_delay, cached_chars=0):
+        self.text = text
+        self.usage_metadata = _FakeUsage(prompt_chars, len(text), cached_chars)
+        self._chunk_chars = chunk_chars
+        self._chunk_delay = chunk_delay
+
+    def __iter__(self):
+        for i in range(0, len(self.text), self._chunk_chars):
+            if i and self._chunk_delay:
+                time.sleep(self._chunk_delay)
+            yield _FakeChunk(self.text[i:i + self._chunk_chars])
+
+
+class FakeContextCache:
+    """CachedContent 흉내 (만료 시각은 time.monotonic 기준)"""
+
+    def __init__(self, name, model_name, system_prompt, ttl):
+        self.name = name
+        self.model_name = model_name
+        self.system_prompt = system_prompt
+        self.expires = time.monotonic() + ttl
+
+
+class FakeModel:
+    """시스템 프롬프트에 맞는 모양의 응답을 돌려주는 가짜 모델"""
+
+    def __init__(self, backend, model_name, system_prompt, context_cache=None):
+        self.backend = backend
+        self.model_name = model_name
+        self.system_prompt = system_prompt
+        self.context_cache = context_cache
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        contents = str(contents)
+        if self.context_cache is not None and self.context_cache.expires <= time.monotonic():
+            from google.api_core import exceptions as api_exceptions
+
+            raise api_exceptions.NotFound(f"가짜 백엔드: 컨텍스트 캐시 {self.context_cache.name} 만료 (404)")
+        # genai 처럼 request_options={"timeout": 초} 를 넘으면 DeadlineExceeded
+        timeout = (kwargs.get("request_options") or {}).get("timeout")
+        self.backend.wait_or_fail(timeout)
+        text = self.backend.response_for(self.system_prompt, contents)
+        settings = self.backend.settings
+        return FakeResponse(
+            text,
+            len(self.system_prompt) + len(contents),
+            settings.chunk_chars if stream else max(1, len(text)),
+            settings.chunk_delay if stream else 0.0,
+            len(self.system_prompt) if self.context_cache is not None else 0,
+        )
+
+
+class FakeBackend:
+    """네트워크 없이 응답을 재생하는 로컬 백엔드"""
+
+    name = "fake"
+    requires_api_key = False
+
+    def __init__(self, settings=None):
+        self.settings = settings or FakeSettings.from_env()
+        self.calls = 0
+        self.injected_errors = 0
+        self._rng = random.Random(self.settings.seed)
+        self._lock = threading.Lock()
+        self._stories = None
+        self.context_caches = {}
+        self._cache_serial = 0
+
+    def create_model(self, api_key, model_name, system_prompt):
+        from context_cache import ContextCachedModel
+
+        return ContextCachedModel(self, model_name, system_prompt)
+
+    def create_inline_model(self, model_name, system_prompt):
+        return FakeModel(self, model_name, system_prompt)
+
+    def create_context_cache(self, model_name, system_prompt, ttl):
+        if not self.settings.context_cache:
+            from google.api_core import exceptions as api_exceptions
+
+            raise api_exceptions.FailedPrecondition("가짜 백엔드: 컨텍스트 캐시를 지원하지 않음 (400)")
+        with self._lock:
+            self._cache_serial += 1
+            name = f"cachedContents/fake-{self._cache_serial}"
+            cache = self.context_caches[name] = FakeContextCache(name, model_name, system_prompt, ttl)
+        return cache
+
+    def renew_context_cache(self, cache, ttl):
+        if cache.expires <= time.monotonic():
+            from google.api_core import exceptions as api_exceptions
+
+            raise api_exceptions.NotFound(f"가짜 백엔드: 컨텍스트 캐시 {cache.name} 없음 (404)")
+        cache.expires = time.monotonic() + ttl
+
+    def delete_context_cache(self, cache):
+        with self._lock:
+            self.context_caches.pop(cache.name, None)
+        cache.expires = 0.0
+
+    def model_from_cache(self, cache):
+        return FakeModel(self, cache.model_name, cache.system_prompt, context_cache=cache)
+
+    def wait_or_fail(self, timeout=None):
+        """설정한 지연만큼 기다리고, 확률에 따라 멈춤/429/503 오류 발생"""
+        from google.api_core import exceptions as api_exceptions
+
+        with self._lock:
+            self.calls += 1
+            delay = self._rng.uniform(*self.settings.latency)
+            if self._rng.random() < self.settings.stall_rate:
+                delay = self.settings.stall_seconds
+            roll = self._rng.random()
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise api_exceptions.DeadlineExceeded(f"가짜 백엔드: {timeout:.0f}초 안에 응답하지 못함 (504)")
+        if delay:
+            time.sleep(delay)
+        if roll < self.settings.rate_limit_rate:
+            with self._lock:
+                self.injected_errors += 1
+            raise api_exceptions.ResourceExhausted("가짜 백엔드: 요청 한도 초과 (429)")
+        if roll < self.settings.rate_limit_rate + self.settings.error_rate:
+            with self._lock:
+                self.injected_errors += 1
+            raise api_exceptions.ServiceUnavailable("가짜 백엔드: 일시적인 서버 오류 (503)")
+
+    def _load_stories(self):
+        """재생할 (제목, 컷 목록) 목록"""
+        texts = []
+        if self.settings.replay_dir:
+            for path in sorted(Path(self.settings.replay_dir).iterdir()):
+                try:
+                    if path.suffix == ".json":
+                        with open(path, "r", encoding="utf-8") as f:
+                            texts.append(json.load(f)["response_text"])
+                    elif path.suffix == ".txt":
+                        texts.append(path.read_text(encoding="utf-8"))
+                except (OSError, ValueError, KeyError):
+                    continue
+        if not texts:
+            from benchmarks.synthetic import make_response
+
+            rng = random.Random(self.settings.seed)
+            texts = [make_response(rng) for _ in range(FAKE_SYNTHETIC_STORIES)]
+        stories = []
+        for text in texts:
+            title, parts = parse_story_parts(text)
+            if title and parts:
+                stories.append((title, parts))
+        if not stories:
+            raise Exception(f"가짜 백엔드: 재생할 응답이 없습니다 ({self.settings.replay_dir})")
+        return stories
+
+    def _story_for(self, episode):
+        if self._stories is None:
+            with self._lock:
+                if self._stories is None:
+                    self._stories = self._load_stories()
+        # 같은 에피소드면 항상 같은 응답
+        digest = hashlib.sha1(episode.strip().encode("utf-8")).digest()
+        return self._stories[int.from_bytes(digest[:4], "big") % len(self._stories)]
+
+    def response_for(self, system_prompt, contents):
+        """시스템 프롬프트 종류에 맞춰 전체/줄거리/컷/장면 응답 텍스트를 만듦"""
+        if system_prompt == CUT_PROMPT:
+            match = _EPISODE_REQUEST.search(contents)
+            title, parts = self._story_for(match.group(1) if match else contents)
+            cut = _CUT_REQUEST.search(contents)
+            cut_number = int(cut.group(1)) if cut else 1
+            part = parts[(cut_number - 1) % len(parts)]
+            return compose_response_text(title, [dict(part, cut_number=cut_number)]).split("||||", 1)[1].strip()
+
+        title, parts = self._story_for(contents)
+        if system_prompt == OUTLINE_PROMPT:
+            outlines = [
+                {"cut_number": part["cut_number"], "text_content": part["text_content"], "svg_code": None}
+                for part in parts
+            ]
+            return compose_response_text(title, outlines)
+        if system_prompt == SCENE_PROMPT:
+            scene_parts = [
+                {"cut_number": part["cut_number"], "text_content": part["text_content"], "svg_code": None,
+                 "scene": _fake_scene(index)}
+                for index, part in enumerate(parts)
+            ]
+            return compose_response_text(title, scene_parts)
+        return compose_response_text(title, parts)
+
+
+def _fake_scene(index):
+    """간단 장면 모드용 장면 설명 (컷마다 조금씩 다르게)"""
+    expressions = ("surprised", "happy", "angry", "sad")
+    poses = ("arms_up", "pointing", "hands_on_head", "sitting")
+    return {
+        "shot": ("full", "medium", "closeup", "full")[index % 4],
+        "background": {"wall": "#e8f4f8", "floor": "#ddd"},
+        "characters": [
+            {"type": "mole", "x": "left", "expression": expressions[index % 4], "pose": poses[index % 4]},
+            {"type": "ferret", "x": "right", "expression": expressions[(index + 1) % 4], "pose": "standing"},
+        ],
+        "props": [{"type": "table"}],
+    }
+
+
+BACKENDS = {
+    "gemini": GeminiBackend,
+    "fake": FakeBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """프로세스 전체에서 공유하는 백엔드 (STORY_BACKEND 환경 변수로 선택)"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = os.environ.get("STORY_BACKEND", "gemini").strip().lower()
+                if name not in BACKENDS:
+                    raise Exception(f"알 수 없는 STORY_BACKEND: {name} (가능: {', '.join(BACKENDS)})")
+                _backend = BACKENDS[name]()
+    return _backend
+
+
+def set_backend(backend):
+    """백엔드를 직접 지정 (부하 테스트에서 설정을 바꾼 FakeBackend 를 넣을 때)"""
+    global _backend
+    with _backend_lock:
+        _backend = backend
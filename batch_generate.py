@@ -0,0 +1,223 @@
+"""에피소드 파일로 콘티를 한꺼번에 생성하는 명령줄 도구
+
+사용법:
+    python batch_generate.py episodes.jsonl --concurrency 4
+    python batch_generate.py episodes.txt --no-cache
+
+입력 파일:
+    .jsonl  한 줄에 {"episode": "..."} 또는 "..." (JSON 문자열)
+    그 외   한 줄에 에피소드 하나 (빈 줄은 무시)
+
+완료된 에피소드는 진행 파일(<입력파일>.done.jsonl)에 기록되므로,
+중간에 죽어도 같은 명령으로 다시 실행하면 남은 것만 생성한다.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+from backends import get_backend
+from generation import (
+    CUT_PROMPT,
+    MODEL_NAME,
+    create_model,
+    generate_story_text,
+    repair_story_parts,
+)
+from metrics import percentile
+from model_client import is_rate_limit_error, is_transient_error
+from response_cache import get_response_cache, normalize_episode
+from storage import save_story
+from story_parser import parse_story_parts
+from svg_optimizer import optimize_parts
+
+
+def read_episodes(path):
+    """입력 파일에서 에피소드 목록 읽기"""
+    episodes = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            if path.suffix == ".jsonl":
+                try:
+                    item = json.loads(line)
+                except ValueError as e:
+                    raise Exception(f"{path}:{line_no} JSON 파싱 실패: {e}")
+                episode = item.get("episode") if isinstance(item, dict) else item
+                if not isinstance(episode, str):
+                    raise Exception(f"{path}:{line_no} 'episode' 문자열이 없습니다")
+            else:
+                episode = line
+            if episode.strip():
+                episodes.append(episode)
+    return episodes
+
+
+def episode_key(episode):
+    """진행 파일에서 에피소드를 구분하는 키"""
+    return hashlib.sha256(normalize_episode(episode).encode("utf-8")).hexdigest()
+
+
+def read_done_keys(progress_path):
+    """진행 파일에서 이미 끝난 에피소드 키 읽기 (마지막 줄이 깨져 있어도 무시)"""
+    done = set()
+    if not progress_path.exists():
+        return done
+    with open(progress_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["key"])
+            except (ValueError, KeyError, TypeError):
+                continue
+    return done
+
+
+class BatchRunner:
+    """동시 실행 개수를 제한하면서 에피소드들을 생성/저장"""
+
+    def __init__(self, model, model_name, concurrency, max_retries, progress_path, cache=None, cut_model=None):
+        self.model = model
+        # SVG 검사에 실패한 컷만 다시 그릴 때 쓰는 모델 (없으면 로컬 수리만)
+        self.cut_model = cut_model
+        self.model_name = model_name
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.progress_path = progress_path
+        self.cache = cache
+        self.latencies = []
+        self.failed = []
+        self.cache_hits = 0
+        # 429를 받으면 모든 작업자가 이 시각까지 쉼
+        self._resume_at = 0.0
+
+    async def _wait_for_rate_limit(self):
+        loop = asyncio.get_running_loop()
+        delay = self._resume_at - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _generate(self, episode):
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_rate_limit()
+            try:
+                return await asyncio.to_thread(
+                    generate_story_text, self.model, episode, self.cache, self.model_name
+                )
+            except Exception as e:
+                if attempt >= self.max_retries or not is_transient_error(e):
+                    raise
+                # 지수 백오프 + 지터
+                backoff = min(60.0, 2.0 ** attempt) * (0.5 + random.random())
+                if is_rate_limit_error(e):
+                    self._resume_at = max(self._resume_at, loop.time() + backoff)
+                print(f"  ⏳ 일시적 오류, {backoff:.1f}초 후 재시도 ({attempt + 1}/{self.max_retries}): {e}", file=sys.stderr)
+                await asyncio.sleep(backoff)
+
+    async def _run_one(self, semaphore, index, total, episode, progress_file):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response_text, from_cache = await self._generate(episode)
+                title, parts_data = parse_story_parts(response_text)
+                parts_data, regenerated, failed = await asyncio.to_thread(
+                    repair_story_parts, episode, title, parts_data, self.cut_model
+                )
+                parts_data = optimize_parts(parts_data)
+                filepath = await asyncio.to_thread(save_story, title, episode, response_text, parts_data)
+            except Exception as e:
+                self.failed.append((episode, e))
+                print(f"[{index}/{total}] ❌ 실패: {episode[:30]} ({e})", file=sys.stderr)
+                return
+
+            for cut_number in regenerated:
+                print(f"[{index}/{total}] 🔧 {title} {cut_number}컷 다시 그림")
+            for cut_number, problems in failed.items():
+                print(f"[{index}/{total}] ⚠️ {title} {cut_number}컷 문제 남음: {', '.join(problems)}", file=sys.stderr)
+            latency = time.perf_counter() - started
+            self.latencies.append(latency)
+            if from_cache:
+                self.cache_hits += 1
+            progress_file.write(json.dumps({
+                "key": episode_key(episode),
+                "episode": episode,
+                "filename": filepath.name,
+                "latency": round(latency, 3),
+            }, ensure_ascii=False) + "\n")
+            progress_file.flush()
+            os.fsync(progress_file.fileno())
+            print(f"[{index}/{total}] ✅ {title} ({latency:.1f}초) → {filepath.name}")
+
+    async def run(self, episodes):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        with open(self.progress_path, "a", encoding="utf-8") as progress_file:
+            await asyncio.gather(*(
+                self._run_one(semaphore, i, len(episodes), episode, progress_file)
+                for i, episode in enumerate(episodes, 1)
+            ))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="에피소드 파일로 콘티를 한꺼번에 생성합니다.")
+    parser.add_argument("input", type=Path, help="에피소드 파일 (.jsonl 또는 한 줄에 하나씩 쓴 텍스트)")
+    parser.add_argument("--concurrency", type=int, default=4, help="동시에 보낼 요청 수 (기본 4)")
+    parser.add_argument("--max-retries", type=int, default=5, help="일시적 오류 재시도 횟수 (기본 5)")
+    parser.add_argument("--progress", type=Path, help="진행 파일 경로 (기본: <입력파일>.done.jsonl)")
+    parser.add_argument("--model", default=MODEL_NAME, help=f"사용할 모델 (기본 {MODEL_NAME})")
+    parser.add_argument("--no-cache", action="store_true", help="응답 캐시를 쓰지 않고 항상 새로 생성")
+    args = parser.parse_args(argv)
+
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key and get_backend().requires_api_key:
+        print("🚨 GEMINI_API_KEY 환경 변수가 설정되지 않았습니다.", file=sys.stderr)
+        return 2
+    if args.concurrency < 1:
+        parser.error("--concurrency 는 1 이상이어야 합니다")
+
+    progress_path = args.progress or args.input.with_name(args.input.name + ".done.jsonl")
+    episodes = read_episodes(args.input)
+    done_keys = read_done_keys(progress_path)
+
+    # 같은 파일 안의 중복 에피소드와 이미 끝난 에피소드는 건너뜀
+    pending = []
+    seen = set(done_keys)
+    for episode in episodes:
+        key = episode_key(episode)
+        if key not in seen:
+            seen.add(key)
+            pending.append(episode)
+    skipped = len(episodes) - len(pending)
+    print(f"📄 에피소드 {len(episodes)}개 중 {skipped}개는 이미 완료/중복, {len(pending)}개 생성 시작 (동시 {args.concurrency}개)")
+
+    model = create_model(api_key, model_name=args.model)
+    cache = None if args.no_cache else get_response_cache()
+    cut_model = create_model(api_key, model_name=args.model, system_prompt=CUT_PROMPT)
+    runner = BatchRunner(model, args.model, args.concurrency, args.max_retries, progress_path, cache, cut_model)
+
+    started = time.perf_counter()
+    asyncio.run(runner.run(pending))
+    elapsed = time.perf_counter() - started
+
+    done = len(runner.latencies)
+    print()
+    print(f"완료 {done}개 / 실패 {len(runner.failed)}개 / 건너뜀 {skipped}개 (캐시 적중 {runner.cache_hits}개)")
+    print(f"총 소요 {elapsed:.1f}초, 처리량 {done / elapsed * 60 if elapsed else 0:.2f}개/분")
+    if runner.latencies:
+        print(
+            "에피소드별 지연: "
+            f"p50 {percentile(runner.latencies, 50):.1f}초, "
+            f"p95 {percentile(runner.latencies, 95):.1f}초, "
+            f"최대 {max(runner.latencies):.1f}초"
+        )
+    return 1 if runner.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
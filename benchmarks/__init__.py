@@ -0,0 +1,4 @@
+"""파싱 / 저장 / 보관함 불러오기 마이크로 벤치마크
+
+python -m benchmarks.run 으로 실행한다 (자세한 옵션은 run.py 참고).
+"""
@@ -0,0 +1,362 @@
+"""마이크로 벤치마크 실행
+
+사용법:
+    python -m benchmarks.run                      # 보관함 10 / 1,000 / 10,000 건
+    python -m benchmarks.run --quick              # 보관함 10 / 1,000 건, 반복 횟수 축소
+    python -m benchmarks.run --compare benchmarks/results/906faf2.json
+
+앱 첫 화면(콜드 스타트)은 benchmarks.startup 을 새 프로세스로 여러 번 띄워서 잰다.
+첫 화면에서 Gemini SDK/생성 모듈이 불려 오면 경고하고, --compare 때는 회귀로 친다.
+
+결과는 benchmarks/results/<커밋>.json 에 저장한다. --compare 로 이전 결과를
+주면 항목별 p50 변화를 보여주고, --threshold(기본 20%) 넘게 느려진 항목이
+있으면 종료 코드 1 로 끝난다.
+
+시간 측정과 메모리 측정(tracemalloc)은 따로 돌려서 tracemalloc 부담이
+시간에 섞이지 않게 한다. 보관함은 임시 디렉토리에 만들고 끝나면 지운다.
+"""
+import argparse
+import json
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import storage
+from export import sheet_bytes
+from metrics import percentile
+from story_html import render_story_html
+from story_parser import iter_story_events, parse_story_parts
+from svg_optimizer import optimize_parts
+from svg_validator import check_parts
+from thumbnails import render_thumbnail
+
+from benchmarks.synthetic import KINDS, build_archive, make_response, make_story
+
+RESULTS_DIR = Path(__file__).parent / "results"
+ARCHIVE_SIZES = (10, 1000, 10000)
+QUICK_ARCHIVE_SIZES = (10, 1000)
+# 이보다 작은 차이(ms)는 측정 잡음으로 보고 회귀로 치지 않음
+NOISE_FLOOR_MS = 0.05
+# 스트리밍 파싱에서 한 번에 넣는 조각 길이
+STREAM_CHUNK = 64
+# 첫 화면 측정용 보관함 크기
+STARTUP_ARCHIVE = 100
+
+
+class Benchmark:
+    """이름 하나에 해당하는 측정 (inputs 하나당 func 한 번 호출)
+
+    setup 은 시간/메모리 측정 전에 한 번씩 불러서 캐시 등을 초기화한다.
+    """
+
+    def __init__(self, name, func, inputs, setup=None):
+        self.name = name
+        self.func = func
+        self.inputs = inputs
+        self.setup = setup
+
+    def _prepare(self):
+        if self.setup is not None:
+            self.setup()
+
+    def time(self):
+        self._prepare()
+        samples = []
+        started = time.perf_counter()
+        for item in self.inputs:
+            t0 = time.perf_counter()
+            self.func(item)
+            samples.append(time.perf_counter() - t0)
+        return time.perf_counter() - started, samples
+
+    def peak_memory(self):
+        self._prepare()
+        tracemalloc.start()
+        try:
+            for item in self.inputs:
+                self.func(item)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return peak
+
+    def run(self):
+        total, samples = self.time()
+        return summarize_samples(self.name, samples, total, self.peak_memory())
+
+
+def summarize_samples(name, samples, total, peak):
+    """초 단위 측정값 목록 → 결과 항목 (peak 는 바이트)"""
+    ms = [s * 1000 for s in samples]
+    return {
+        "name": name,
+        "count": len(samples),
+        "total_s": round(total, 4),
+        "ops_per_s": round(len(samples) / total, 1) if total else 0.0,
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "max_ms": round(max(ms), 3) if ms else 0.0,
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def _chunks(text, size=STREAM_CHUNK):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def _stream_parse(text):
+    for _ in iter_story_events(_chunks(text)):
+        pass
+
+
+def pipeline_benchmarks(rng, repeat):
+    """응답 파싱 → 검증 → 최적화 → HTML 조립 / 썸네일 / 내보내기 이미지 단계별 측정"""
+    responses = {kind: [make_response(rng, kind) for _ in range(repeat)] for kind in KINDS}
+    benchmarks = [
+        Benchmark(f"parse/{kind}", parse_story_parts, texts)
+        for kind, texts in responses.items()
+    ]
+    benchmarks.append(Benchmark("parse_stream/normal", _stream_parse, responses["normal"]))
+
+    parsed = {kind: [parse_story_parts(text)[1] for text in texts] for kind, texts in responses.items()}
+    for kind in ("normal", "large_svg"):
+        benchmarks.append(Benchmark(f"repair/{kind}", check_parts, parsed[kind]))
+        benchmarks.append(Benchmark(f"optimize/{kind}", optimize_parts, parsed[kind]))
+        optimized = [optimize_parts(parts) for parts in parsed[kind]]
+        benchmarks.append(Benchmark(f"render_html/{kind}", render_story_html, optimized))
+        benchmarks.append(Benchmark(f"thumbnail/{kind}", render_thumbnail, optimized))
+        stories = [{"title": f"내보내기 {index}", "parts": parts} for index, parts in enumerate(optimized)]
+        benchmarks.append(Benchmark(f"export_sheet/{kind}", sheet_bytes, stories))
+    return benchmarks
+
+
+def save_benchmark(rng, repeat):
+    """save_story() 한 건 (파일 + blob + 카탈로그 커밋)"""
+    root = tempfile.mkdtemp(prefix="bench_save_")
+    stories = [make_story(rng) for _ in range(repeat)]
+    runs = []
+
+    def save(story):
+        storage.save_story(*story)
+
+    def setup():
+        # 시간/메모리 측정이 같은 파일명을 덮어쓰지 않도록 매번 빈 디렉토리에서
+        runs.append(None)
+        storage.set_storage_dir(Path(root) / f"run{len(runs)}")
+
+    return root, Benchmark("save_story", save, stories, setup=setup)
+
+
+def archive_benchmarks(rng, size, repeat):
+    """보관함 크기별 카탈로그/목록/검색/본문 불러오기 측정
+
+    측정마다 set_storage_dir() 로 캐시를 비운 상태(앱을 새로 띄운 직후)에서 시작한다.
+    """
+    root = tempfile.mkdtemp(prefix=f"bench_archive_{size}_")
+    storage_dir = Path(root) / "stories"
+
+    def reset():
+        storage.set_storage_dir(storage_dir)
+
+    def rebuild_catalog():
+        reset()
+        storage.CATALOG_PATH.unlink(missing_ok=True)
+
+    reset()
+    filenames = build_archive(rng, size)
+    storage.refresh_catalog(force=True)
+
+    pages = max(1, size // 20)
+    offsets = [rng.randrange(pages) * 20 for _ in range(repeat)]
+    words = [rng.choice(["쌀국수", "지하철", "택배", "두더지", "알람", "다이어트", "목욕탕 대참사"]) for _ in range(repeat)]
+    picks = [rng.choice(filenames) for _ in range(repeat)]
+
+    benchmarks = [
+        Benchmark(f"archive{size}/catalog_build", lambda _: storage.refresh_catalog(), [None], setup=rebuild_catalog),
+        Benchmark(f"archive{size}/catalog_refresh", lambda _: storage.refresh_catalog(force=True), [None] * 3, setup=reset),
+        Benchmark(f"archive{size}/list_page", lambda offset: storage.list_stories(offset, 20), offsets, setup=reset),
+        Benchmark(f"archive{size}/search", storage.search_stories, words, setup=reset),
+        Benchmark(f"archive{size}/load_story_cold", storage.load_story, picks, setup=reset),
+        Benchmark(f"archive{size}/load_story_warm", storage.load_story, picks),
+        Benchmark(
+            f"archive{size}/load_saved_stories",
+            lambda _: storage.load_saved_stories(),
+            [None] * (1 if size >= 10000 else 3),
+            setup=reset,
+        ),
+    ]
+    return root, benchmarks
+
+
+def _run_startup(storage_dir, trace=False):
+    command = [sys.executable, "-m", "benchmarks.startup", "--storage-dir", str(storage_dir)]
+    if trace:
+        command.append("--trace")
+    completed = subprocess.run(
+        command, capture_output=True, text=True, cwd=Path(__file__).parent.parent,
+    )
+    if completed.returncode != 0:
+        raise Exception(f"첫 화면 측정 실패: {completed.stderr.strip()[-500:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def startup_benchmarks(rng, runs):
+    """앱 첫 화면/재실행 시간 (새 프로세스 runs 번), (임시 디렉토리, 결과 목록, 불려 온 무거운 모듈)"""
+    root = tempfile.mkdtemp(prefix="bench_startup_")
+    storage_dir = Path(root) / "stories"
+    storage.set_storage_dir(storage_dir)
+    build_archive(rng, STARTUP_ARCHIVE)
+    storage.refresh_catalog(force=True)
+
+    started = time.perf_counter()
+    probes = [_run_startup(storage_dir) for _ in range(runs)]
+    total = time.perf_counter() - started
+    # 메모리는 tracemalloc 부담이 시간에 섞이지 않도록 따로 한 번
+    peak = _run_startup(storage_dir, trace=True)["peak_kb"] * 1024
+    heavy = sorted({name for probe in probes for name in probe["heavy_modules"]})
+    results = [
+        summarize_samples("startup/first_paint", [probe["first_paint_s"] for probe in probes], total, peak),
+        summarize_samples("startup/rerun", [probe["rerun_s"] for probe in probes], sum(probe["rerun_s"] for probe in probes), 0),
+    ]
+    return root, results, heavy
+
+
+def _git_commit():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).parent,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return commit, bool(dirty)
+
+
+def _print_result(result):
+    print(
+        f"{result['name']:<34} {result['count']:>5}회 {result['ops_per_s']:>10.1f} ops/s  "
+        f"p50 {result['p50_ms']:>9.3f}  p95 {result['p95_ms']:>9.3f}  p99 {result['p99_ms']:>9.3f}  "
+        f"max {result['max_ms']:>9.3f} ms  peak {result['peak_kb']:>9.1f} KB"
+    )
+
+
+def compare(baseline, report, threshold):
+    """이전 결과와 p50 비교 후 회귀 항목 이름 목록 반환"""
+    previous = {result["name"]: result for result in baseline.get("results", [])}
+    regressions = []
+    print()
+    print(f"비교 기준: {baseline.get('commit', '?')} → {report['commit']} (허용 {threshold:.0f}%)")
+    for result in report["results"]:
+        before = previous.get(result["name"])
+        if before is None:
+            print(f"   {result['name']:<34} (새 항목)")
+            continue
+        change = (result["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100 if before["p50_ms"] else 0.0
+        regressed = (
+            change > threshold
+            and result["p50_ms"] - before["p50_ms"] > NOISE_FLOOR_MS
+        )
+        mark = "🚨" if regressed else "  "
+        print(
+            f"{mark} {result['name']:<34} p50 {before['p50_ms']:>9.3f} → {result['p50_ms']:>9.3f} ms "
+            f"({change:+6.1f}%)  peak {before['peak_kb']:>9.1f} → {result['peak_kb']:>9.1f} KB"
+        )
+        if regressed:
+            regressions.append(result["name"])
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="파싱/저장/보관함 불러오기 마이크로 벤치마크")
+    parser.add_argument("--quick", action="store_true", help="작은 보관함과 적은 반복으로 빠르게 실행")
+    parser.add_argument("--sizes", help="보관함 크기 목록 (예: 10,1000,10000)")
+    parser.add_argument("--seed", type=int, default=1234, help="합성 데이터 seed")
+    parser.add_argument("--output", type=Path, help="결과 JSON 경로 (기본: benchmarks/results/<커밋>.json)")
+    parser.add_argument("--compare", type=Path, help="비교할 이전 결과 JSON")
+    parser.add_argument("--threshold", type=float, default=20.0, help="회귀로 볼 p50 증가율 (%%)")
+    args = parser.parse_args(argv)
+
+    if args.sizes:
+        sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    else:
+        sizes = QUICK_ARCHIVE_SIZES if args.quick else ARCHIVE_SIZES
+    repeat = 20 if args.quick else 100
+    rng = random.Random(args.seed)
+    original_dir = storage.STORAGE_DIR
+
+    results = []
+    temp_roots = []
+    try:
+        benchmarks = pipeline_benchmarks(rng, repeat)
+        root, benchmark = save_benchmark(rng, 5 if args.quick else 20)
+        temp_roots.append(root)
+        benchmarks.append(benchmark)
+        for benchmark in benchmarks:
+            results.append(benchmark.run())
+            _print_result(results[-1])
+        for size in sizes:
+            print(f"--- 보관함 {size}건 만드는 중...")
+            root, archive = archive_benchmarks(rng, size, repeat)
+            temp_roots.append(root)
+            for benchmark in archive:
+                results.append(benchmark.run())
+                _print_result(results[-1])
+        print("--- 앱 첫 화면 측정 중...")
+        root, startup_results, startup_heavy = startup_benchmarks(rng, 3 if args.quick else 10)
+        temp_roots.append(root)
+        for result in startup_results:
+            results.append(result)
+            _print_result(result)
+        if startup_heavy:
+            print(f"🚨 첫 화면에서 생성용 모듈을 불러옴: {', '.join(startup_heavy)}")
+    finally:
+        storage.set_storage_dir(original_dir)
+        for root in temp_roots:
+            shutil.rmtree(root, ignore_errors=True)
+
+    commit, dirty = _git_commit()
+    report = {
+        "commit": commit,
+        "dirty": dirty,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": args.quick,
+        "seed": args.seed,
+        "sizes": list(sizes),
+        "results": results,
+        "startup_heavy_modules": startup_heavy,
+    }
+    output = args.output or RESULTS_DIR / f"{commit}{'-dirty' if dirty else ''}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 결과 저장: {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        if startup_heavy:
+            regressions.append("startup/heavy_modules")
+        if regressions:
+            print(f"\n🚨 {len(regressions)}개 항목이 {args.threshold:.0f}% 넘게 느려짐: {', '.join(regressions)}")
+            return 1
+        print("\n✅ 회귀 없음")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""앱 첫 화면(콜드 스타트) 측정, 새 프로세스 하나에서 한 번 실행
+
+사용법:
+    python -m benchmarks.startup [--storage-dir 디렉토리] [--trace]
+
+streamlit 은 서버가 이미 불러와 둔 상태를 흉내 내려고 먼저 import 한 뒤,
+app.py 를 처음 실행(첫 화면: 모듈 import + 화면 코드)하고 한 번 더 실행(재실행)한
+시간을 JSON 한 줄로 출력한다. AppTest 는 실행마다 수백 ms 의 자체 부담(컴포넌트
+검색, 대기 폴링)이 있어서 쓰지 않고 bare 모드로 스크립트만 실행한다.
+API 키 없이 실행하므로 저장된 콘티 보기 탭만 그려진다. 첫 화면에서 불러오면 안
+되는 무거운 모듈(HEAVY_MODULES)이 불려 왔는지도 함께 적는다.
+benchmarks.run 이 보관함을 만들어 두고 여러 번 띄워서 p50/p95 를 낸다.
+"""
+import argparse
+import json
+import logging
+import os
+import runpy
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+APP_PATH = Path(__file__).resolve().parent.parent / "app.py"
+# 콘티를 생성하기 전에는 불러오지 않아야 하는 모듈
+HEAVY_MODULES = ("google.generativeai", "google.api_core", "grpc", "generation", "model_client", "context_cache")
+
+
+def measure(storage_dir=None, trace=False):
+    """(첫 화면 초, 재실행 초, 첫 화면 최대 메모리 KB, 불려 온 무거운 모듈 목록)
+
+    storage_dir 가 없으면 빈 보관함으로 잰다 (카탈로그 생성 시간이 첫 화면에 들어감).
+    측정 기록(metrics.jsonl)은 임시 디렉토리에 쓴다.
+    """
+    import metrics
+    import storage
+
+    root = tempfile.mkdtemp(prefix="bench_startup_")
+    try:
+        storage.set_storage_dir(Path(storage_dir) if storage_dir else Path(root) / "stories")
+        metrics.METRICS_PATH = Path(root) / "metrics.jsonl"
+        loaded_before = set(sys.modules)
+
+        if trace:
+            tracemalloc.start()
+        started = time.perf_counter()
+        runpy.run_path(str(APP_PATH), run_name="__main__")
+        first_paint = time.perf_counter() - started
+        peak = 0
+        if trace:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        heavy = [name for name in HEAVY_MODULES if name in sys.modules and name not in loaded_before]
+        started = time.perf_counter()
+        runpy.run_path(str(APP_PATH), run_name="__main__")
+        rerun = time.perf_counter() - started
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return first_paint, rerun, peak / 1024, heavy
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="앱 첫 화면 시간 측정 (새 프로세스에서 한 번)")
+    parser.add_argument("--storage-dir", help="첫 화면에 보여줄 보관함 디렉토리 (기본: 빈 보관함)")
+    parser.add_argument("--trace", action="store_true", help="tracemalloc 으로 최대 메모리도 측정 (시간은 느려짐)")
+    args = parser.parse_args(argv)
+
+    # 키가 없을 때도 보기 탭이 그려져야 하므로 일부러 키 없이 실행
+    os.environ.pop("GEMINI_API_KEY", None)
+    os.environ.pop("STORY_BACKEND", None)
+    # 서버가 이미 불러온 상태 (bare 모드 경고는 끔)
+    import streamlit
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    first_paint, rerun, peak_kb, heavy = measure(args.storage_dir, args.trace)
+    print(json.dumps({
+        "first_paint_s": round(first_paint, 4),
+        "rerun_s": round(rerun, 4),
+        "peak_kb": round(peak_kb, 1),
+        "heavy_modules": heavy,
+    }))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
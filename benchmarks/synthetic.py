@@ -0,0 +1,144 @@
+"""벤치마크용 가짜 Gemini 응답과 콘티 보관함 만들기
+
+같은 seed 로 만든 random.Random 을 넘기면 항상 같은 데이터가 나온다.
+응답 종류(KINDS):
+- normal: 프롬프트대로 쓴 4컷 응답
+- large_svg: 컷마다 장식 도형이 수백 개 붙은 큰 SVG
+- malformed_fence: ```xml, 닫히지 않은 펜스, 펜스 없는 <svg> 가 섞인 응답
+- missing_separator: 컷 구분자(||||)가 빠진 응답
+"""
+from datetime import datetime, timedelta
+
+import storage
+from story_parser import parse_story_parts
+
+KINDS = ("normal", "large_svg", "malformed_fence", "missing_separator")
+
+_PLACES = ["쌀국수 집", "지하철 2호선", "편의점", "회사 탕비실", "동네 목욕탕", "PC방", "한강 공원", "세탁소"]
+_EVENTS = ["점심 메뉴 고르기", "우산 잃어버림", "택배 기다리기", "엘리베이터 고장", "다이어트 첫날", "알람 못 들음"]
+_LINES = ["앗!", "이게 뭐야...", "오늘은 운이 좋다!", "잠깐만요!", "...", "한 번만 더!", "왜 나만!"]
+_EXPRESSIONS = ["놀람", "기쁨", "당황", "졸림", "분노", "멍함"]
+_POSES = ["두 팔 들기", "주저앉기", "뛰어가기", "손 흔들기", "팔짱 끼기"]
+_COLORS = ["#e8f4f8", "#fdf6e3", "#f0e6ff", "#e6ffe6", "#fff0f0"]
+
+
+def make_svg(rng, extra_shapes=0):
+    """두더지 한 마리가 있는 400x400 SVG (extra_shapes 만큼 장식 도형 추가)"""
+    dx = rng.randint(-60, 60)
+    eye = rng.choice([4, 6, 8])
+    arm = rng.choice([-20, 0, 20])
+    shapes = [
+        '<rect width="400" height="400" fill="white"/>',
+        f'<rect x="0" y="0" width="400" height="300" fill="{rng.choice(_COLORS)}"/>',
+        '<rect x="0" y="300" width="400" height="100" fill="#ddd"/>',
+    ]
+    for _ in range(extra_shapes):
+        x, y = rng.uniform(0, 400), rng.uniform(0, 300)
+        shape = rng.randrange(3)
+        if shape == 0:
+            shapes.append(f'<circle cx="{x:.3f}" cy="{y:.3f}" r="{rng.uniform(1, 12):.3f}" fill="#{rng.randrange(0x1000000):06x}"/>')
+        elif shape == 1:
+            shapes.append(
+                f'<rect x="{x:.3f}" y="{y:.3f}" width="{rng.uniform(2, 30):.3f}" height="{rng.uniform(2, 30):.3f}" '
+                f'fill="#{rng.randrange(0x1000000):06x}" opacity="0.8"/>'
+            )
+        else:
+            shapes.append(
+                f'<path d="M{x:.3f} {y:.3f} Q{x + 10:.3f} {y - 15:.3f} {x + 20:.3f} {y:.3f}" '
+                'stroke="#555" stroke-width="1.5" fill="none"/>'
+            )
+    cx = 200 + dx
+    shapes += [
+        f'<ellipse cx="{cx}" cy="220" rx="50" ry="70" fill="#999"/>',
+        f'<ellipse cx="{cx}" cy="120" rx="35" ry="40" fill="#aaa"/>',
+        f'<circle cx="{cx - 15}" cy="110" r="{eye}" fill="black"/>',
+        f'<circle cx="{cx + 15}" cy="110" r="{eye}" fill="black"/>',
+        f'<ellipse cx="{cx}" cy="135" rx="8" ry="12" fill="black"/>',
+        f'<path d="M{cx - 10} 145 Q{cx} {150 + arm // 4} {cx + 10} 145" stroke="black" stroke-width="2" fill="none"/>',
+        f'<line x1="{cx - 50}" y1="200" x2="{cx - 70}" y2="{180 + arm}" stroke="#666" stroke-width="8" stroke-linecap="round"/>',
+        f'<line x1="{cx + 50}" y1="200" x2="{cx + 70}" y2="{180 - arm}" stroke="#666" stroke-width="8" stroke-linecap="round"/>',
+        f'<line x1="{cx - 30}" y1="290" x2="{cx - 40}" y2="350" stroke="#666" stroke-width="10" stroke-linecap="round"/>',
+        f'<line x1="{cx + 30}" y1="290" x2="{cx + 40}" y2="350" stroke="#666" stroke-width="10" stroke-linecap="round"/>',
+    ]
+    body = "\n  ".join(shapes)
+    return (
+        '<svg width="400" height="400" viewBox="0 0 400 400" xmlns="http://www.w3.org/2000/svg">\n'
+        f"  <!-- {rng.choice(_EXPRESSIONS)} -->\n  {body}\n</svg>"
+    )
+
+
+def make_cut_text(rng, cut_number):
+    """컷 하나의 설명 텍스트 (상황/표정/포즈/대사)"""
+    return (
+        f"## {cut_number}컷\n"
+        f"**상황:** {rng.choice(_PLACES)}에서 {rng.choice(_EVENTS)}.\n"
+        f"**캐릭터 위치:** 화면 {rng.choice(['왼쪽', '가운데', '오른쪽'])}\n"
+        f"**표정:** {rng.choice(_EXPRESSIONS)}\n"
+        f"**포즈:** {rng.choice(_POSES)}\n"
+        f"**대사:** 두더지: \"{rng.choice(_LINES)}\"\n"
+    )
+
+
+def make_title(rng):
+    return f"{rng.choice(_PLACES)}의 {rng.choice(_EVENTS)}"
+
+
+def make_response(rng, kind="normal", cuts=4):
+    """kind 종류의 가짜 응답 텍스트"""
+    if kind not in KINDS:
+        raise Exception(f"알 수 없는 응답 종류: {kind}")
+    extra_shapes = rng.randint(200, 400) if kind == "large_svg" else 0
+    sections = [f"제목: {make_title(rng)}"]
+    for cut_number in range(1, cuts + 1):
+        svg_code = make_svg(rng, extra_shapes)
+        section = make_cut_text(rng, cut_number)
+        if kind == "malformed_fence":
+            style = cut_number % 4
+            if style == 0:
+                section += f"```xml\n{svg_code}\n```"
+            elif style == 1:
+                section += f"```svg\n{svg_code}"  # 닫는 펜스 없음
+            elif style == 2:
+                section += svg_code  # 펜스 없이 바로 SVG
+            else:
+                section += f"```svg\n{svg_code}\n```\n설명을 덧붙였습니다."
+        else:
+            section += f"```svg\n{svg_code}\n```"
+        sections.append(section)
+    if kind == "missing_separator":
+        return sections[0] + "\n||||\n" + "\n\n".join(sections[1:])
+    return "\n||||\n".join(sections)
+
+
+def make_story(rng, kind="normal"):
+    """저장용 콘티 데이터 (title, episode, response_text, parts)"""
+    response_text = make_response(rng, kind)
+    title, parts = parse_story_parts(response_text)
+    episode = f"{rng.choice(_PLACES)}에서 {rng.choice(_EVENTS)} 하다가 생긴 일"
+    return title or make_title(rng), episode, response_text, parts
+
+
+def build_archive(rng, count):
+    """현재 저장 위치(storage.STORAGE_DIR)에 콘티 count 개를 파일로 바로 기록 (카탈로그는 건드리지 않음)
+
+    save_story() 는 건마다 카탈로그를 커밋하므로 수천 건을 만들 때는
+    파일만 쓰고 refresh_catalog() 한 번으로 색인한다.
+    """
+    storage.STORAGE_DIR.mkdir(parents=True, exist_ok=True)
+    started = datetime(2024, 1, 1)
+    # 응답 파싱은 비싸므로 몇 가지만 만들어서 제목/에피소드만 바꿔 재사용
+    templates = [make_story(rng) for _ in range(min(count, 50))]
+    filenames = []
+    for index in range(count):
+        _, episode, _, parts = templates[index % len(templates)]
+        created = started + timedelta(minutes=index)
+        title = f"{make_title(rng)} {index}"
+        filename = f"{created.strftime('%Y%m%d_%H%M%S')}_{index:05d}{storage.STORY_SUFFIX}"
+        storage.write_story_file(storage.STORAGE_DIR / filename, {
+            "title": title,
+            "episode": episode,
+            "created_at": created.isoformat(),
+            "parts": parts,
+        })
+        filenames.append(filename)
+    return filenames
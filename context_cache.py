@@ -0,0 +1,158 @@
+"""시스템 프롬프트를 명시적 컨텍스트 캐시에 올려 두고 쓰는 모델
+
+콘티 프롬프트(SYSTEM_PROMPT, CUT_PROMPT)는 수천 자라서 요청마다 같이 보내면
+입력 토큰 대부분이 프롬프트다. 모델 하나당 캐시를 한 번 만들어 두고
+(Gemini 의 CachedContent) 요청에는 에피소드만 보낸다.
+
+- 캐시는 CONTEXT_CACHE_TTL 동안 살고, 만료 CONTEXT_CACHE_RENEW_MARGIN 전부터
+  요청이 올 때 TTL 을 다시 늘린다.
+- 캐시를 만들 수 없으면 (프롬프트가 최소 토큰 수보다 짧음, 모델/요금제가 지원하지
+  않음, 일시적 오류 등) 프롬프트를 매번 같이 보내는 일반 모델로 부른다.
+  일시적 오류면 CONTEXT_CACHE_RETRY 뒤에 다시 만들어 본다.
+
+실제 캐시 생성/갱신/삭제는 백엔드(backends.py)의 create_context_cache(),
+renew_context_cache(), delete_context_cache(), model_from_cache(),
+create_inline_model() 이 맡는다. 네트워크 요청은 잠금 밖에서 하므로 캐시를
+만드는 동안에도 다른 세션은 기다리지 않는다.
+"""
+import threading
+import time
+
+from google.api_core import exceptions as api_exceptions
+
+# 캐시 수명 (초)
+CONTEXT_CACHE_TTL = 3600
+# 만료까지 이만큼 남으면 TTL 갱신 (초)
+CONTEXT_CACHE_RENEW_MARGIN = 300
+# 캐시 생성이 일시적으로 실패하면 이만큼 뒤에 다시 시도 (초)
+CONTEXT_CACHE_RETRY = 600
+# 이보다 짧은 프롬프트는 캐시 최소 토큰 수에 못 미치므로 캐시하지 않음 (글자 수)
+CONTEXT_CACHE_MIN_CHARS = 4000
+
+# 캐시가 서버에서 먼저 지워졌을 때 나는 오류
+_CACHE_GONE_ERRORS = (api_exceptions.NotFound, api_exceptions.PermissionDenied)
+
+
+class ContextCachedModel:
+    """generate_content 를 원래 모델처럼 쓰되 시스템 프롬프트는 캐시에서 읽는 모델
+
+    여러 스레드(세션)에서 같이 써도 되고, 캐시는 모델 하나당 하나만 쓴다
+    (동시에 만들어진 캐시는 하나만 남기고 지움).
+    """
+
+    def __init__(self, backend, model_name, system_prompt, ttl=CONTEXT_CACHE_TTL):
+        self.backend = backend
+        self.model_name = model_name
+        self.system_prompt = system_prompt
+        self.ttl = ttl
+        self.stats = {"cached_calls": 0, "inline_calls": 0, "cache_creates": 0, "cache_renewals": 0}
+        self._inline = None
+        self._cache = None
+        self._cached_model = None
+        self._expires = 0.0
+        self._retry_at = 0.0
+        self._disabled = len(system_prompt) < CONTEXT_CACHE_MIN_CHARS
+        self._lock = threading.Lock()
+
+    def _inline_model(self):
+        if self._inline is None:
+            self._inline = self.backend.create_inline_model(self.model_name, self.system_prompt)
+        return self._inline
+
+    def _drop_cache(self):
+        self._cache = None
+        self._cached_model = None
+        self._expires = 0.0
+
+    def _renew(self, cache, now):
+        """TTL 갱신 (잠금 밖에서 부름), 그 사이 캐시가 바뀌었으면 결과는 버림"""
+        try:
+            self.backend.renew_context_cache(cache, self.ttl)
+        except api_exceptions.NotFound:
+            # 이미 만료돼 지워짐 → 새로 만듦
+            renewed, gone = False, True
+        except api_exceptions.GoogleAPIError:
+            # 갱신만 실패했으면 남은 시간 동안은 그대로 씀
+            renewed, gone = False, False
+        else:
+            renewed, gone = True, False
+        with self._lock:
+            if self._cache is not cache:
+                return
+            if renewed:
+                self._expires = now + self.ttl
+                self.stats["cache_renewals"] += 1
+            elif gone or self._expires <= now:
+                self._drop_cache()
+
+    def _create(self, now):
+        """캐시 생성 (잠금 밖에서 부름), 다른 스레드가 먼저 만들었으면 새 캐시는 지움"""
+        try:
+            cache = self.backend.create_context_cache(self.model_name, self.system_prompt, self.ttl)
+            cached_model = self.backend.model_from_cache(cache)
+        except (api_exceptions.InvalidArgument, api_exceptions.FailedPrecondition):
+            # 프롬프트가 최소 토큰 수보다 짧거나 모델이 캐시를 지원하지 않음
+            with self._lock:
+                self._disabled = True
+            return
+        except api_exceptions.GoogleAPIError:
+            with self._lock:
+                self._retry_at = now + CONTEXT_CACHE_RETRY
+            return
+        with self._lock:
+            self.stats["cache_creates"] += 1
+            if self._cached_model is None:
+                self._cache = cache
+                self._cached_model = cached_model
+                self._expires = now + self.ttl
+                return
+        try:
+            self.backend.delete_context_cache(cache)
+        except api_exceptions.GoogleAPIError:
+            # 못 지워도 TTL 이 지나면 서버에서 사라짐
+            pass
+
+    def _wants(self, now):
+        """지금 해야 할 일 ("create" / "renew" / None), 잠금 안에서 부름"""
+        if self._disabled or now < self._retry_at:
+            return None
+        if self._cached_model is None:
+            return "create"
+        if self._expires - now < CONTEXT_CACHE_RENEW_MARGIN:
+            return "renew"
+        return None
+
+    def _model(self):
+        """이번 요청에 쓸 (모델, 캐시 사용 여부)"""
+        now = time.monotonic()
+        # 상태는 잠금 안에서 보고, 캐시 생성/갱신 요청은 잠금 밖에서 보냄
+        with self._lock:
+            action, cache = self._wants(now), self._cache
+        if action == "renew":
+            self._renew(cache, now)
+            with self._lock:
+                action = self._wants(now)
+        if action == "create":
+            self._create(now)
+        with self._lock:
+            if self._cached_model is not None:
+                self.stats["cached_calls"] += 1
+                return self._cached_model, True
+            self.stats["inline_calls"] += 1
+            return self._inline_model(), False
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        """원래 모델의 generate_content 와 같은 사용법"""
+        model, cached = self._model()
+        if not cached:
+            return model.generate_content(contents, stream=stream, **kwargs)
+        try:
+            return model.generate_content(contents, stream=stream, **kwargs)
+        except _CACHE_GONE_ERRORS:
+            # 캐시가 서버에서 먼저 지워짐 → 다음 요청에서 새로 만들고, 이번 요청은 프롬프트를 같이 보냄
+            with self._lock:
+                if self._cached_model is model:
+                    self._drop_cache()
+                self.stats["inline_calls"] += 1
+                inline = self._inline_model()
+            return inline.generate_content(contents, stream=stream, **kwargs)
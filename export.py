@@ -0,0 +1,269 @@
+"""인스타그램용 콘티 내보내기 (네 컷 한 장 이미지 + ZIP 묶음)
+
+콘티 한 편을 제목과 컷별 대사가 들어간 PNG 한 장으로 만든다.
+- grid: 네 컷을 2x2 격자로 (피드용 정사각형에 가까운 그림)
+- strip: 네 컷을 위에서 아래로 (세로 스트립)
+
+여러 편은 ZIP 하나로 묶는다. 한 편씩 그려서 바로 ZIP 에 쓰므로 메모리에는
+그리는 중인 몇 편만 올라가고, 편수가 EXPORT_POOL_MIN 이상이면 프로세스
+풀에서 나눠 그린다. 컷 그림은 저장된 parts 의 svg_code 를
+thumbnails.rasterize_svg() 로 래스터화한다.
+
+한글 글꼴은 STORY_EXPORT_FONT 환경 변수, 앱 옆 fonts/NanumGothic.ttf, 흔한 설치
+경로(나눔고딕, Noto CJK, 맑은 고딕 등) 순서로 찾고, 없으면 Pillow 기본 글꼴을
+쓴다 (한글이 네모로 나옴).
+
+사용법 (앱 없이 ZIP 파일로 바로 저장):
+    python export.py --output stories.zip
+    python export.py --output may.zip --since 2024-05-01 --until 2024-05-31
+    python export.py --output ramen.zip --query 쌀국수 --layout strip
+"""
+import argparse
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image, ImageDraw, ImageFont
+
+import storage
+from thumbnails import rasterize_svg
+
+# 배치 이름 (화면 표시용)
+EXPORT_LAYOUTS = {"grid": "2x2", "strip": "세로 스트립"}
+# 컷 하나의 크기 (px), 2x2 는 가로 1080 px 에 맞춤
+SHEET_CUT_SIZE = 504
+SHEET_CUTS = 4
+PADDING = 24
+TITLE_FONT_SIZE = 40
+TEXT_FONT_SIZE = 26
+MAX_TITLE_LINES = 2
+MAX_CAPTION_LINES = 3
+# 이 편수부터 프로세스 풀에서 그림 (적으면 프로세스 띄우는 비용이 더 큼)
+EXPORT_POOL_MIN = 8
+EXPORT_MAX_WORKERS = 4
+
+_FONT_CANDIDATES = (
+    str(Path(__file__).parent / "fonts" / "NanumGothic.ttf"),
+    "/usr/share/fonts/truetype/nanum/NanumGothic.ttf",
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/google-noto-cjk/NotoSansCJK-Regular.ttc",
+    "/System/Library/Fonts/AppleSDGothicNeo.ttc",
+    "C:/Windows/Fonts/malgun.ttf",
+)
+_DIALOGUE = re.compile(r"\*\*대사\s*(?::\*\*|\*\*\s*:)\s*(.+)")
+_TEXT_COLOR = (40, 40, 40)
+_BORDER_COLOR = (220, 220, 220)
+
+
+@lru_cache(maxsize=None)
+def _font(size):
+    paths = [os.environ.get("STORY_EXPORT_FONT"), *_FONT_CANDIDATES]
+    for path in paths:
+        if path and os.path.exists(path):
+            try:
+                return ImageFont.truetype(path, size)
+            except OSError:
+                continue
+    return ImageFont.load_default(size)
+
+
+def _line_height(size):
+    return int(size * 1.4)
+
+
+def cut_dialogue(part):
+    """컷 내용에서 대사만 (여러 줄이면 줄바꿈으로 이음, 없으면 "")"""
+    lines = [match.group(1).strip() for match in _DIALOGUE.finditer(part.get("text_content") or "")]
+    return "\n".join(line for line in lines if line and line != "없음")
+
+
+def _wrap(draw, text, font, width, max_lines):
+    """글자 단위로 width 에 맞춰 줄바꿈 (넘치면 마지막 줄을 … 으로)"""
+    lines = []
+    for paragraph in text.splitlines():
+        line = ""
+        for char in paragraph:
+            if line and draw.textlength(line + char, font=font) > width:
+                lines.append(line.rstrip())
+                line = char.lstrip()
+            else:
+                line += char
+        if line:
+            lines.append(line)
+    if len(lines) > max_lines:
+        lines = lines[:max_lines]
+        lines[-1] = lines[-1][:-1] + "…"
+    return lines
+
+
+def compose_sheet(story, layout="grid", cut_size=SHEET_CUT_SIZE):
+    """콘티 한 편을 제목 + 네 컷 + 컷별 대사 이미지 한 장으로 (PIL 이미지)"""
+    if layout not in EXPORT_LAYOUTS:
+        raise Exception(f"알 수 없는 배치입니다: {layout}")
+    parts = (story.get("parts") or [])[:SHEET_CUTS]
+    columns = 2 if layout == "grid" else 1
+    width = columns * cut_size + (columns + 1) * PADDING
+    title_font = _font(TITLE_FONT_SIZE)
+    text_font = _font(TEXT_FONT_SIZE)
+    title_line = _line_height(TITLE_FONT_SIZE)
+    text_line = _line_height(TEXT_FONT_SIZE)
+
+    # 크기를 먼저 계산 (대사 줄 수에 따라 행 높이가 달라짐)
+    measure = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+    title_lines = _wrap(measure, str(story.get("title") or "제목 없음"), title_font, width - 2 * PADDING, MAX_TITLE_LINES)
+    captions = [_wrap(measure, cut_dialogue(part), text_font, cut_size, MAX_CAPTION_LINES) for part in parts]
+    rows = [captions[start:start + columns] for start in range(0, len(parts), columns)]
+    row_heights = [cut_size + PADDING + max(len(lines) for lines in row) * text_line for row in rows]
+    height = PADDING + len(title_lines) * title_line + PADDING + sum(row_heights)
+
+    sheet = Image.new("RGB", (width, height), (255, 255, 255))
+    draw = ImageDraw.Draw(sheet)
+    y = PADDING
+    for line in title_lines:
+        draw.text((PADDING, y), line, font=title_font, fill=_TEXT_COLOR)
+        y += title_line
+    y += PADDING
+    for row_index, row_height in enumerate(row_heights):
+        for column in range(columns):
+            index = row_index * columns + column
+            if index >= len(parts):
+                break
+            x = PADDING + column * (cut_size + PADDING)
+            if parts[index].get("svg_code"):
+                cut = rasterize_svg(parts[index]["svg_code"], cut_size)
+                sheet.paste(cut, (x, y), cut)
+            draw.rectangle([x - 1, y - 1, x + cut_size, y + cut_size], outline=_BORDER_COLOR, width=2)
+            text_y = y + cut_size + PADDING // 2
+            for line in captions[index]:
+                draw.text((x, text_y), line, font=text_font, fill=_TEXT_COLOR)
+                text_y += text_line
+        y += row_height
+    return sheet
+
+
+def sheet_bytes(story, layout="grid"):
+    """compose_sheet() 결과를 PNG 바이트로"""
+    buffer = BytesIO()
+    compose_sheet(story, layout).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def sheet_filename(handle, index=None):
+    """ZIP 안/다운로드 파일 이름 (저장 파일명 앞부분 + 순번)"""
+    stem = handle.filename.split(".", 1)[0]
+    return f"{index:03d}_{stem}.png" if index is not None else f"{stem}.png"
+
+
+def _init_worker(storage_dir):
+    storage.set_storage_dir(storage_dir)
+
+
+def _render_file(filename, layout):
+    """프로세스 풀 작업: 저장된 콘티 하나를 읽어서 PNG 바이트로 (읽을 수 없으면 None)"""
+    story = storage.load_story(filename)
+    if story is None:
+        return None
+    return sheet_bytes(story, layout)
+
+
+def iter_sheets(handles, layout="grid", workers=None):
+    """(핸들, PNG 바이트 또는 None) 을 handles 순서대로 내놓음
+
+    편수가 많으면 프로세스 풀에서 그리되, 한 번에 workers 의 두 배까지만
+    맡겨 두어서 결과가 메모리에 쌓이지 않게 한다.
+    """
+    handles = list(handles)
+    workers = workers or min(EXPORT_MAX_WORKERS, os.cpu_count() or 1)
+    if len(handles) < EXPORT_POOL_MIN or workers <= 1:
+        for handle in handles:
+            yield handle, _render_file(handle.filename, layout)
+        return
+
+    # 앱 서버(여러 스레드)에서 fork 하지 않도록 spawn 사용
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                             initargs=(str(storage.STORAGE_DIR),)) as pool:
+        pending = deque()
+        remaining = iter(handles)
+
+        def submit_next():
+            handle = next(remaining, None)
+            if handle is not None:
+                pending.append((handle, pool.submit(_render_file, handle.filename, layout)))
+
+        for _ in range(workers * 2):
+            submit_next()
+        while pending:
+            handle, future = pending.popleft()
+            submit_next()
+            yield handle, future.result()
+
+
+def write_zip(handles, fileobj, layout="grid", workers=None):
+    """handles 의 콘티를 한 편씩 그려서 fileobj 에 ZIP 으로 씀, (넣은 편수, 빠진 파일명 목록) 반환
+
+    PNG 는 이미 압축돼 있으므로 다시 압축하지 않고 그대로 넣는다.
+    """
+    written = 0
+    skipped = []
+    with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_STORED) as archive:
+        for handle, data in iter_sheets(handles, layout, workers):
+            if data is None:
+                skipped.append(handle.filename)
+                continue
+            written += 1
+            archive.writestr(sheet_filename(handle, written), data)
+    return written, skipped
+
+
+def export_zip_file(handles, layout="grid", workers=None):
+    """ZIP 을 디스크 임시 파일에 만들어서 처음 위치로 되감은 파일 객체 반환 (닫으면 지워짐)"""
+    fileobj = tempfile.TemporaryFile(prefix="story_export_", suffix=".zip")
+    try:
+        write_zip(handles, fileobj, layout, workers)
+    except BaseException:
+        fileobj.close()
+        raise
+    fileobj.seek(0)
+    return fileobj
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="저장된 콘티를 인스타그램용 이미지 ZIP 으로 내보냅니다.")
+    parser.add_argument("--output", required=True, help="만들 ZIP 파일 경로")
+    parser.add_argument("--layout", choices=list(EXPORT_LAYOUTS), default="grid", help="배치 (기본: grid)")
+    parser.add_argument("--since", type=date.fromisoformat, help="이 날짜부터 (YYYY-MM-DD)")
+    parser.add_argument("--until", type=date.fromisoformat, help="이 날짜까지 (YYYY-MM-DD, 포함)")
+    parser.add_argument("--query", help="검색어 (검색 결과만 내보냄)")
+    parser.add_argument("--limit", type=int, default=100, help="검색 결과 최대 개수")
+    parser.add_argument("--workers", type=int, help=f"프로세스 수 (기본: CPU 수, 최대 {EXPORT_MAX_WORKERS})")
+    args = parser.parse_args(argv)
+
+    if args.query:
+        handles = storage.search_stories(args.query, limit=args.limit)
+    else:
+        handles = storage.list_stories_between(args.since or date.min, args.until or date(9998, 12, 31))
+    if not handles:
+        print("내보낼 콘티가 없습니다.")
+        return 1
+
+    with open(args.output, "wb") as f:
+        written, skipped = write_zip(handles, f, args.layout, args.workers)
+    print(f"📦 {written}편 → {args.output}")
+    for filename in skipped:
+        print(f"⚠️ 읽을 수 없어서 뺐습니다: {filename}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+import hashlib
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from backends import FAST_MODEL_NAME, MODEL_NAME, get_backend
+from model_client import DEFAULT_DEADLINE, ResilientModel
+from prompts import CUT_PROMPT, OUTLINE_PROMPT, SYSTEM_PROMPT, build_cut_request
+from response_cache import make_cache_key
+from story_parser import compose_response_text, parse_story_parts
+from svg_validator import check_parts
+
+# 모델 단계: (주 모델, 마감이 가까울 때 대체할 모델)
+MODEL_TIERS = {
+    "quality": (MODEL_NAME, FAST_MODEL_NAME),
+    "fast": (FAST_MODEL_NAME, None),
+}
+# 단계별 요청 하나의 마감 시간 (초)
+# quality 가 넘기면 fast 모델을 fast 마감 시간만큼 더 기다림
+TIER_DEADLINES = {
+    "quality": DEFAULT_DEADLINE,
+    "fast": 60.0,
+}
+
+# 컷별 병렬 생성에서 동시에 보내는 최대 요청 수
+MAX_PARALLEL_CUTS = 4
+
+# 컷별 병렬 생성의 캐시 키에 쓰는 프롬프트 (두 단계 프롬프트를 합친 것)
+PARALLEL_PROMPT_KEY = OUTLINE_PROMPT + CUT_PROMPT
+
+# "## 1컷" 같은 컷 머리말
+_CUT_HEADING = re.compile(r"^\s*#+\s*\d+\s*컷\s*", re.MULTILINE)
+
+# 프로세스 전체에서 재사용하는 모델 ((백엔드, API 키 해시, 모델, 프롬프트 해시) → 모델)
+_models = {}
+_models_lock = threading.Lock()
+
+
+def create_model(api_key, model_name=MODEL_NAME, system_prompt=SYSTEM_PROMPT):
+    """모델 객체 (STORY_BACKEND 로 고른 백엔드, 기본은 Gemini)
+
+    같은 API 키/모델/프롬프트면 프로세스 안에서 한 번 만든 모델을 돌려준다.
+    클라이언트 설정과 시스템 프롬프트 컨텍스트 캐시(context_cache.py)를
+    요청마다 새로 하지 않기 위함이다.
+    """
+    backend = get_backend()
+    key = (
+        backend,
+        hashlib.sha256((api_key or "").encode("utf-8")).hexdigest(),
+        model_name,
+        hashlib.sha1(system_prompt.encode("utf-8")).hexdigest(),
+    )
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            model = _models[key] = backend.create_model(api_key, model_name, system_prompt)
+    return model
+
+
+def model_cache_stats():
+    """지금까지 만든 모델들의 컨텍스트 캐시 사용 횟수 합계"""
+    with _models_lock:
+        models = list(_models.values())
+    totals = {}
+    for model in models:
+        for name, count in getattr(model, "stats", {}).items():
+            totals[name] = totals.get(name, 0) + count
+    return totals
+
+
+def create_client(api_key, system_prompt=SYSTEM_PROMPT, tier="quality", deadline=None):
+    """마감 시간/재시도/헤징/빠른 모델 대체가 붙은 모델 (model_client.ResilientModel)
+
+    tier 는 MODEL_TIERS 의 키. 지연 시간 p95 는 (모델, 프롬프트) 별로 따로 잰다.
+    """
+    if tier not in MODEL_TIERS:
+        raise Exception(f"알 수 없는 모델 단계: {tier}")
+    primary_name, fallback_name = MODEL_TIERS[tier]
+    fallback = None
+    if fallback_name:
+        fallback = (fallback_name, create_model(api_key, fallback_name, system_prompt))
+    return ResilientModel(
+        (primary_name, create_model(api_key, primary_name, system_prompt)),
+        fallback,
+        deadline=deadline or TIER_DEADLINES[tier],
+        fallback_deadline=TIER_DEADLINES["fast"] if fallback else None,
+        latency_key=hashlib.sha1(system_prompt.encode("utf-8")).hexdigest()[:8],
+    )
+
+
+def generate_story_text(model, episode, cache=None, model_name=MODEL_NAME):
+    """에피소드 하나로 콘티 응답 텍스트 생성
+
+    cache(ResponseCache)가 주어지면 먼저 확인하고, 새로 받은 응답은 저장한다.
+    (응답 텍스트, 캐시 적중 여부)를 반환한다.
+    """
+    cache_key = make_cache_key(episode, model_name, SYSTEM_PROMPT)
+    if cache is not None:
+        response_text = cache.get(cache_key)
+        if response_text is not None:
+            return response_text, True
+
+    response_text = model.generate_content(episode).text
+    if cache is not None and response_text:
+        cache.put(cache_key, response_text, model_name)
+    return response_text, False
+
+
+def create_parallel_models(api_key, model_name=MODEL_NAME):
+    """컷별 병렬 생성에 쓰는 (줄거리 모델, 컷 모델) 생성"""
+    return (
+        create_model(api_key, model_name, OUTLINE_PROMPT),
+        create_model(api_key, model_name, CUT_PROMPT),
+    )
+
+
+def create_parallel_clients(api_key, tier="quality"):
+    """create_parallel_models() 의 create_client() 판 (줄거리 클라이언트, 컷 클라이언트)"""
+    return (
+        create_client(api_key, OUTLINE_PROMPT, tier),
+        create_client(api_key, CUT_PROMPT, tier),
+    )
+
+
+def _generate_cut(cut_model, request, cut_number, on_response=None):
+    """컷 하나의 상세 콘티 + SVG 생성 후 part 형태로 반환"""
+    response = cut_model.generate_content(request)
+    if on_response:
+        on_response(response)
+    text = response.text
+    _, parts = parse_story_parts("||||" + text)
+    part = parts[0]
+    # 모델이 구분선을 섞어 보내도 한 컷으로 합침
+    for extra in parts[1:]:
+        part["text_content"] = f"{part['text_content']}\n\n{extra['text_content']}".strip()
+        if not part["svg_code"]:
+            part["svg_code"] = extra["svg_code"]
+    part["cut_number"] = cut_number
+    return part
+
+
+def generate_story_parallel(outline_model, cut_model, episode, on_outline=None, on_cut=None, on_response=None):
+    """2단계 컷별 병렬 생성
+
+    짧은 첫 호출로 제목과 컷별 줄거리를 받고, 컷마다 상세 콘티와 SVG를
+    동시에 요청한다. 전체 지연 시간은 네 컷의 합이 아니라 가장 느린 컷 하나에
+    가까워진다. 결과는 한 번에 생성한 응답과 같은 형식의 텍스트로 합쳐서
+    반환하므로 parse_story_parts()/save_story()를 그대로 쓸 수 있다.
+
+    on_outline(title, outlines), on_cut(part) 콜백은 호출한 스레드에서
+    완성되는 순서대로 불린다. on_response(response) 는 모델 응답마다
+    (토큰 수 기록용) 작업 스레드에서 불린다.
+    """
+    response = outline_model.generate_content(episode)
+    if on_response:
+        on_response(response)
+    outline_text = response.text
+    title, outline_parts = parse_story_parts(outline_text)
+    outlines = [_CUT_HEADING.sub("", part["text_content"], count=1).strip() for part in outline_parts]
+    outlines = [outline for outline in outlines if outline]
+    if not outlines:
+        raise Exception(f"줄거리 생성 실패: 컷 구분을 찾지 못했습니다\n{outline_text[:200]}")
+    if on_outline:
+        on_outline(title, outlines)
+
+    parts = [None] * len(outlines)
+    with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_CUTS, len(outlines))) as pool:
+        futures = {
+            pool.submit(
+                _generate_cut,
+                cut_model,
+                build_cut_request(episode, title, outlines, cut_number),
+                cut_number,
+                on_response,
+            ): cut_number
+            for cut_number in range(1, len(outlines) + 1)
+        }
+        for future in as_completed(futures):
+            part = future.result()
+            parts[futures[future] - 1] = part
+            if on_cut:
+                on_cut(part)
+
+    return compose_response_text(title, parts)
+
+
+def repair_story_parts(episode, title, parts_data, cut_model=None, on_response=None):
+    """컷 SVG를 검사해서 간단한 문제는 바로 고치고, 남은 컷만 다시 생성
+
+    통과한 컷은 그대로 두고 실패한 컷만 cut_model(CUT_PROMPT 모델)로 동시에
+    다시 요청한다. 다시 받은 컷도 검사를 통과해야 바꿔 넣는다.
+    cut_model 이 없으면 로컬 수리만 한다. on_response 는 generate_story_parallel() 과 같다.
+    (parts, 다시 생성한 컷 번호 목록, {컷 번호: 남은 문제}) 를 반환한다.
+    """
+    parts, failed, _ = check_parts(parts_data)
+    if not failed or cut_model is None:
+        return parts, [], failed
+
+    # 각 컷의 콘티 내용을 줄거리로 써서 전체 흐름을 알려줌
+    outlines = [part["text_content"] for part in parts]
+    regenerated = []
+    with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_CUTS, len(failed))) as pool:
+        futures = {
+            pool.submit(
+                _generate_cut,
+                cut_model,
+                build_cut_request(episode, title, outlines, cut_number),
+                cut_number,
+                on_response,
+            ): cut_number
+            for cut_number in failed
+        }
+        for future in as_completed(futures):
+            cut_number = futures[future]
+            try:
+                new_parts, new_failed, _ = check_parts([future.result()])
+            except Exception as e:
+                failed[cut_number].append(f"다시 생성 실패: {e}")
+                continue
+            if new_failed:
+                continue
+            parts[cut_number - 1] = new_parts[0]
+            regenerated.append(cut_number)
+            del failed[cut_number]
+    return parts, sorted(regenerated), failed
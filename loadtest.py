@@ -0,0 +1,340 @@
+"""여러 사용자가 동시에 앱을 쓰는 상황을 흉내 내는 부하 테스트 (오프라인)
+
+가짜 Gemini 백엔드(backends.FakeBackend) 위에서 Streamlit AppTest 세션 N개를
+스레드로 동시에 돌린다. 각 세션은 생성 → 저장 → 검색 → 목록 → 삭제를 반복한다.
+한 프로세스 안에서 돌리므로 Streamlit 서버 프로세스 하나가 여러 세션을
+처리할 때처럼 카탈로그, 응답 캐시, GIL 을 함께 쓴다.
+
+사용법:
+    python loadtest.py --sessions 8 --iterations 5
+    python loadtest.py --sessions 16 --duration 60 --latency 1-4 --rate-limit-rate 0.05
+    python loadtest.py --sessions 4 --preload 10000 --replay-dir response_cache
+
+동작별 횟수/오류/p50/p95/p99/max(초)와 전체 처리량(동작/초)을 출력한다.
+보관함, 응답 캐시, 측정 기록은 임시 디렉토리를 쓰므로 실제 데이터는 건드리지 않는다.
+"""
+import argparse
+import json
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from streamlit.testing.v1 import AppTest
+
+import metrics
+import response_cache
+import storage
+from backends import FakeBackend, FakeSettings, set_backend
+from generation import model_cache_stats
+from metrics import percentile
+
+APP_PATH = Path(__file__).parent / "app.py"
+# 세션 하나가 반복하는 동작 순서
+ACTIONS = ("generate", "save", "search", "browse", "delete")
+GENERATION_MODES = ("한 번에 생성", "컷별 병렬 생성 (더 빠름)", "간단 장면 (가장 빠름)")
+SEARCH_WORDS = ("쌀국수", "지하철", "택배", "편의점", "알람", "두더지")
+# 캐시 적중용으로 여러 세션이 같이 쓰는 에피소드
+SHARED_EPISODES = tuple(f"오늘도 {word} 때문에 페럿한테 혼난 이야기" for word in SEARCH_WORDS)
+
+
+
+@contextmanager
+def concurrent_app_tests():
+    """AppTest 세션 여러 개를 스레드로 동시에 돌릴 수 있게 맞춤 (부하 테스트 동안만)
+
+    AppTest.run() 은 한 번에 하나씩 도는 것을 가정해서
+    - 실행하는 동안만 global.appTest 설정과 Runtime 싱글턴을 만들었다가 끝나면 지우고
+    - 실행할 때마다 app.py 를 새로 컴파일한다 (CPython 3.11 에서는 여러 스레드가
+      동시에 ast.parse 를 부르면 SystemError 가 난다).
+    실제 Streamlit 서버처럼 프로세스 하나에 런타임 하나, 컴파일 캐시 하나를 쓰게 한다.
+    """
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.dataframe_source_manager import DataframeSourceManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    runtime.dataframe_source_mgr = DataframeSourceManager()
+    script_cache = ScriptCache()
+    compile_script = script_cache.get_bytecode
+    saved_app_test = config.get_option("global.appTest")
+    config.set_option("global.appTest", True)
+    try:
+        with (
+            patch.object(Runtime, "instance", classmethod(lambda cls: runtime)),
+            patch.object(Runtime, "exists", classmethod(lambda cls: True)),
+            patch.object(ScriptCache, "get_bytecode", lambda self, script_path: compile_script(script_path)),
+        ):
+            yield
+    finally:
+        config.set_option("global.appTest", saved_app_test)
+
+
+class LoadResult:
+    """동작별 소요 시간과 오류를 모으는 곳 (세션 스레드들이 함께 씀)"""
+
+    def __init__(self):
+        self.samples = {action: [] for action in ACTIONS}
+        self.errors = {action: 0 for action in ACTIONS}
+        self.error_messages = []
+        self._lock = threading.Lock()
+
+    def record(self, action, seconds, error=None):
+        with self._lock:
+            self.samples[action].append(seconds)
+            if error:
+                self.errors[action] += 1
+                if len(self.error_messages) < 20:
+                    self.error_messages.append(f"{action}: {error}")
+
+    def rows(self):
+        rows = []
+        for action in ACTIONS:
+            values = self.samples[action]
+            rows.append({
+                "action": action,
+                "count": len(values),
+                "errors": self.errors[action],
+                "p50": round(percentile(values, 50), 3),
+                "p95": round(percentile(values, 95), 3),
+                "p99": round(percentile(values, 99), 3),
+                "max": round(max(values), 3) if values else 0.0,
+            })
+        return rows
+
+
+def _button(at, key=None, prefix=None, label=None):
+    for button in at.button:
+        if key is not None and button.key == key:
+            return button
+        if prefix is not None and (button.key or "").startswith(prefix):
+            return button
+        if label is not None and button.label == label:
+            return button
+    return None
+
+
+def _failure(at):
+    """실행 결과에서 오류 메시지 (없으면 None)"""
+    if at.exception:
+        return at.exception[0].value
+    for error in at.error:
+        if "에러 발생" in error.value:
+            return error.value
+    return None
+
+
+class Session:
+    """사용자 한 명 (AppTest 하나를 계속 다시 실행)"""
+
+    def __init__(self, index, args, result):
+        self.index = index
+        self.args = args
+        self.result = result
+        self.rng = random.Random(args.seed * 1000 + index)
+        self.at = None
+
+    def _open(self):
+        """새 브라우저 탭으로 접속 (세션 상태 초기화)"""
+        self.at = AppTest.from_file(str(APP_PATH), default_timeout=self.args.timeout)
+        self.at.run()
+
+    def _run(self, action, prepare):
+        started = time.perf_counter()
+        try:
+            if prepare() is False:
+                return
+            self.at.run(timeout=self.args.timeout)
+            error = _failure(self.at)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        self.result.record(action, time.perf_counter() - started, error)
+        if error and not self.at.text_area:
+            # 화면이 그려지지 않았으면 새로고침한 것처럼 다시 접속
+            self._open()
+
+    def _episode(self, iteration):
+        if self.rng.random() < self.args.cache_hit_rate:
+            return self.rng.choice(SHARED_EPISODES)
+        return f"세션 {self.index}의 {iteration}번째 이야기: {self.rng.choice(SEARCH_WORDS)} 대소동"
+
+    def _generate(self, iteration):
+        self.at.text_area[0].input(self._episode(iteration))
+        self.at.radio[0].set_value(self.rng.choice(GENERATION_MODES))
+        button = _button(self.at, label="콘티 & 그림 뽑기 🎨")
+        if button is None:
+            return False
+        button.click()
+
+    def _save(self):
+        button = _button(self.at, key="save_story")
+        if button is None or button.disabled:
+            return False
+        button.click()
+
+    def _search(self):
+        if not self.at.text_input:
+            return False
+        self.at.text_input[0].input(self.rng.choice(SEARCH_WORDS))
+
+    def _browse(self):
+        if not self.at.text_input:
+            return False
+        self.at.text_input[0].input("")
+        self.at.run(timeout=self.args.timeout)
+        # 갤러리에서 콘티 하나를 골라 펼쳐 봄 (삭제 버튼은 고른 뒤에 보임)
+        button = _button(self.at, prefix="open_")
+        if button is not None:
+            button.click()
+
+    def _delete(self):
+        button = _button(self.at, prefix="delete_")
+        if button is None:
+            return False
+        button.click()
+
+    def run(self, deadline):
+        self._open()
+        iteration = 0
+        while True:
+            iteration += 1
+            if self.args.iterations and iteration > self.args.iterations:
+                break
+            if deadline and time.monotonic() >= deadline:
+                break
+            self._run("generate", lambda: self._generate(iteration))
+            self._run("save", self._save)
+            self._run("search", self._search)
+            self._run("browse", self._browse)
+            if self.rng.random() < self.args.delete_rate:
+                self._run("delete", self._delete)
+
+
+def print_report(result, wall, backend, sessions):
+    rows = result.rows()
+    total = sum(row["count"] for row in rows)
+    print()
+    print(f"{'동작':<10} {'횟수':>6} {'오류':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} (초)")
+    for row in rows:
+        print(
+            f"{row['action']:<10} {row['count']:>6} {row['errors']:>6} "
+            f"{row['p50']:>8.3f} {row['p95']:>8.3f} {row['p99']:>8.3f} {row['max']:>8.3f}"
+        )
+    print()
+    print(f"세션 {sessions}개, {wall:.1f}초 동안 동작 {total}회 → {total / wall if wall else 0:.2f} 동작/초")
+    print(f"가짜 백엔드 호출 {backend.calls}회 (주입한 오류 {backend.injected_errors}회)")
+    context_cache = model_cache_stats()
+    print(
+        f"컨텍스트 캐시: 생성 {context_cache.get('cache_creates', 0)}회, 갱신 {context_cache.get('cache_renewals', 0)}회, "
+        f"캐시 사용 호출 {context_cache.get('cached_calls', 0)}회, 프롬프트 포함 호출 {context_cache.get('inline_calls', 0)}회"
+    )
+    if result.error_messages:
+        print("\n오류 예시:")
+        for message in result.error_messages[:5]:
+            print(f"  - {message[:200]}")
+    return {
+        "sessions": sessions,
+        "wall_s": round(wall, 3),
+        "actions": total,
+        "actions_per_s": round(total / wall, 3) if wall else 0.0,
+        "backend_calls": backend.calls,
+        "context_cache": context_cache,
+        "injected_errors": backend.injected_errors,
+        "rows": rows,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="가짜 백엔드로 동시 세션 부하 테스트를 합니다 (네트워크 사용 안 함).")
+    parser.add_argument("--sessions", type=int, default=4, help="동시 세션 수 (기본 4)")
+    parser.add_argument("--iterations", type=int, default=3, help="세션마다 반복 횟수 (0이면 --duration 까지)")
+    parser.add_argument("--duration", type=float, default=0, help="최대 실행 시간 (초, 0이면 제한 없음)")
+    parser.add_argument("--latency", default="0.2-1.0", help="가짜 응답 지연 (초, 예: 2 또는 0.5-3)")
+    parser.add_argument("--chunk-chars", type=int, default=200, help="스트리밍 조각 길이")
+    parser.add_argument("--chunk-delay", type=float, default=0.01, help="스트리밍 조각 사이 지연 (초)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="일시적 오류(503) 비율")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="요청 한도 초과(429) 비율")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="응답이 --stall-seconds 동안 멈추는 비율")
+    parser.add_argument("--stall-seconds", type=float, default=60.0, help="멈춘 응답이 걸리는 시간 (초)")
+    parser.add_argument("--no-context-cache", action="store_true", help="컨텍스트 캐시를 지원하지 않는 백엔드 흉내")
+    parser.add_argument("--replay-dir", help="재생할 응답 디렉토리 (response_cache 항목 또는 .txt)")
+    parser.add_argument("--cache-hit-rate", type=float, default=0.2, help="공유 에피소드를 써서 캐시에 맞는 비율")
+    parser.add_argument("--delete-rate", type=float, default=0.5, help="반복마다 삭제할 확률")
+    parser.add_argument("--preload", type=int, default=0, help="시작 전에 보관함에 미리 넣을 콘티 수")
+    parser.add_argument("--timeout", type=float, default=120, help="한 번 실행(rerun) 제한 시간 (초)")
+    parser.add_argument("--seed", type=int, default=0, help="seed")
+    parser.add_argument("--output", type=Path, help="결과 JSON 경로")
+    args = parser.parse_args(argv)
+    if args.sessions < 1:
+        parser.error("--sessions 는 1 이상이어야 합니다")
+    if not args.iterations and not args.duration:
+        parser.error("--iterations 0 이면 --duration 을 지정해야 합니다")
+
+    low, _, high = args.latency.partition("-")
+    backend = FakeBackend(FakeSettings(
+        latency=(float(low), float(high or low)),
+        chunk_chars=max(1, args.chunk_chars),
+        chunk_delay=args.chunk_delay,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        stall_rate=args.stall_rate,
+        stall_seconds=args.stall_seconds,
+        context_cache=not args.no_context_cache,
+        replay_dir=args.replay_dir,
+        seed=args.seed,
+    ))
+    set_backend(backend)
+
+    # 보관함/응답 캐시/측정 기록은 임시 디렉토리에 (처음 쓰기 전에 바꿔야 함)
+    root = Path(tempfile.mkdtemp(prefix="loadtest_"))
+    storage.set_storage_dir(root / "stories")
+    response_cache.CACHE_DIR = root / "response_cache"
+    metrics.METRICS_PATH = root / "metrics.jsonl"
+
+    try:
+        if args.preload:
+            from benchmarks.synthetic import build_archive
+
+            print(f"📦 보관함에 콘티 {args.preload}개 미리 넣는 중...")
+            build_archive(random.Random(args.seed), args.preload)
+            storage.refresh_catalog(force=True)
+
+        result = LoadResult()
+        sessions = [Session(i, args, result) for i in range(args.sessions)]
+        deadline = time.monotonic() + args.duration if args.duration else None
+        print(f"🚦 세션 {args.sessions}개 시작 (지연 {args.latency}초, 오류 {args.error_rate}, 429 {args.rate_limit_rate}, 멈춤 {args.stall_rate})")
+        started = time.perf_counter()
+        threads = [
+            threading.Thread(target=session.run, args=(deadline,), name=f"session-{session.index}")
+            for session in sessions
+        ]
+        with concurrent_app_tests():
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        wall = time.perf_counter() - started
+        report = print_report(result, wall, backend, args.sessions)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 결과 저장: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""단계별 소요 시간 / 토큰 사용량 기록
+
+한 번의 생성(또는 조회)마다 레코드 하나를 JSONL 파일에 남긴다.
+파일이 METRICS_MAX_BYTES 를 넘으면 metrics.jsonl.1, .2 ... 로 밀어내고
+METRICS_BACKUPS 개까지만 보관한다.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from storage import BASE_DIR
+
+# 측정 기록 파일 (회전)
+METRICS_PATH = BASE_DIR / "metrics.jsonl"
+METRICS_MAX_BYTES = 5 * 1024 * 1024
+METRICS_BACKUPS = 3
+# 최근 기록을 파일 끝에서부터 읽을 때 한 번에 읽는 크기
+_TAIL_BLOCK = 64 * 1024
+
+
+def _reverse_lines(f, block_size=_TAIL_BLOCK):
+    """바이너리 파일의 줄을 끝에서부터 (필요한 만큼만 뒤에서 읽음)"""
+    f.seek(0, os.SEEK_END)
+    position = f.tell()
+    rest = b""
+    while position > 0:
+        size = min(block_size, position)
+        position -= size
+        f.seek(position)
+        lines = (f.read(size) + rest).split(b"\n")
+        # 맨 앞 조각은 앞 블록에서 이어지는 줄일 수 있으므로 다음에
+        rest = lines.pop(0)
+        yield from reversed(lines)
+    yield rest
+
+
+def percentile(values, pct):
+    """단순 백분위수 (nearest-rank)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class RunMetrics:
+    """한 번의 실행에서 단계별 시간과 부가 정보를 모음
+
+    with metrics.stage("parse"):
+        ...
+    """
+
+    def __init__(self, kind, **fields):
+        self.kind = kind
+        self.fields = fields
+        self.stages = {}
+        self.ttft = None
+        self.tokens = {}
+        self._started = time.perf_counter()
+        # 병렬 생성에서는 record_usage 가 여러 작업 스레드에서 불림
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        """블록 실행 시간을 name 단계로 기록 (같은 이름이면 누적)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - started
+
+    def mark_first_token(self):
+        """첫 응답 조각이 도착한 시각 기록 (처음 한 번만)"""
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self._started
+
+    def record_usage(self, response):
+        """Gemini 응답의 usage_metadata 에서 토큰 수 기록 (여러 번 부르면 합산, 스레드 안전)"""
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None:
+            return
+        with self._lock:
+            for key, attr in (
+                ("prompt", "prompt_token_count"),
+                ("cached", "cached_content_token_count"),
+                ("output", "candidates_token_count"),
+                ("total", "total_token_count"),
+            ):
+                value = getattr(usage, attr, None)
+                if value:
+                    self.tokens[key] = self.tokens.get(key, 0) + int(value)
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def to_record(self):
+        record = {
+            "ts": time.time(),
+            "kind": self.kind,
+            "total": round(time.perf_counter() - self._started, 4),
+            "stages": {name: round(seconds, 4) for name, seconds in self.stages.items()},
+        }
+        if self.ttft is not None:
+            record["ttft"] = round(self.ttft, 4)
+        if self.tokens:
+            record["tokens"] = self.tokens
+        record.update(self.fields)
+        return record
+
+
+class MetricsLog:
+    """크기 기준으로 회전하는 JSONL 측정 기록"""
+
+    def __init__(self, path, max_bytes=METRICS_MAX_BYTES, backups=METRICS_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+
+    def _backup_path(self, index):
+        return self.path.with_name(f"{self.path.name}.{index}")
+
+    def _rotate(self):
+        for index in range(self.backups - 1, 0, -1):
+            source = self._backup_path(index)
+            if source.exists():
+                os.replace(source, self._backup_path(index + 1))
+        os.replace(self.path, self._backup_path(1))
+
+    def append(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            try:
+                if self.path.stat().st_size + len(line) > self.max_bytes:
+                    self._rotate()
+            except FileNotFoundError:
+                pass
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def recent(self, limit=200, kind=None):
+        """최근 레코드 limit 개 (오래된 것부터, 깨진 줄은 무시)
+
+        화면을 그릴 때마다 불리므로 파일 전체가 아니라 끝에서부터 필요한 만큼만 읽는다.
+        """
+        records = []
+        for path in [self.path] + [self._backup_path(i) for i in range(1, self.backups + 1)]:
+            try:
+                f = open(path, "rb")
+            except FileNotFoundError:
+                break
+            with f:
+                for line in _reverse_lines(f):
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if kind is None or record.get("kind") == kind:
+                        records.append(record)
+                        if len(records) >= limit:
+                            return records[::-1]
+        return records[::-1]
+
+
+def summarize(records):
+    """단계별 p50/p95 (초) 표 행 목록"""
+    samples = {}
+    for record in records:
+        for name, seconds in (record.get("stages") or {}).items():
+            samples.setdefault((record.get("kind"), name), []).append(seconds)
+        if record.get("ttft") is not None:
+            samples.setdefault((record.get("kind"), "첫 응답(TTFT)"), []).append(record["ttft"])
+        samples.setdefault((record.get("kind"), "전체"), []).append(record.get("total", 0.0))
+    return [
+        {
+            "종류": kind,
+            "단계": name,
+            "횟수": len(values),
+            "p50(초)": round(percentile(values, 50), 3),
+            "p95(초)": round(percentile(values, 95), 3),
+        }
+        for (kind, name), values in samples.items()
+    ]
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_metrics_log():
+    """프로세스 전체에서 공유하는 측정 기록"""
+    global _log
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                _log = MetricsLog(METRICS_PATH)
+    return _log
+
+
+def log_run(metrics):
+    """RunMetrics 를 기록 파일에 남기고 레코드 반환 (기록 실패는 무시)"""
+    record = metrics.to_record()
+    try:
+        get_metrics_log().append(record)
+    except OSError:
+        pass
+    return record
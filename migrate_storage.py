@@ -0,0 +1,76 @@
+"""예전 형식(.json) 콘티 파일을 압축 형식(.json.gz + SVG blob)으로 한 번에 변환
+
+사용법:
+    python migrate_storage.py            # 변환 후 예전 파일 삭제
+    python migrate_storage.py --keep     # 예전 파일은 saved_stories/legacy/ 로 옮겨 남겨둠
+    python migrate_storage.py --gc       # 변환 후 안 쓰는 blob 정리
+
+--gc 는 저장 중인 콘티의 blob을 지울 수 있으므로 앱을 멈춘 상태에서 실행한다.
+여러 번 실행해도 이미 변환된 파일은 건너뛴다.
+"""
+import argparse
+import os
+import sys
+
+from storage import (
+    BLOB_DIR,
+    LEGACY_SUFFIX,
+    STORAGE_DIR,
+    collect_garbage_blobs,
+    migrate_story_file,
+    refresh_catalog,
+)
+
+
+def _disk_usage():
+    """콘티 파일 + blob 전체 크기 (바이트)"""
+    total = 0
+    for root, _, files in os.walk(STORAGE_DIR):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="저장된 콘티를 압축 형식으로 변환합니다.")
+    parser.add_argument("--keep", action="store_true", help="변환한 예전 .json 파일을 지우지 않고 legacy/ 로 옮김")
+    parser.add_argument("--gc", action="store_true", help="어느 콘티에서도 쓰지 않는 blob 삭제")
+    args = parser.parse_args(argv)
+
+    before = _disk_usage()
+    legacy_files = sorted(STORAGE_DIR.glob(f"*{LEGACY_SUFFIX}"))
+    print(f"📄 예전 형식 콘티 {len(legacy_files)}개 변환 시작")
+
+    failed = 0
+    for i, filepath in enumerate(legacy_files, 1):
+        try:
+            new_path = migrate_story_file(filepath, keep_legacy=args.keep)
+        except Exception as e:
+            failed += 1
+            print(f"[{i}/{len(legacy_files)}] ❌ {filepath.name} ({e})", file=sys.stderr)
+            continue
+        print(f"[{i}/{len(legacy_files)}] ✅ {filepath.name} → {new_path.name}")
+
+    gc_failed = False
+    if args.gc:
+        try:
+            removed, freed = collect_garbage_blobs()
+        except Exception as e:
+            print(f"🚨 blob 정리 실패: {e}", file=sys.stderr)
+            gc_failed = True
+        else:
+            print(f"🧹 안 쓰는 blob {removed}개 삭제 ({freed} bytes)")
+
+    refresh_catalog(force=True)
+    after = _disk_usage()
+    print()
+    print(f"변환 {len(legacy_files) - failed}개 / 실패 {failed}개")
+    print(f"디스크 사용량: {before} → {after} bytes ({BLOB_DIR} 포함)")
+    return 1 if failed or gc_failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
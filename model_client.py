@@ -0,0 +1,323 @@
+"""마감 시간 / 재시도 / 헤징 / 빠른 모델 대체를 붙인 모델 호출
+
+generation.create_client() 가 돌려주는 ResilientModel 은 원래 모델처럼
+generate_content(contents, stream=False) 로 부르면 되고, 안에서
+- 요청마다 마감 시간(deadline)을 두고, 넘기면 DeadlineExceeded 를 냄.
+  스트리밍은 첫 조각까지와 조각 사이 간격마다 마감 시간을 따로 적용하므로
+  느려도 계속 조각이 오는 긴 응답은 끝까지 받는다
+- 주 모델이 마감 시간을 넘기면 빠른 모델 요청을 추가로 보내고 (빠른 모델의
+  마감 시간만큼 더 기다림) 둘 중 먼저 온 응답을 씀
+- 일시적인 오류(429/503 등)는 지수 백오프 + 지터로 다시 시도
+- 첫 시도가 지금까지 관찰한 p95 지연을 넘기면 같은 요청을 하나 더 보내고
+  먼저 온 응답을 씀 (헤징)
+- 남은 시간이 주 모델의 p95 보다 짧거나 요청 한도에 걸리면 빠른 모델로 대체
+를 처리한다.
+
+각 시도는 데몬 스레드에서 돌리므로, 멈춘 요청이 있어도 호출한 쪽은 마감
+시간에 돌아오고 프로세스 종료도 막지 않는다 (멈춘 요청은 버려짐).
+"""
+import queue
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+from google.api_core import exceptions as api_exceptions
+
+from metrics import percentile
+
+# 요청 하나의 기본 마감 시간 (초, 재시도/헤징 포함)
+# 스트리밍은 첫 조각까지, 그리고 조각 사이 간격마다 따로 적용
+DEFAULT_DEADLINE = 120.0
+# 일시적 오류 재시도 횟수
+MAX_RETRIES = 2
+# 재시도 대기: 0 ~ min(CAP, BASE * 2^n) 사이 균등 분포 (full jitter)
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 8.0
+# p95 를 믿을 만한 최소 표본 수 (모자라면 헤징/시간 기준 대체 안 함)
+HEDGE_MIN_SAMPLES = 20
+# 너무 이른 헤징으로 요청이 두 배가 되지 않도록 하는 최소 대기 (초)
+HEDGE_MIN_DELAY = 2.0
+# 모델별로 기억하는 최근 지연 시간 개수
+LATENCY_WINDOW = 200
+
+# 잠깐 기다렸다 다시 시도하면 되는 오류들
+_TRANSIENT_ERRORS = (
+    api_exceptions.ResourceExhausted,
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.DeadlineExceeded,
+    api_exceptions.InternalServerError,
+    api_exceptions.TooManyRequests,
+)
+_END = object()
+
+
+def is_rate_limit_error(error):
+    """요청 한도 초과(429) 오류인지 확인"""
+    return isinstance(error, (api_exceptions.ResourceExhausted, api_exceptions.TooManyRequests))
+
+
+def is_transient_error(error):
+    """재시도하면 성공할 수 있는 일시적인 오류인지 확인"""
+    return isinstance(error, _TRANSIENT_ERRORS)
+
+
+class LatencyTracker:
+    """(모델, 프롬프트) 별 최근 성공 지연 시간으로 p95 추정"""
+
+    def __init__(self, window=LATENCY_WINDOW, min_samples=HEDGE_MIN_SAMPLES):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, seconds):
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def p95(self, key):
+        """p95 (초), 표본이 모자라면 None"""
+        with self._lock:
+            samples = list(self._samples.get(key) or ())
+        if len(samples) < self.min_samples:
+            return None
+        return percentile(samples, 95)
+
+
+_tracker = LatencyTracker()
+
+
+def get_latency_tracker():
+    """프로세스 전체에서 공유하는 지연 시간 기록"""
+    return _tracker
+
+
+def _run_in_thread(func):
+    """func 를 데몬 스레드에서 실행하고 Future 반환"""
+    future = Future()
+
+    def target():
+        try:
+            future.set_result(func())
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=target, daemon=True, name="model-attempt").start()
+    return future
+
+
+def _deadline_error(seconds):
+    return api_exceptions.DeadlineExceeded(f"응답 제한 시간 {seconds:.0f}초를 넘었습니다")
+
+
+class _DeadlineStream:
+    """스트리밍 응답 조각을 꺼냄, 다음 조각이 gap_seconds 안에 안 오면 DeadlineExceeded"""
+
+    def __init__(self, first, iterator, gap_seconds):
+        self.first = first
+        self.iterator = iterator
+        self.gap_seconds = gap_seconds
+
+    def _pump(self, chunks):
+        try:
+            for chunk in self.iterator:
+                chunks.put((chunk, None))
+        except BaseException as e:
+            chunks.put((None, e))
+        chunks.put((_END, None))
+
+    def __iter__(self):
+        if self.first is _END:
+            return
+        yield self.first
+        chunks = queue.Queue()
+        threading.Thread(target=self._pump, args=(chunks,), daemon=True, name="model-stream").start()
+        while True:
+            try:
+                chunk, error = chunks.get(timeout=self.gap_seconds)
+            except queue.Empty:
+                raise _deadline_error(self.gap_seconds)
+            if error is not None:
+                raise error
+            if chunk is _END:
+                return
+            yield chunk
+
+
+class ClientResponse:
+    """모델 응답 + 어느 모델이 몇 번 만에 답했는지
+
+    .text, usage_metadata 등은 원래 응답 그대로 쓸 수 있다.
+    """
+
+    def __init__(self, response, model_name, attempts, hedged, stream=None):
+        self.response = response
+        self.model_name = model_name
+        self.attempts = attempts
+        self.hedged = hedged
+        self._stream = stream
+
+    def __iter__(self):
+        return iter(self._stream if self._stream is not None else self.response)
+
+    def __getattr__(self, name):
+        return getattr(self.response, name)
+
+
+class ResilientModel:
+    """generate_content 에 마감 시간/재시도/헤징/빠른 모델 대체를 붙인 모델
+
+    primary, fallback 은 (모델 이름, 모델) 쌍이다. fallback 이 없으면 대체 없이
+    primary 로만 재시도/헤징한다. fallback_deadline 은 주 모델이 마감 시간을
+    넘겼을 때 빠른 모델에 더 주는 시간 (기본은 deadline 과 같음).
+    여러 스레드에서 같이 불러도 된다.
+    """
+
+    def __init__(self, primary, fallback=None, deadline=DEFAULT_DEADLINE, max_retries=MAX_RETRIES,
+                 hedge=True, latency_key="", tracker=None, rng=None, fallback_deadline=None):
+        self.primary = primary
+        self.fallback = fallback
+        self.deadline = deadline
+        self.fallback_deadline = fallback_deadline or deadline
+        self.max_retries = max_retries
+        self.hedge = hedge
+        self.latency_key = latency_key
+        self.tracker = tracker or get_latency_tracker()
+        self.model_name = primary[0]
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "retries": 0, "hedges": 0, "fallbacks": 0, "timeouts": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _key(self, model_name, stream):
+        # 스트리밍은 첫 조각까지, 아니면 전체 응답까지의 시간이라 따로 잼
+        return (model_name, self.latency_key, bool(stream))
+
+    def _choose(self, remaining, stream, prefer_fallback=False):
+        """이번 시도에 쓸 (모델 이름, 모델)"""
+        if self.fallback is None:
+            return self.primary
+        if prefer_fallback:
+            return self.fallback
+        p95 = self.tracker.p95(self._key(self.primary[0], stream))
+        if p95 is not None and remaining < p95:
+            # 주 모델로는 남은 시간 안에 끝나기 어려움
+            return self.fallback
+        return self.primary
+
+    def _submit(self, choice, contents, stream, kwargs, deadline):
+        model = choice[1]
+        if not stream:
+            # 실제 HTTP 요청도 남은 시간에 끊기도록 (버려진 시도가 오래 남지 않게)
+            # 스트리밍은 요청 timeout 이 전체 스트림에 걸리므로 두지 않음
+            kwargs = dict(kwargs)
+            kwargs.setdefault("request_options", {"timeout": max(1.0, deadline - time.monotonic())})
+            return _run_in_thread(lambda: model.generate_content(contents, **kwargs))
+
+        def start_stream():
+            # 첫 조각이 올 때까지를 한 번의 시도로 봄
+            response = model.generate_content(contents, stream=True, **kwargs)
+            iterator = iter(response)
+            return response, next(iterator, _END), iterator
+        return _run_in_thread(start_stream)
+
+    def _attempt(self, choice, contents, stream, kwargs, deadline, prefer_fallback):
+        """한 번의 시도 (필요하면 헤징 요청 하나 추가), (응답, 선택, 헤징 여부) 반환
+
+        주 모델이 마감 시간을 넘기면 버리지 않고 빠른 모델 요청을 하나 더 보내
+        fallback_deadline 만큼 더 기다린다 (먼저 온 쪽 사용).
+        """
+        started = time.monotonic()
+        rescue = self.fallback is not None and choice is self.primary
+        # 주 모델 요청은 빠른 모델을 기다리는 동안에도 끊기지 않게
+        hard_deadline = deadline + (self.fallback_deadline if rescue else 0.0)
+        pending = {self._submit(choice, contents, stream, kwargs, hard_deadline): (choice, started)}
+        hedge_after = None
+        if self.hedge:
+            p95 = self.tracker.p95(self._key(choice[0], stream))
+            if p95 is not None:
+                hedge_after = max(HEDGE_MIN_DELAY, p95)
+        hedged = False
+        last_error = None
+        while pending:
+            now = time.monotonic()
+            remaining = deadline - now
+            if remaining <= 0:
+                if not rescue:
+                    self._count("timeouts")
+                    raise _deadline_error(self.deadline)
+                rescue = False
+                hedge_after = None
+                self._count("fallbacks")
+                deadline = hard_deadline
+                pending[self._submit(self.fallback, contents, stream, kwargs, deadline)] = (self.fallback, now)
+                continue
+            timeout = remaining
+            if hedge_after is not None and not hedged:
+                timeout = min(remaining, max(0.0, started + hedge_after - now))
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                winner, attempt_started = pending.pop(future)
+                error = future.exception()
+                if error is None:
+                    self.tracker.record(self._key(winner[0], stream), time.monotonic() - attempt_started)
+                    return future.result(), winner, hedged
+                last_error = error
+            if not done and hedge_after is not None and not hedged:
+                # 첫 요청이 p95 를 넘김 → 하나 더 보내고 먼저 오는 쪽 사용
+                hedged = True
+                self._count("hedges")
+                hedge_choice = self._choose(deadline - time.monotonic(), stream, prefer_fallback)
+                if hedge_choice is not self.primary:
+                    self._count("fallbacks")
+                    rescue = False
+                pending[self._submit(hedge_choice, contents, stream, kwargs, hard_deadline)] = (hedge_choice, time.monotonic())
+        raise last_error
+
+    def _backoff(self, retry, deadline):
+        delay = self._rng.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** (retry - 1)))
+        if time.monotonic() + delay >= deadline:
+            self._count("timeouts")
+            raise _deadline_error(self.deadline)
+        time.sleep(delay)
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        """원래 모델의 generate_content 와 같은 사용법, ClientResponse 반환"""
+        self._count("calls")
+        deadline = time.monotonic() + self.deadline
+        prefer_fallback = False
+        retries = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            choice = self._choose(remaining, stream, prefer_fallback)
+            if choice is not self.primary:
+                self._count("fallbacks")
+            try:
+                result, winner, hedged = self._attempt(choice, contents, stream, kwargs, deadline, prefer_fallback)
+            except Exception as e:
+                if time.monotonic() >= deadline:
+                    # 요청 자체의 timeout 이 먼저 끊은 경우
+                    self._count("timeouts")
+                    raise
+                if not is_transient_error(e) or retries >= self.max_retries:
+                    raise
+                retries += 1
+                self._count("retries")
+                # 요청 한도에 걸리면 다음 시도는 빠른 모델로 (한도가 따로 잡힘)
+                if is_rate_limit_error(e) and self.fallback is not None:
+                    prefer_fallback = True
+                self._backoff(retries, deadline)
+                continue
+            if not stream:
+                return ClientResponse(result, winner[0], retries + 1, hedged)
+            response, first, iterator = result
+            gap_seconds = self.deadline if winner is self.primary else self.fallback_deadline
+            stream_chunks = _DeadlineStream(first, iterator, gap_seconds)
+            return ClientResponse(response, winner[0], retries + 1, hedged, stream_chunks)
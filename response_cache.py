@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+
+from storage import BASE_DIR
+
+# Gemini 응답 캐시 디렉토리 (키 = 에피소드/모델/시스템 프롬프트 해시)
+CACHE_DIR = BASE_DIR / "response_cache"
+# 캐시 항목 유효 기간 (초)
+CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+# 캐시 전체 크기 상한 (넘으면 오래 안 쓴 항목부터 지움)
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+def normalize_episode(episode):
+    """캐시 키용 에피소드 정규화 (유니코드 NFC, 공백 정리)"""
+    episode = unicodedata.normalize("NFC", episode)
+    return re.sub(r"\s+", " ", episode).strip()
+
+
+def make_cache_key(episode, model_name, system_prompt):
+    """에피소드, 모델 이름, 시스템 프롬프트 해시로 캐시 키 생성
+
+    프롬프트를 고치면 해시가 바뀌므로 예전 항목은 자동으로 안 쓰게 된다.
+    """
+    prompt_hash = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+    payload = json.dumps(
+        [normalize_episode(episode), model_name, prompt_hash],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """디스크에 저장하는 Gemini 응답 캐시 (TTL + 크기 기준 LRU 정리)
+
+    항목마다 {key}.json 파일 하나를 쓰고, 파일 mtime을 마지막 사용
+    시각으로 삼아 크기가 넘치면 오래 안 쓴 항목부터 지운다.
+    """
+
+    def __init__(self, cache_dir, ttl_seconds=CACHE_TTL_SECONDS, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key):
+        """캐시된 응답 텍스트 (없거나 만료됐으면 None)"""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            entry = None
+
+        if entry is not None and time.time() - entry.get("created_at", 0) > self.ttl_seconds:
+            self._remove(path)
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        # 마지막 사용 시각 갱신 (LRU 정리 기준)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry["response_text"]
+
+    def put(self, key, response_text, model_name=None):
+        """응답 텍스트를 캐시에 저장하고 필요하면 정리"""
+        entry = {
+            "created_at": time.time(),
+            "model": model_name,
+            "response_text": response_text,
+        }
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """만료된 항목과 크기 상한을 넘는 오래된 항목 삭제"""
+        now = time.time()
+        entries = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = 0
+        live = []
+        for mtime, size, path in entries:
+            # mtime은 마지막 사용 시각이라 TTL 판단은 get()에서 created_at으로 함
+            # 여기서는 TTL 동안 한 번도 안 쓴 항목만 지움
+            if now - mtime > self.ttl_seconds:
+                self._remove(path)
+            else:
+                live.append((mtime, size, path))
+                total += size
+
+        live.sort()
+        for mtime, size, path in live:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def stats(self):
+        """적중/미스 횟수와 현재 캐시 크기"""
+        count = 0
+        size = 0
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                size += path.stat().st_size
+            except FileNotFoundError:
+                continue
+            count += 1
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": count, "bytes": size}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """프로세스 전체에서 공유하는 응답 캐시 (적중/미스 횟수도 공유)"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(CACHE_DIR)
+    return _cache
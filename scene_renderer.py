@@ -0,0 +1,410 @@
+"""간단 장면 모드의 장면 설명(JSON)을 SVG로 그리는 렌더러
+
+모델이 컷마다 전체 SVG를 쓰는 대신 아래 같은 짧은 장면 설명만 보내면,
+시스템 프롬프트에 있는 두더지/페럿 도형을 부품으로 삼아 여기서 SVG를 만든다.
+
+    {
+      "shot": "full",
+      "background": {"wall": "#e8f4f8", "floor": "#ddd"},
+      "characters": [
+        {"type": "mole", "x": "left", "expression": "surprised", "pose": "arms_up", "say": "앗!"}
+      ],
+      "props": [{"type": "table"}, {"type": "bowl", "x": 170, "y": 270}],
+      "effects": [{"text": "쾅!", "x": 320, "y": 80}]
+    }
+"""
+from xml.sax.saxutils import escape, quoteattr
+
+# 캐릭터 종류 (한글 이름도 허용)
+CHARACTER_ALIASES = {
+    "mole": "mole",
+    "두더지": "mole",
+    "ferret": "ferret",
+    "페럿": "ferret",
+}
+
+# 화면 위치 이름 → 캐릭터 중심 x 좌표
+POSITIONS = {
+    "left": 110,
+    "center": 200,
+    "right": 290,
+    "왼쪽": 110,
+    "가운데": 200,
+    "중앙": 200,
+    "오른쪽": 290,
+}
+
+# 샷 종류: (배율, 템플릿 기준 y, 화면에 놓일 y)
+# 풀샷은 발끝(350)을 바닥에, 미디엄샷은 가슴을, 클로즈업은 얼굴을 화면 중앙 근처에 맞춘다
+SHOTS = {
+    "full": (1.0, 350, 350),
+    "medium": (1.35, 180, 215),
+    "closeup": (1.9, 125, 185),
+}
+SHOT_ALIASES = {
+    "풀샷": "full",
+    "와이드샷": "full",
+    "wide": "full",
+    "미디엄샷": "medium",
+    "클로즈업": "closeup",
+    "close-up": "closeup",
+}
+
+EXPRESSIONS = ("neutral", "happy", "sad", "angry", "surprised")
+EXPRESSION_ALIASES = {
+    "기본": "neutral",
+    "기쁨": "happy",
+    "슬픔": "sad",
+    "화남": "angry",
+    "당황": "surprised",
+}
+
+POSE_ALIASES = {
+    "서있음": "standing",
+    "앉음": "sitting",
+    "뛰는 중": "running",
+    "손 뻗음": "pointing",
+    "만세": "arms_up",
+    "머리 감싸기": "hands_on_head",
+}
+
+# 포즈별 팔/다리 선 좌표 (템플릿 좌표계, 캐릭터 중심 x=200)
+# 기본값(standing)은 시스템 프롬프트의 팔/다리 좌표 그대로
+POSES = {
+    "standing": {
+        "arms": ((150, 200, 130, 180), (250, 200, 270, 180)),
+        "legs": ((170, 290, 160, 350), (230, 290, 240, 350)),
+    },
+    "arms_down": {
+        "arms": ((150, 200, 138, 252), (250, 200, 262, 252)),
+        "legs": ((170, 290, 160, 350), (230, 290, 240, 350)),
+    },
+    "arms_up": {
+        "arms": ((152, 190, 122, 130), (248, 190, 278, 130)),
+        "legs": ((170, 290, 160, 350), (230, 290, 240, 350)),
+    },
+    "pointing": {
+        "arms": ((150, 200, 138, 252), (250, 195, 322, 172)),
+        "legs": ((170, 290, 160, 350), (230, 290, 240, 350)),
+    },
+    "hands_on_head": {
+        "arms": ((155, 180, 168, 98), (245, 180, 232, 98)),
+        "legs": ((170, 290, 160, 350), (230, 290, 240, 350)),
+    },
+    "sitting": {
+        "arms": ((150, 205, 150, 255), (250, 205, 250, 255)),
+        "legs": ((172, 285, 125, 300), (228, 285, 275, 300)),
+    },
+    "running": {
+        "arms": ((150, 200, 112, 228), (250, 200, 288, 168)),
+        "legs": ((175, 290, 138, 338), (225, 290, 258, 350)),
+    },
+}
+
+_MOLE_EYES = {
+    "neutral": '<circle cx="185" cy="110" r="5" fill="black"/><circle cx="215" cy="110" r="5" fill="black"/>',
+    "surprised": '<circle cx="185" cy="110" r="8" fill="black"/><circle cx="215" cy="110" r="8" fill="black"/>',
+    "happy": (
+        '<path d="M 180 110 Q 185 105 190 110" stroke="black" fill="none" stroke-width="2"/>'
+        '<path d="M 210 110 Q 215 105 220 110" stroke="black" fill="none" stroke-width="2"/>'
+    ),
+    "sad": (
+        '<circle cx="185" cy="110" r="5" fill="black"/><circle cx="215" cy="110" r="5" fill="black"/>'
+        '<circle cx="185" cy="118" r="2" fill="blue"/><circle cx="215" cy="118" r="2" fill="blue"/>'
+    ),
+    "angry": (
+        '<circle cx="185" cy="112" r="5" fill="black"/><circle cx="215" cy="112" r="5" fill="black"/>'
+        '<line x1="176" y1="98" x2="193" y2="104" stroke="black" stroke-width="3"/>'
+        '<line x1="224" y1="98" x2="207" y2="104" stroke="black" stroke-width="3"/>'
+    ),
+}
+
+_MOLE_MOUTHS = {
+    "neutral": '<path d="M 190 136 Q 200 140 210 136" stroke="black" fill="none" stroke-width="2"/>',
+    "surprised": '<ellipse cx="200" cy="135" rx="8" ry="12" fill="black"/>',
+    "happy": '<path d="M 185 130 Q 200 140 215 130" stroke="black" fill="none" stroke-width="2"/>',
+    "sad": '<path d="M 185 140 Q 200 130 215 140" stroke="black" fill="none" stroke-width="2"/>',
+    "angry": '<ellipse cx="200" cy="137" rx="11" ry="7" fill="black"/>',
+}
+
+_FERRET_EYES = {
+    "neutral": (
+        '<polygon points="185,120 190,115 195,120 190,125" fill="black"/>'
+        '<polygon points="205,120 210,115 215,120 210,125" fill="black"/>'
+    ),
+    "surprised": '<circle cx="188" cy="120" r="6" fill="black"/><circle cx="212" cy="120" r="6" fill="black"/>',
+    "happy": (
+        '<path d="M 184 121 Q 190 114 196 121" stroke="black" fill="none" stroke-width="2"/>'
+        '<path d="M 204 121 Q 210 114 216 121" stroke="black" fill="none" stroke-width="2"/>'
+    ),
+    "sad": (
+        '<polygon points="185,120 190,115 195,120 190,125" fill="black"/>'
+        '<polygon points="205,120 210,115 215,120 210,125" fill="black"/>'
+        '<circle cx="190" cy="129" r="2" fill="blue"/><circle cx="210" cy="129" r="2" fill="blue"/>'
+    ),
+    "angry": (
+        '<polygon points="185,122 190,117 195,122 190,126" fill="black"/>'
+        '<polygon points="205,122 210,117 215,122 210,126" fill="black"/>'
+        '<line x1="182" y1="110" x2="196" y2="115" stroke="black" stroke-width="2"/>'
+        '<line x1="218" y1="110" x2="204" y2="115" stroke="black" stroke-width="2"/>'
+    ),
+}
+
+_FERRET_MOUTHS = {
+    "neutral": '<line x1="195" y1="138" x2="205" y2="138" stroke="black" stroke-width="2"/>',
+    "surprised": '<ellipse cx="200" cy="139" rx="4" ry="6" fill="black"/>',
+    "happy": '<path d="M 192 136 Q 200 143 208 136" stroke="black" fill="none" stroke-width="2"/>',
+    "sad": '<path d="M 192 141 Q 200 135 208 141" stroke="black" fill="none" stroke-width="2"/>',
+    "angry": '<polygon points="192,136 208,136 200,143" fill="black"/>',
+}
+
+# 소품: 기본 위치/크기는 시스템 프롬프트의 배경 요소 예시 기준
+PROP_DEFAULTS = {
+    "table": (50, 300, 300, 20, "#8B4513"),
+    "chair": (100, 280, 60, 80, "#654321"),
+    "phone": (180, 200, 40, 60, "#333"),
+    "sign": (300, 50, 80, 100, "#fff"),
+    "window": (40, 40, 110, 90, "#cde8f6"),
+    "door": (310, 120, 70, 180, "#a0522d"),
+    "bowl": (170, 270, 60, 30, "#f4f4f4"),
+    "cup": (250, 265, 24, 32, "#fff"),
+    "bag": (300, 270, 60, 50, "#c0392b"),
+    "tree": (320, 120, 60, 180, "#2e8b57"),
+    "box": (260, 250, 80, 60, "#deb887"),
+}
+PROP_ALIASES = {
+    "테이블": "table",
+    "식탁": "table",
+    "의자": "chair",
+    "핸드폰": "phone",
+    "휴대폰": "phone",
+    "표지판": "sign",
+    "창문": "window",
+    "문": "door",
+    "그릇": "bowl",
+    "컵": "cup",
+    "가방": "bag",
+    "나무": "tree",
+    "상자": "box",
+}
+
+
+def _num(value):
+    """좌표를 짧게 표기 (소수 첫째 자리까지, 불필요한 .0 제거)"""
+    value = round(float(value), 1)
+    return str(int(value)) if value == int(value) else str(value)
+
+
+def _lookup(value, choices, aliases, default):
+    key = str(value or "").strip().lower()
+    key = aliases.get(key, key)
+    return key if key in choices else default
+
+
+def _limbs(pose, color, arm_width, leg_width):
+    lines = []
+    for (x1, y1, x2, y2) in pose["arms"]:
+        lines.append(
+            f'<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}" stroke="{color}" '
+            f'stroke-width="{arm_width}" stroke-linecap="round"/>'
+        )
+    for (x1, y1, x2, y2) in pose["legs"]:
+        lines.append(
+            f'<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}" stroke="{color}" '
+            f'stroke-width="{leg_width}" stroke-linecap="round"/>'
+        )
+    return lines
+
+
+def mole_parts(expression="neutral", pose="standing"):
+    """두더지 부품 13개 (템플릿 좌표계)"""
+    pose = POSES[pose]
+    arms_and_legs = _limbs(pose, "#666", 8, 10)
+    return [
+        '<ellipse cx="200" cy="220" rx="50" ry="70" fill="#999"/>',
+        '<ellipse cx="200" cy="120" rx="35" ry="40" fill="#aaa"/>',
+        '<circle cx="200" cy="120" r="6" fill="black"/>',
+        _MOLE_EYES[expression],
+        _MOLE_MOUTHS[expression],
+        *arms_and_legs,
+    ]
+
+
+def ferret_parts(expression="neutral", pose="standing"):
+    """페럿 부품 (템플릿 좌표계, 얼굴은 시스템 프롬프트의 역삼각형 디자인)"""
+    pose = POSES[pose]
+    arms_and_legs = _limbs(pose, "#333", 6, 8)
+    return [
+        '<ellipse cx="200" cy="220" rx="42" ry="68" fill="#fff" stroke="#333" stroke-width="2"/>',
+        '<polygon points="200,80 160,150 240,150" fill="#fff" stroke="#333" stroke-width="2"/>',
+        '<ellipse cx="200" cy="90" rx="45" ry="25" fill="#ffd700" opacity="0.8"/>',
+        _FERRET_EYES[expression],
+        _FERRET_MOUTHS[expression],
+        *arms_and_legs,
+    ]
+
+
+def _character(character, shot):
+    kind = CHARACTER_ALIASES.get(str(character.get("type", "mole")).strip().lower())
+    if kind is None:
+        raise ValueError(f"알 수 없는 캐릭터 종류: {character.get('type')}")
+    expression = _lookup(character.get("expression"), EXPRESSIONS, EXPRESSION_ALIASES, "neutral")
+    pose = _lookup(character.get("pose"), POSES, POSE_ALIASES, "standing")
+
+    x = character.get("x", "center")
+    if isinstance(x, str) and x.strip().lower() in POSITIONS:
+        x = POSITIONS[x.strip().lower()]
+    x = float(x)
+    scale, template_y, canvas_y = SHOTS[shot]
+    scale *= float(character.get("scale", 1))
+
+    parts = mole_parts(expression, pose) if kind == "mole" else ferret_parts(expression, pose)
+    dx = x - 200 * scale
+    dy = canvas_y - template_y * scale
+    if scale == 1 and dx == 0 and dy == 0:
+        return "".join(parts), x
+    transform = f"translate({_num(dx)} {_num(dy)})"
+    if scale != 1:
+        transform += f" scale({scale:.3g})"
+    return f'<g transform="{transform}">{"".join(parts)}</g>', x
+
+
+def _speech_bubble(text, x):
+    width = min(180, 24 + 14 * len(text))
+    left = min(max(4, x - width / 2), 396 - width)
+    return (
+        f'<rect x="{_num(left)}" y="14" width="{_num(width)}" height="34" rx="12" '
+        f'fill="white" stroke="#333" stroke-width="2"/>'
+        f'<text x="{_num(left + width / 2)}" y="37" font-size="16" text-anchor="middle">{escape(text)}</text>'
+    )
+
+
+def _prop(prop):
+    kind = str(prop.get("type", "box")).strip().lower()
+    kind = PROP_ALIASES.get(kind, kind)
+    x, y, w, h, color = PROP_DEFAULTS.get(kind, PROP_DEFAULTS["box"])
+    x = float(prop.get("x", x))
+    y = float(prop.get("y", y))
+    w = float(prop.get("width", w))
+    h = float(prop.get("height", h))
+    fill = quoteattr(str(prop.get("color", color)))
+    X, Y, W, H = _num(x), _num(y), _num(w), _num(h)
+
+    if kind == "table":
+        return (
+            f'<rect x="{X}" y="{Y}" width="{W}" height="{H}" fill={fill}/>'
+            f'<rect x="{_num(x + 10)}" y="{_num(y + h)}" width="10" height="{_num(max(0, 390 - y - h))}" fill={fill}/>'
+            f'<rect x="{_num(x + w - 20)}" y="{_num(y + h)}" width="10" height="{_num(max(0, 390 - y - h))}" fill={fill}/>'
+        )
+    if kind == "chair":
+        return (
+            f'<rect x="{X}" y="{Y}" width="{W}" height="{_num(h * 0.25)}" fill={fill}/>'
+            f'<rect x="{X}" y="{_num(y - h * 0.6)}" width="10" height="{_num(h * 0.6)}" fill={fill}/>'
+            f'<rect x="{X}" y="{_num(y + h * 0.25)}" width="8" height="{_num(h * 0.75)}" fill={fill}/>'
+            f'<rect x="{_num(x + w - 8)}" y="{_num(y + h * 0.25)}" width="8" height="{_num(h * 0.75)}" fill={fill}/>'
+        )
+    if kind == "phone":
+        return (
+            f'<rect x="{X}" y="{Y}" width="{W}" height="{H}" fill={fill} rx="3"/>'
+            f'<rect x="{_num(x + 4)}" y="{_num(y + 6)}" width="{_num(w - 8)}" height="{_num(h - 14)}" fill="#9cf"/>'
+        )
+    if kind == "sign":
+        label = escape(str(prop.get("text", "")))
+        return (
+            f'<rect x="{X}" y="{Y}" width="{W}" height="{H}" fill={fill} stroke="#000"/>'
+            f'<text x="{_num(x + w / 2)}" y="{_num(y + h / 2 + 6)}" font-size="16" text-anchor="middle">{label}</text>'
+        )
+    if kind == "window":
+        return (
+            f'<rect x="{X}" y="{Y}" width="{W}" height="{H}" fill={fill} stroke="#888" stroke-width="4"/>'
+            f'<line x1="{_num(x + w / 2)}" y1="{Y}" x2="{_num(x + w / 2)}" y2="{_num(y + h)}" stroke="#888" stroke-width="3"/>'
+        )
+    if kind == "door":
+        return (
+            f'<rect x="{X}" y="{Y}" width="{W}" height="{H}" fill={fill}/>'
+            f'<circle cx="{_num(x + w - 12)}" cy="{_num(y + h / 2)}" r="4" fill="#ffd700"/>'
+        )
+    if kind == "bowl":
+        return (
+            f'<path d="M {X} {Y} Q {_num(x + w / 2)} {_num(y + h * 2)} {_num(x + w)} {Y} Z" '
+            f'fill={fill} stroke="#555" stroke-width="2"/>'
+        )
+    if kind == "cup":
+        return (
+            f'<rect x="{X}" y="{Y}" width="{W}" height="{H}" fill={fill} stroke="#555" stroke-width="2" rx="3"/>'
+            f'<path d="M {_num(x + w)} {_num(y + h * 0.25)} q 10 {_num(h * 0.25)} 0 {_num(h * 0.5)}" '
+            f'stroke="#555" fill="none" stroke-width="2"/>'
+        )
+    if kind == "bag":
+        return (
+            f'<rect x="{X}" y="{Y}" width="{W}" height="{H}" fill={fill} rx="6"/>'
+            f'<path d="M {_num(x + w * 0.25)} {Y} Q {_num(x + w / 2)} {_num(y - h * 0.6)} {_num(x + w * 0.75)} {Y}" '
+            f'stroke={fill} fill="none" stroke-width="4"/>'
+        )
+    if kind == "tree":
+        return (
+            f'<rect x="{_num(x + w * 0.4)}" y="{_num(y + h * 0.45)}" width="{_num(w * 0.2)}" height="{_num(h * 0.55)}" fill="#8B4513"/>'
+            f'<circle cx="{_num(x + w / 2)}" cy="{_num(y + h * 0.3)}" r="{_num(w * 0.6)}" fill={fill}/>'
+        )
+    return f'<rect x="{X}" y="{Y}" width="{W}" height="{H}" fill={fill} stroke="#555"/>'
+
+
+def _effect(effect):
+    text = escape(str(effect.get("text", "")))
+    if not text:
+        return ""
+    x = _num(effect.get("x", 330))
+    y = _num(effect.get("y", 70))
+    size = _num(effect.get("size", 28))
+    color = quoteattr(str(effect.get("color", "#e63946")))
+    return f'<text x="{x}" y="{y}" font-size="{size}" font-weight="bold" fill={color} text-anchor="middle">{text}</text>'
+
+
+def render_scene(scene):
+    """장면 설명(dict)을 400x400 SVG 문자열로 렌더링
+
+    잘못된 장면 설명이면 ValueError를 발생시킨다.
+    """
+    if not isinstance(scene, dict):
+        raise ValueError("장면 설명은 JSON 객체여야 합니다")
+    characters = scene.get("characters") or []
+    props = scene.get("props") or []
+    effects = scene.get("effects") or []
+    if not isinstance(characters, list) or not isinstance(props, list) or not isinstance(effects, list):
+        raise ValueError("characters/props/effects 는 목록이어야 합니다")
+    if not characters:
+        raise ValueError("장면에 캐릭터가 없습니다")
+
+    shot = _lookup(scene.get("shot"), SHOTS, SHOT_ALIASES, "full")
+    background = scene.get("background") or {}
+    if not isinstance(background, dict):
+        background = {}
+    wall = quoteattr(str(background.get("wall", "#f0f0f0")))
+    floor = quoteattr(str(background.get("floor", "#ddd")))
+
+    try:
+        elements = [
+            '<rect width="400" height="400" fill="white"/>',
+            f'<rect x="0" y="300" width="400" height="100" fill={floor}/>',
+            f'<rect x="0" y="0" width="400" height="300" fill={wall}/>',
+        ]
+        # 클로즈업에서는 소품이 캐릭터에 가려지므로 그대로 뒤에 깔아둠
+        elements.extend(_prop(prop) for prop in props if isinstance(prop, dict))
+        bubbles = []
+        for character in characters:
+            if not isinstance(character, dict):
+                raise ValueError("캐릭터 항목은 JSON 객체여야 합니다")
+            svg, x = _character(character, shot)
+            elements.append(svg)
+            if character.get("say"):
+                bubbles.append(_speech_bubble(str(character["say"]), x))
+        elements.extend(_effect(effect) for effect in effects if isinstance(effect, dict))
+        elements.extend(bubbles)
+    except (TypeError, KeyError) as e:
+        raise ValueError(f"장면 설명을 해석할 수 없습니다: {e}")
+
+    return (
+        '<svg width="400" height="400" viewBox="0 0 400 400" xmlns="http://www.w3.org/2000/svg">'
+        + "".join(elements)
+        + "</svg>"
+    )
@@ -0,0 +1,973 @@
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import queue
+import re
+import secrets
+import sqlite3
+import threading
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+
+from story_parser import compose_response_text
+
+# 저장 디렉토리 설정 (현재 파일 위치 기준)
+BASE_DIR = Path(__file__).parent.absolute()
+STORAGE_DIR = BASE_DIR / "saved_stories"
+STORAGE_DIR.mkdir(exist_ok=True)
+
+# SVG 본문 저장소 (내용 해시로 이름을 붙여 여러 콘티가 같은 파일을 공유)
+BLOB_DIR = STORAGE_DIR / "blobs"
+
+# 콘티 파일 확장자 (새 형식: gzip 압축 JSON, 예전 형식: JSON)
+STORY_SUFFIX = ".json.gz"
+LEGACY_SUFFIX = ".json"
+_GZIP_MAGIC = b"\x1f\x8b"
+
+# 저장된 콘티의 메타데이터 카탈로그 (STORAGE_DIR 옆의 SQLite 파일)
+CATALOG_PATH = BASE_DIR / "saved_stories.sqlite3"
+
+# 읽을 수 없는(손상된) 콘티 파일을 옮겨 두는 곳 (STORAGE_DIR 아래)
+QUARANTINE_DIR_NAME = "quarantine"
+# 변환하고 남겨 둔(--keep) 예전 형식 파일을 옮겨 두는 곳 (STORAGE_DIR 아래, 카탈로그에 안 잡힘)
+LEGACY_DIR_NAME = "legacy"
+# 이보다 오래된 임시 파일은 기록하다 죽은 프로세스가 남긴 것으로 보고 지움 (초)
+STALE_TMP_SECONDS = 3600
+
+# 콘티 본문 캐시 최대 크기 (프로세스 전체, 모든 세션 공유)
+BODY_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+_CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stories (
+    filename TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    svgs TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS stories_created_at ON stories (created_at);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# 검색 색인 (rowid = stories.rowid, 각 열에는 n-gram 토큰을 공백으로 이어 넣음)
+_SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS story_search USING fts5(
+    title, episode, body, tokenize = 'unicode61'
+);
+"""
+
+# 검색 점수에서 열별 가중치 (제목 > 에피소드 > 컷 내용)
+_SEARCH_WEIGHTS = (5.0, 2.0, 1.0)
+_WORD = re.compile(r"[^\W_]+")
+
+
+def search_tokens(text):
+    """검색용 토큰 (한국어에 맞게 글자 2-gram + 단어 끝 글자)
+
+    "쌀국수를" → 쌀국, 국수, 수를, 를
+    끝 글자를 따로 넣어 두면 한 글자 검색어도 접두어 검색으로 찾을 수 있다.
+    """
+    tokens = []
+    for word in _WORD.findall(unicodedata.normalize("NFC", text or "").lower()):
+        tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        tokens.append(word[-1])
+    return tokens
+
+
+def _match_query(query):
+    """검색어를 FTS5 MATCH 식으로 변환 (모든 토큰이 들어 있어야 일치)"""
+    terms = []
+    for word in _WORD.findall(unicodedata.normalize("NFC", query or "").lower()):
+        if len(word) == 1:
+            terms.append(f'"{word}"*')
+        else:
+            terms.extend(f'"{word[i:i + 2]}"' for i in range(len(word) - 1))
+    return " ".join(dict.fromkeys(terms))
+
+
+def _story_body_text(data):
+    """검색 색인에 넣을 컷 내용 (새 형식/예전 형식 모두)"""
+    parts = data.get("packed_parts")
+    if not isinstance(parts, list):
+        parts = data.get("parts")
+    if not isinstance(parts, list):
+        return str(data.get("response_text") or "")
+    return "\n".join(str(part.get("text_content") or "") for part in parts if isinstance(part, dict))
+
+
+def is_story_filename(name):
+    """콘티 파일 이름인지 확인 (새 형식과 예전 형식 모두)"""
+    return name.endswith(STORY_SUFFIX) or name.endswith(LEGACY_SUFFIX)
+
+
+def _migrated_name(name):
+    """예전 형식 파일을 변환했을 때의 새 파일 이름 (예전 형식이 아니면 None)"""
+    if not name.endswith(LEGACY_SUFFIX):
+        return None
+    return name[:-len(LEGACY_SUFFIX)] + STORY_SUFFIX
+
+
+def svg_digest(svg_code):
+    """SVG 본문 해시 (blob 이름, 썸네일 캐시 키에 사용)"""
+    return hashlib.sha256(svg_code.encode("utf-8")).hexdigest()
+
+
+def story_svg_digests(data):
+    """콘티 데이터의 컷별 SVG 해시 목록 (그림 없는 컷은 "")
+
+    새 형식 파일(packed_parts)은 저장된 blob 해시를, 본문이 있는 데이터는
+    SVG 를 직접 해시한다.
+    """
+    if isinstance(data.get("packed_parts"), list):
+        return [str(item.get("svg") or "") if isinstance(item, dict) else "" for item in data["packed_parts"]]
+    parts = data.get("parts")
+    if not isinstance(parts, list):
+        return []
+    return [
+        svg_digest(part["svg_code"]) if isinstance(part, dict) and part.get("svg_code") else ""
+        for part in parts
+    ]
+
+
+def _blob_path(digest):
+    return BLOB_DIR / digest[:2] / f"{digest}.svg.gz"
+
+
+def _put_blob(svg_code):
+    """SVG 본문을 blob으로 저장하고 해시 반환 (이미 있으면 쓰지 않음)"""
+    digest = svg_digest(svg_code)
+    path = _blob_path(digest)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _atomic_write(path, gzip.compress(svg_code.encode("utf-8"), mtime=0))
+    return digest
+
+
+@lru_cache(maxsize=4096)
+def _get_blob(digest):
+    """blob 읽기 (내용이 바뀌지 않으므로 프로세스 안에서 캐시)"""
+    with gzip.open(_blob_path(digest), "rb") as f:
+        return f.read().decode("utf-8")
+
+
+def _pack_parts(parts_data):
+    """저장용 part 목록 (SVG 본문 대신 blob 해시)"""
+    packed = []
+    for part in parts_data:
+        item = {"cut_number": part["cut_number"], "text_content": part["text_content"]}
+        item["svg"] = _put_blob(part["svg_code"]) if part.get("svg_code") else None
+        if part.get("svg_codes"):
+            item["svgs"] = [_put_blob(svg_code) for svg_code in part["svg_codes"]]
+        if part.get("scene") is not None:
+            item["scene"] = part["scene"]
+        packed.append(item)
+    return packed
+
+
+def _unpack_parts(packed):
+    """_pack_parts() 의 반대 (blob 해시를 SVG 본문으로)"""
+    parts = []
+    for item in packed:
+        part = {
+            "cut_number": item["cut_number"],
+            "text_content": item["text_content"],
+            "svg_code": _get_blob(item["svg"]) if item.get("svg") else "",
+        }
+        if item.get("svgs"):
+            part["svg_codes"] = [_get_blob(digest) for digest in item["svgs"]]
+        if item.get("scene") is not None:
+            part["scene"] = item["scene"]
+        parts.append(part)
+    return parts
+
+
+def _decode_story(raw):
+    """콘티 파일 바이트를 dict로 (내용이 손상됐으면 ValueError)"""
+    try:
+        # 확장자 대신 gzip 헤더로 형식 판단 (변환 중 임시 파일도 읽을 수 있음)
+        if raw[:2] == _GZIP_MAGIC:
+            raw = gzip.decompress(raw)
+        data = json.loads(raw.decode("utf-8"))
+    except (OSError, EOFError, zlib.error, ValueError) as e:
+        # gzip.BadGzipFile 은 OSError, 잘린 파일은 EOFError
+        raise ValueError(f"손상된 콘티 파일: {e}")
+    if not isinstance(data, dict):
+        raise ValueError("콘티 파일 형식이 아닙니다")
+    return data
+
+
+def _read_story_file(filepath):
+    """콘티 파일 하나를 읽어서 dict로 반환 (읽을 수 없으면 None)
+
+    새 형식은 part의 SVG가 blob 해시인 상태 그대로 반환한다.
+    (카탈로그처럼 메타데이터만 필요한 곳에서 사용)
+    """
+    try:
+        with open(filepath, "rb") as f:
+            return _decode_story(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _atomic_write(path, data):
+    """같은 디렉토리의 임시 파일에 쓰고 fsync 한 뒤 이름을 바꿔서 기록
+
+    중간에 죽어도 반쯤 쓴 파일이 원래 이름으로 남지 않는다.
+    (임시 파일은 .tmp 로 끝나서 콘티 파일로 잡히지 않음)
+    """
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            tmp_path.unlink()
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def _quarantine(filepath):
+    """읽을 수 없는 콘티 파일을 quarantine/ 으로 옮기고 새 경로 반환"""
+    return _move_aside(filepath, QUARANTINE_DIR_NAME)
+
+
+def _move_aside(filepath, dir_name):
+    """파일을 같은 디렉토리의 dir_name/ 으로 옮기고 새 경로 반환 (이름이 겹치면 뒤에 시각을 붙임)"""
+    filepath = Path(filepath)
+    target_dir = filepath.parent / dir_name
+    target_dir.mkdir(exist_ok=True)
+    target = target_dir / filepath.name
+    if target.exists():
+        target = target_dir / f"{filepath.name}.{time.time_ns()}"
+    os.replace(filepath, target)
+    return target
+
+
+def _load_story_file(filepath):
+    """콘티 파일 하나를 본문까지 완전히 읽기 (읽을 수 없으면 None)
+
+    새 형식은 blob에서 SVG를 채우고 response_text를 parts로 다시 만든다.
+    """
+    data = _read_story_file(filepath)
+    if data is None or "packed_parts" not in data:
+        return data
+    try:
+        parts = _unpack_parts(data.pop("packed_parts"))
+    except (OSError, EOFError, KeyError, TypeError, ValueError):
+        return None
+    data["parts"] = parts
+    data["response_text"] = compose_response_text(data.get("title") or "", parts)
+    return data
+
+
+def _story_weight(data):
+    """본문 캐시에서 차지하는 대략적인 메모리 크기"""
+    weight = len(data.get("response_text") or "")
+    for part in data.get("parts") or []:
+        weight += len(part.get("text_content") or "") + len(part.get("svg_code") or "")
+    return weight
+
+
+class StoryCatalog:
+    """저장된 콘티의 제목/생성일시와 검색 색인을 보관하는 카탈로그
+
+    목록/검색 화면은 이 카탈로그만 조회하고, 본문(response_text, SVG)은
+    선택된 콘티에 대해서만 파일에서 읽는다.
+    """
+
+    def __init__(self, db_path, storage_dir):
+        self.db_path = Path(db_path)
+        self.storage_dir = Path(storage_dir)
+        self._lock = threading.Lock()
+        self._scanned = False
+        with self._connect() as conn:
+            conn.executescript(_CATALOG_SCHEMA)
+            self._add_svgs_column(conn)
+            self.search_enabled = self._init_search(conn)
+
+    @staticmethod
+    def _add_svgs_column(conn):
+        """예전 카탈로그에 컷 SVG 해시 열 추가 (다음 refresh 때 모든 파일을 다시 읽음)"""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(stories)")}
+        if "svgs" in columns:
+            return
+        conn.execute("ALTER TABLE stories ADD COLUMN svgs TEXT NOT NULL DEFAULT ''")
+        conn.execute("UPDATE stories SET mtime_ns = 0")
+        conn.execute("DELETE FROM meta WHERE key = 'dir_mtime_ns'")
+
+    @staticmethod
+    def _init_search(conn):
+        """검색 색인 준비 (FTS5가 없는 SQLite면 검색만 끔)"""
+        try:
+            conn.executescript(_SEARCH_SCHEMA)
+        except sqlite3.OperationalError:
+            return False
+        row = conn.execute("SELECT value FROM meta WHERE key = 'search_index'").fetchone()
+        if row is None:
+            # 색인이 새로 생겼으면 다음 refresh 때 모든 파일을 다시 읽어 색인
+            conn.execute("DELETE FROM stories")
+            conn.execute("DELETE FROM story_search")
+            conn.execute("DELETE FROM meta WHERE key = 'dir_mtime_ns'")
+            conn.execute("INSERT INTO meta (key, value) VALUES ('search_index', '1')")
+        return True
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _delete(self, conn, filename):
+        row = conn.execute("SELECT rowid FROM stories WHERE filename = ?", (filename,)).fetchone()
+        if row is None:
+            return
+        conn.execute("DELETE FROM stories WHERE rowid = ?", row)
+        if self.search_enabled:
+            conn.execute("DELETE FROM story_search WHERE rowid = ?", row)
+
+    def _upsert(self, conn, filename, data, stat):
+        self._delete(conn, filename)
+        title = str(data.get("title") or "제목 없음")
+        cursor = conn.execute(
+            "INSERT INTO stories (filename, title, created_at, mtime_ns, size, svgs) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                filename,
+                title,
+                str(data.get("created_at") or ""),
+                stat.st_mtime_ns,
+                stat.st_size,
+                ",".join(story_svg_digests(data)),
+            ),
+        )
+        if self.search_enabled:
+            conn.execute(
+                "INSERT INTO story_search (rowid, title, episode, body) VALUES (?, ?, ?, ?)",
+                (
+                    cursor.lastrowid,
+                    " ".join(search_tokens(title)),
+                    " ".join(search_tokens(str(data.get("episode") or ""))),
+                    " ".join(search_tokens(_story_body_text(data))),
+                ),
+            )
+
+    def refresh(self, force=False):
+        """파일 mtime 기준으로 카탈로그를 증분 갱신
+
+        디렉토리 mtime이 그대로면 아무것도 하지 않는다. 바뀌었으면 파일들의
+        mtime만 비교해서 새로 생기거나 바뀐 파일만 파싱한다.
+        (직접 복사해 넣은 파일도 이 과정에서 잡힌다)
+        내용이 손상된 파일은 quarantine/ 으로 옮겨서 다음부터 다시 읽지 않는다.
+
+        프로세스에서 처음 부를 때는 (시작 검사) force 처럼 모든 파일의 mtime 을
+        확인해서 제자리에서 손상된 파일도 찾고, 오래된 임시 파일을 지운다.
+        """
+        try:
+            dir_mtime = self.storage_dir.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+
+        with self._lock, self._connect() as conn:
+            force = force or not self._scanned
+            self._scanned = True
+            row = conn.execute("SELECT value FROM meta WHERE key = 'dir_mtime_ns'").fetchone()
+            if not force and row and int(row[0]) == dir_mtime:
+                return
+
+            known = dict(conn.execute("SELECT filename, mtime_ns FROM stories"))
+            seen = set()
+            stale_before = time.time() - STALE_TMP_SECONDS
+            with os.scandir(self.storage_dir) as scan:
+                entries = list(scan)
+            names = {entry.name for entry in entries}
+            for entry in entries:
+                if force and entry.name.endswith(".tmp") and entry.is_file():
+                    self._remove_stale_tmp(entry, stale_before)
+                    continue
+                if not is_story_filename(entry.name) or not entry.is_file():
+                    continue
+                if _migrated_name(entry.name) in names:
+                    continue  # 이미 변환한 예전 파일은 새 파일로만 등록
+                stat = entry.stat()
+                if known.get(entry.name) == stat.st_mtime_ns:
+                    seen.add(entry.name)
+                    continue
+                try:
+                    with open(entry.path, "rb") as f:
+                        raw = f.read()
+                except OSError:
+                    # 잠깐 못 읽는 파일은 예전 정보를 두고 다음 refresh 때 다시
+                    seen.add(entry.name)
+                    continue
+                try:
+                    data = _decode_story(raw)
+                except ValueError:
+                    try:
+                        _quarantine(entry.path)
+                    except OSError:
+                        pass
+                    continue
+                seen.add(entry.name)
+                self._upsert(conn, entry.name, data, stat)
+
+            for name in known:
+                if name not in seen:
+                    self._delete(conn, name)
+            # 바뀐 게 없으면 쓰지 않음 (쓰기 트랜잭션이 없으면 커밋 fsync 도 없음)
+            if not row or int(row[0]) != dir_mtime:
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('dir_mtime_ns', ?)",
+                    (str(dir_mtime),),
+                )
+
+    @staticmethod
+    def _remove_stale_tmp(entry, stale_before):
+        try:
+            if entry.stat().st_mtime < stale_before:
+                os.unlink(entry.path)
+        except FileNotFoundError:
+            pass
+
+    def add(self, filepath, data):
+        """저장 직후 카탈로그에 한 건 추가"""
+        filepath = Path(filepath)
+        with self._lock, self._connect() as conn:
+            self._upsert(conn, filepath.name, data, filepath.stat())
+
+    def remove(self, filename):
+        """카탈로그에서 한 건 제거"""
+        with self._lock, self._connect() as conn:
+            self._delete(conn, filename)
+
+    def count(self):
+        """카탈로그에 등록된 콘티 개수"""
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM stories").fetchone()[0]
+
+    def existing(self, filenames):
+        """filenames 중 카탈로그에 있는 것들의 집합"""
+        filenames = list(filenames)
+        if not filenames:
+            return set()
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT filename FROM stories WHERE filename IN ({','.join('?' * len(filenames))})",
+                filenames,
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def list_page(self, offset=0, limit=20):
+        """파일명 역순(최신순)으로 한 페이지 분량의 메타데이터 조회"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT filename, title, created_at, svgs FROM stories "
+                "ORDER BY filename DESC LIMIT ? OFFSET ?",
+                (limit, offset),
+            ).fetchall()
+        return [StoryHandle.from_row(row) for row in rows]
+
+    def list_between(self, since, until):
+        """created_at 이 [since, until) 안인 콘티 메타데이터 (최신순, ISO 문자열 비교)"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT filename, title, created_at, svgs FROM stories "
+                "WHERE created_at >= ? AND created_at < ? ORDER BY filename DESC",
+                (since, until),
+            ).fetchall()
+        return [StoryHandle.from_row(row) for row in rows]
+
+    def search(self, query, limit=20):
+        """제목/에피소드/컷 내용 검색 결과를 관련도 순으로 조회"""
+        match = _match_query(query)
+        if not match or not self.search_enabled:
+            return []
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT s.filename, s.title, s.created_at, s.svgs FROM story_search "
+                "JOIN stories s ON s.rowid = story_search.rowid "
+                "WHERE story_search MATCH ? ORDER BY bm25(story_search, ?, ?, ?) LIMIT ?",
+                (match, *_SEARCH_WEIGHTS, limit),
+            ).fetchall()
+        return [StoryHandle.from_row(row) for row in rows]
+
+
+@dataclass(frozen=True)
+class StoryHandle:
+    """목록에서 들고 다니는 가벼운 핸들 (본문은 load()를 호출할 때 읽음)"""
+
+    filename: str
+    title: str
+    created_at: str
+    svgs: tuple = ()  # 컷별 SVG 해시 (썸네일 캐시 키)
+
+    @classmethod
+    def from_row(cls, row):
+        """카탈로그 (filename, title, created_at, svgs) 행으로 만들기"""
+        filename, title, created_at, svgs = row
+        return cls(filename, title, created_at, tuple(svgs.split(",")) if svgs else ())
+
+    def load(self):
+        """본문까지 포함한 전체 데이터 (캐시를 거침)"""
+        return load_story(self.filename)
+
+
+class StoryBodyCache:
+    """콘티 본문을 총 바이트 수로 제한하는 LRU 캐시
+
+    파일이 압축돼 있으므로 크기 제한은 풀어놓은 본문 기준으로 센다.
+    파일의 mtime/크기가 바뀌면 캐시된 본문은 무효가 된다.
+    반환된 dict는 여러 세션이 공유하므로 수정하면 안 된다.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()  # filename -> (mtime_ns, size, weight, data)
+        self._lock = threading.Lock()
+
+    def get(self, filepath):
+        filepath = Path(filepath)
+        key = filepath.name
+        try:
+            stat = filepath.stat()
+        except FileNotFoundError:
+            self.invalidate(key)
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+                self._entries.move_to_end(key)
+                return entry[3]
+
+        data = _load_story_file(filepath)
+        if data is None:
+            self.invalidate(key)
+            return None
+        data["filename"] = key
+        self._put(key, stat.st_mtime_ns, stat.st_size, _story_weight(data), data)
+        return data
+
+    def _put(self, key, mtime_ns, size, weight, data):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old:
+                self.total_bytes -= old[2]
+            # 캐시 전체보다 큰 본문은 보관하지 않음
+            if weight > self.max_bytes:
+                return
+            self._entries[key] = (mtime_ns, size, weight, data)
+            self.total_bytes += weight
+            while self.total_bytes > self.max_bytes:
+                _, (_, _, evicted_weight, _) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_weight
+
+    def invalidate(self, key):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old:
+                self.total_bytes -= old[2]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_body_cache = StoryBodyCache(BODY_CACHE_MAX_BYTES)
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """프로세스 전체에서 공유하는 카탈로그 인스턴스"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = StoryCatalog(CATALOG_PATH, STORAGE_DIR)
+    return _catalog
+
+
+def write_story_file(filepath, story_data):
+    """콘티 데이터를 압축 JSON으로 원자적으로 기록하고 파일 크기(바이트) 반환 (SVG는 blob으로 분리)"""
+    packed = {key: value for key, value in story_data.items() if key not in ("parts", "response_text")}
+    packed["packed_parts"] = _pack_parts(story_data["parts"])
+    payload = gzip.compress(json.dumps(packed, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    _atomic_write(Path(filepath), payload)
+    return len(payload)
+
+
+class StoryWriter:
+    """저장/삭제를 백그라운드 스레드 하나에서 순서대로 처리하는 write-behind 큐
+
+    save()/delete() 는 파일 경로나 Future 를 바로 돌려주고, 파일 기록과
+    카탈로그 커밋은 작업 스레드가 한다. 끝나기 전에도 목록/본문 조회가
+    방금 저장한 콘티는 보고 지운 콘티는 안 보도록 pending_* / deleting() 을
+    제공한다 (list_stories() 등이 반영함).
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = {}  # 파일명 -> (StoryHandle, 콘티 데이터)
+        self._deleting = set()
+        self._thread = None
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="story-writer")
+                self._thread.start()
+                # 프로세스가 끝날 때 남은 기록을 마저 씀
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            func, args, future, done = self._queue.get()
+            try:
+                future.set_result(func(*args))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    done()
+                self._queue.task_done()
+
+    def save(self, title, episode, response_text, parts_data, on_saved=None):
+        """저장을 큐에 넣고 (파일 경로, Future) 반환
+
+        Future 의 결과는 기록된 파일 크기(바이트). on_saved(filepath, size) 는
+        기록이 끝난 뒤 작업 스레드에서 불린다 (썸네일 미리 만들기 등).
+        """
+        _ensure_storage_dir()
+        catalog = get_catalog()
+        filepath = _new_story_path(title)
+        story_data = _new_story_data(title, episode, response_text, parts_data)
+        handle = StoryHandle(filepath.name, title, story_data["created_at"], tuple(story_svg_digests(story_data)))
+        future = Future()
+        with self._lock:
+            self._pending[filepath.name] = (handle, dict(story_data, filename=filepath.name))
+
+        def write():
+            size = _write_new_story(filepath, story_data, catalog)
+            if on_saved is not None:
+                on_saved(filepath, size)
+            return size
+
+        self._queue.put((write, (), future, lambda: self._pending.pop(filepath.name, None)))
+        self._start()
+        return filepath, future
+
+    def delete(self, filename):
+        """삭제를 큐에 넣고 Future 반환 (결과는 delete_story() 와 같음)"""
+        future = Future()
+        with self._lock:
+            self._deleting.add(filename)
+        self._queue.put((delete_story, (filename,), future, lambda: self._deleting.discard(filename)))
+        self._start()
+        return future
+
+    def flush(self):
+        """큐에 들어간 기록이 모두 끝날 때까지 기다림"""
+        self._queue.join()
+
+    def pending_handles(self):
+        """아직 기록 중인 저장들의 핸들"""
+        with self._lock:
+            return [handle for handle, _ in self._pending.values()]
+
+    def pending_story(self, filename):
+        """아직 기록 중인 콘티의 데이터 (없으면 None)"""
+        if not self._pending:
+            return None
+        with self._lock:
+            entry = self._pending.get(filename)
+        return entry[1] if entry else None
+
+    def deleting(self):
+        """삭제를 기다리는 파일명 집합"""
+        if not self._deleting:
+            return set()
+        with self._lock:
+            return set(self._deleting)
+
+
+_writer = StoryWriter()
+
+
+def get_story_writer():
+    """프로세스 전체에서 공유하는 write-behind 큐"""
+    return _writer
+
+
+def _with_pending(handles, offset=0, limit=None):
+    """조회 결과에 아직 기록 중인 저장/삭제를 반영 (첫 페이지에만 새 콘티를 끼움)"""
+    deleting = _writer.deleting()
+    handles = [handle for handle in handles if handle.filename not in deleting]
+    if offset == 0 and limit is not None:
+        listed = {handle.filename for handle in handles}
+        added = [handle for handle in _writer.pending_handles() if handle.filename not in listed]
+        if added:
+            handles = sorted(added + handles, key=lambda handle: handle.filename, reverse=True)[:limit]
+    return handles
+
+
+def set_storage_dir(storage_dir):
+    """저장 위치를 바꿈 (벤치마크/테스트용 임시 디렉토리)
+
+    카탈로그 DB는 디렉토리 옆 <이름>.sqlite3 에 두고, 카탈로그와
+    본문/blob 캐시는 새 위치 기준으로 다시 만든다.
+    """
+    global STORAGE_DIR, BLOB_DIR, CATALOG_PATH, _catalog, _body_cache
+    # 예전 위치로 가는 기록을 먼저 끝냄
+    _writer.flush()
+    storage_dir = Path(storage_dir).absolute()
+    storage_dir.mkdir(parents=True, exist_ok=True)
+    with _catalog_lock:
+        STORAGE_DIR = storage_dir
+        BLOB_DIR = storage_dir / "blobs"
+        CATALOG_PATH = storage_dir.with_name(storage_dir.name + ".sqlite3")
+        _catalog = None
+        _body_cache = StoryBodyCache(BODY_CACHE_MAX_BYTES)
+        _get_blob.cache_clear()
+
+
+def _ensure_storage_dir():
+    try:
+        STORAGE_DIR.mkdir(parents=True, exist_ok=True)
+    except Exception as e:
+        raise Exception(f"저장 디렉토리 생성 실패: {e}")
+
+
+def _new_story_path(title):
+    """겹치지 않는 새 콘티 파일 경로 ({시각}_{무작위}_{제목}.json.gz)
+
+    같은 초에 같은 제목으로 여러 세션이 저장해도 덮어쓰지 않도록 무작위
+    토큰을 붙이고, 이미 있거나 기록 대기 중인 이름이면 다시 뽑는다.
+    """
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # 파일명에 사용할 수 없는 문자 제거
+    safe_title = re.sub(r'[<>:"/\\|?*]', '', title[:20])
+    safe_title = safe_title.strip()
+    if not safe_title:
+        safe_title = "제목없음"
+    while True:
+        filepath = STORAGE_DIR / f"{timestamp}_{secrets.token_hex(4)}_{safe_title}{STORY_SUFFIX}"
+        if not filepath.exists() and _writer.pending_story(filepath.name) is None:
+            return filepath
+
+
+def _new_story_data(title, episode, response_text, parts_data):
+    return {
+        "title": title,
+        "episode": episode,
+        "created_at": datetime.now().isoformat(),
+        "response_text": response_text,
+        "parts": parts_data
+    }
+
+
+def _write_new_story(filepath, story_data, catalog):
+    """새 콘티 파일을 기록하고 카탈로그에 추가, 파일 크기 반환"""
+    try:
+        size = write_story_file(filepath, story_data)
+    except Exception as e:
+        raise Exception(f"파일 저장 실패: {e}, 경로: {filepath}")
+
+    # 카탈로그 갱신 (실패해도 다음 refresh 때 mtime으로 다시 잡힘)
+    try:
+        catalog.add(filepath, story_data)
+    except sqlite3.Error:
+        pass
+    return size
+
+
+def save_story(title, episode, response_text, parts_data):
+    """콘티를 압축 JSON 파일로 저장 (기록이 끝날 때까지 기다림)
+
+    response_text는 parts로 다시 만들 수 있으므로 따로 저장하지 않는다.
+    화면에서는 기다리지 않는 get_story_writer().save() 를 쓴다.
+    """
+    _ensure_storage_dir()
+    filepath = _new_story_path(title)
+    _write_new_story(filepath, _new_story_data(title, episode, response_text, parts_data), get_catalog())
+    return filepath
+
+
+def refresh_catalog(force=False):
+    """카탈로그를 디스크 상태와 맞춤"""
+    get_catalog().refresh(force=force)
+
+
+def count_stories():
+    """저장된 콘티 개수 (카탈로그 기준, 기록 중인 저장/삭제 포함)"""
+    catalog = get_catalog()
+    catalog.refresh()
+    added = {handle.filename for handle in _writer.pending_handles()}
+    deleting = _writer.deleting()
+    if not added and not deleting:
+        return catalog.count()
+    existing = catalog.existing(added | deleting)
+    return catalog.count() + len(added - deleting - existing) - len(deleting & existing)
+
+
+def list_stories(offset=0, limit=20):
+    """저장된 콘티 목록 한 페이지 (StoryHandle 목록, 본문은 읽지 않음)"""
+    catalog = get_catalog()
+    catalog.refresh()
+    return _with_pending(catalog.list_page(offset, limit), offset, limit)
+
+
+def list_stories_between(since, until):
+    """since ~ until 날짜(포함)에 만든 콘티 목록 (StoryHandle 목록, 최신순)"""
+    catalog = get_catalog()
+    catalog.refresh()
+    return _with_pending(catalog.list_between(since.isoformat(), (until + timedelta(days=1)).isoformat()))
+
+
+def search_stories(query, limit=20):
+    """저장된 콘티 검색 (StoryHandle 목록, 관련도 순)"""
+    catalog = get_catalog()
+    catalog.refresh()
+    return _with_pending(catalog.search(query, limit))
+
+
+def load_story(filename):
+    """콘티 한 건의 전체 데이터 불러오기 (본문 캐시 사용, 기록 중인 콘티는 메모리에서)"""
+    if filename in _writer.deleting():
+        return None
+    pending = _writer.pending_story(filename)
+    if pending is not None:
+        return pending
+    return _body_cache.get(STORAGE_DIR / filename)
+
+
+def delete_story(filename):
+    """콘티 파일 삭제 후 카탈로그에서도 제거 (화면에서는 get_story_writer().delete())
+
+    blob은 다른 콘티와 공유할 수 있으므로 남겨두고, 정리는
+    migrate_storage.py --gc 로 한다.
+    """
+    filepath = STORAGE_DIR / filename
+    deleted = False
+    if filepath.exists():
+        filepath.unlink()
+        deleted = True
+    _body_cache.invalidate(filename)
+    get_catalog().remove(filename)
+    return deleted
+
+
+def load_saved_stories(offset=0, limit=None):
+    """저장된 콘티 목록 불러오기 (본문 포함, 카탈로그 페이지 단위)"""
+    catalog = get_catalog()
+    catalog.refresh()
+    if limit is None:
+        limit = -1  # SQLite: LIMIT -1 은 제한 없음
+    stories = []
+    for handle in catalog.list_page(offset, limit):
+        data = handle.load()
+        if data is not None:
+            stories.append(data)
+    return stories
+
+
+def migrate_story_file(filepath, keep_legacy=False):
+    """예전 형식(.json) 콘티 파일 하나를 새 형식으로 변환
+
+    생성일시 등은 그대로 두고, 새 파일 경로를 반환한다. 새 파일이 이미 있으면
+    변환하지 않는다. 예전 파일은 지우거나, keep_legacy 면 legacy/ 로 옮긴다
+    (STORAGE_DIR 에 두면 카탈로그에 같은 콘티가 두 번 잡힘).
+    """
+    filepath = Path(filepath)
+    new_path = filepath.with_name(_migrated_name(filepath.name))
+    if new_path.exists():
+        _retire_legacy(filepath, keep_legacy)
+        return new_path
+    data = _read_story_file(filepath)
+    if data is None:
+        raise Exception(f"콘티 파일을 읽을 수 없습니다: {filepath}")
+    if "packed_parts" in data:
+        return filepath
+    # parts가 없는 아주 오래된 파일은 response_text를 다시 파싱
+    if not isinstance(data.get("parts"), list):
+        from story_parser import parse_story_parts
+        _, data["parts"] = parse_story_parts(data.get("response_text") or "")
+
+    tmp_path = new_path.with_name(new_path.name + ".tmp")
+    story_data = {key: value for key, value in data.items() if key != "filename"}
+    write_story_file(tmp_path, story_data)
+    # 옮기기 전에 다시 읽어서 parts가 같은지 확인
+    restored = _load_story_file(tmp_path)
+    if restored is None or restored["parts"] != _unpack_parts(_pack_parts(data["parts"])):
+        tmp_path.unlink()
+        raise Exception(f"변환 결과 검증 실패: {filepath}")
+    os.replace(tmp_path, new_path)
+    # 예전 파일과 같은 mtime을 유지 (목록 순서/카탈로그 판단에 영향 없음)
+    stat = filepath.stat()
+    os.utime(new_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    _retire_legacy(filepath, keep_legacy)
+    return new_path
+
+
+def _retire_legacy(filepath, keep_legacy):
+    """변환이 끝난 예전 파일을 지우거나 legacy/ 로 옮김"""
+    if keep_legacy:
+        _move_aside(filepath, LEGACY_DIR_NAME)
+    else:
+        filepath.unlink()
+    _body_cache.invalidate(filepath.name)
+
+
+def collect_garbage_blobs():
+    """어느 콘티에서도 쓰지 않는 blob 삭제 후 (삭제 개수, 바이트) 반환
+
+    저장 중인 콘티가 쓰려는 blob을 지울 수 있으므로 앱을 멈춘 상태에서 실행한다.
+    """
+    referenced = set()
+    for entry in os.scandir(STORAGE_DIR):
+        if not entry.name.endswith(STORY_SUFFIX) or not entry.is_file():
+            continue
+        data = _read_story_file(entry.path)
+        if data is None:
+            # 읽을 수 없는 파일이 있으면 무엇을 참조하는지 모르므로 정리하지 않음
+            raise Exception(f"콘티 파일을 읽을 수 없어 정리를 중단합니다: {entry.name}")
+        for item in data.get("packed_parts") or []:
+            if item.get("svg"):
+                referenced.add(item["svg"])
+            referenced.update(item.get("svgs") or [])
+
+    removed = 0
+    freed = 0
+    if not BLOB_DIR.exists():
+        return removed, freed
+    for path in BLOB_DIR.glob("*/*.svg.gz"):
+        if path.name[:-len(".svg.gz")] in referenced:
+            continue
+        freed += path.stat().st_size
+        path.unlink()
+        removed += 1
+    _get_blob.cache_clear()
+    return removed, freed
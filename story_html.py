@@ -0,0 +1,33 @@
+"""콘티 화면에 넣을 HTML 조립 (Streamlit 없이 측정할 수 있도록 app.py 에서 분리)"""
+from svg_optimizer import share_repeated_parts
+
+
+def svg_frame_html(svg_code):
+    """SVG 하나를 400x400 액자 div 로 감싼 HTML"""
+    return f"""
+            <div style="width: 100%; max-width: 400px; height: 400px; margin: 10px auto; border: 2px solid #eee; border-radius: 10px; overflow: hidden; background-color: white; display: flex; align-items: center; justify-content: center;">
+                {svg_code}
+            </div>
+        """
+
+
+def render_cut_html(part):
+    """컷 하나의 그림 HTML 목록 (한 컷에 SVG가 여러 개면 svg_codes 를 모두 사용)"""
+    return [svg_frame_html(svg_code) for svg_code in part.get('svg_codes') or [part['svg_code']] if svg_code]
+
+
+def render_story_html(parts_data):
+    """(공유 정의 SVG, 컷별 그림 HTML 목록) 반환
+
+    여러 컷에 반복되는 캐릭터 부품은 공유 정의에 한 번만 넣고 <use>로 참조한다.
+    """
+    svg_lists = [part.get('svg_codes') or [part['svg_code']] for part in parts_data]
+    sprite, shared_svgs = share_repeated_parts([svg_code for svg_codes in svg_lists for svg_code in svg_codes])
+
+    cut_html = []
+    position = 0
+    for part, svg_codes in zip(parts_data, svg_lists):
+        shared = shared_svgs[position:position + len(svg_codes)]
+        position += len(svg_codes)
+        cut_html.append(render_cut_html(dict(part, svg_code=shared[0], svg_codes=shared if len(shared) > 1 else None)))
+    return sprite, cut_html
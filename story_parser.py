@@ -0,0 +1,261 @@
+import json
+import re
+
+from scene_renderer import render_scene
+
+# 컷 구분자: 프롬프트는 "||||" 를 쓰지만 예전 응답은 "|||" 라서 3개 이상 연속이면 구분자로 본다
+_SEPARATOR = re.compile(r"\|{3,}")
+# 본문에서 찾는 토큰: 구분자, ```svg / ```xml / ```scene 펜스, <svg 시작 태그
+_TEXT_TOKEN = re.compile(r"\|{3,}|```(?:svg|xml|scene)(?![\w-])|<svg(?![\w-])", re.IGNORECASE)
+# 대문자로 쓴 SVG 닫는 태그
+_SVG_CLOSE = re.compile(r"</svg>", re.IGNORECASE)
+# 조각 끝에 걸쳐 있을 수 있는 가장 긴 토큰 길이 ("```scene")
+_HOLD = 8
+
+_TITLE, _TEXT, _SVG, _AFTER_SVG = range(4)
+
+
+class StoryParser:
+    """응답 텍스트를 한 번만 훑어서 제목/컷/본문/SVG로 나누는 파서
+
+    feed()로 스트리밍 조각을 넣을 수 있고, 제목이나 컷이 완성될 때마다
+    ("title", 제목) / ("cut", part) 이벤트 목록을 돌려준다.
+    SVG는 버퍼에서 한 번만 잘라내고, 펜스가 닫히지 않았거나 한 컷에
+    SVG가 여러 개 있어도 처리한다. ```scene 장면 설명(JSON)은
+    scene_renderer 로 SVG를 그려서 같은 자리에 넣는다.
+    """
+
+    def __init__(self):
+        self.title = None
+        self.parts = []
+        self._buf = ""
+        self._pos = 0     # 아직 본문으로 넘기지 않은 위치 (SVG 상태에서는 블록 시작)
+        self._scan = 0    # 다음 토큰 검색 위치
+        self._svg_start = 0
+        self._fenced = False
+        self._state = _TITLE
+        self._pieces = []
+        self._svgs = []
+        self._scene = None
+        self._emitted = None
+        self._events = []
+
+    def feed(self, chunk):
+        """응답 조각을 추가하고 새로 완성된 이벤트 목록을 반환"""
+        if chunk:
+            if self._pos:
+                # 이미 처리한 앞부분은 버리고 남은 부분만 유지
+                self._buf = self._buf[self._pos:] + chunk
+                self._scan -= self._pos
+                self._svg_start -= self._pos
+                self._pos = 0
+            else:
+                self._buf += chunk
+            self._run(final=False)
+        return self._take_events()
+
+    def close(self):
+        """입력이 끝났음을 알리고 남은 이벤트 목록을 반환"""
+        self._run(final=True)
+        self._pieces.append(self._buf[self._pos:])
+        self._pos = len(self._buf)
+        self._finish_segment()
+        return self._take_events()
+
+    def _take_events(self):
+        events, self._events = self._events, []
+        return events
+
+    def _run(self, final):
+        buf = self._buf
+        while True:
+            if self._state == _AFTER_SVG:
+                # ```svg 로 열었으면 공백 뒤의 닫는 ``` 까지 먹음 (없으면 그냥 넘어감)
+                j = self._skip_space(self._pos)
+                rest = buf[j:j + 3]
+                if not final and len(rest) < 3 and "```".startswith(rest):
+                    return
+                if rest == "```":
+                    self._pos = self._scan = j + 3
+                self._state = _TEXT
+                self._emit_cut()
+                continue
+
+            if self._state == _SVG:
+                end = self._find_svg_end(self._scan)
+                sep = buf.find("|||", self._scan, len(buf) if end == -1 else end)
+                if sep != -1:
+                    # SVG가 닫히기 전에 다음 컷이 시작됨: 원문 그대로 본문에 남김
+                    self._pieces.append(buf[self._pos:sep])
+                    self._pos = self._scan = sep
+                    self._state = _TEXT
+                    continue
+                if end == -1:
+                    if not final:
+                        self._scan = max(self._scan, len(buf) - _HOLD)
+                        return
+                    # 끝까지 닫히지 않은 SVG는 원문 그대로 본문에 남김
+                    self._pieces.append(buf[self._pos:])
+                    self._pos = self._scan = len(buf)
+                    self._state = _TEXT
+                    continue
+                self._svgs.append(buf[self._svg_start:end])
+                self._pos = self._scan = end
+                if self._fenced:
+                    self._state = _AFTER_SVG
+                else:
+                    self._state = _TEXT
+                    self._emit_cut()
+                continue
+
+            pattern = _SEPARATOR if self._state == _TITLE else _TEXT_TOKEN
+            m = pattern.search(buf, self._scan)
+            if m is None:
+                if not final:
+                    self._scan = max(self._scan, len(buf) - _HOLD)
+                return
+            if m.end() == len(buf) and not final:
+                # 토큰이 조각 끝에 걸려 있으면 더 받아보고 판단
+                self._scan = m.start()
+                return
+
+            token = m.group()
+            if token[0] == "|":
+                self._pieces.append(buf[self._pos:m.start()])
+                self._pos = self._scan = m.end()
+                self._finish_segment()
+            elif token[3:].lower() == "scene":
+                close = buf.find("```", m.end())
+                if close == -1 and not final:
+                    self._scan = m.start()
+                    return
+                scene = self._render_scene_block(buf[m.end():close]) if close != -1 else None
+                if scene is None:
+                    # 닫히지 않았거나 해석할 수 없는 장면 블록은 원문 그대로 본문에 남김
+                    self._scan = m.end()
+                    continue
+                self._pieces.append(buf[self._pos:m.start()])
+                self._pos = self._scan = close + 3
+                self._emit_cut()
+            elif token[0] == "`":
+                j = self._skip_space(m.end())
+                if not final and len(buf) - j < 5:
+                    self._scan = m.start()
+                    return
+                if buf[j:j + 4].lower() == "<svg" and not (buf[j + 4:j + 5].isalnum()):
+                    self._open_svg(m.start(), j, fenced=True)
+                else:
+                    self._scan = m.end()
+            else:
+                self._open_svg(m.start(), m.start(), fenced=False)
+
+    def _find_svg_end(self, start):
+        """</svg> 닫는 태그 바로 뒤 위치 (없으면 -1)"""
+        # 대부분 소문자라서 str.find로 먼저 찾고, 그 앞에 대문자 닫는 태그가
+        # 있는지만 대소문자 무시로 검색 (뒤 컷의 소문자 태그를 잡지 않게)
+        i = self._buf.find("</svg>", start)
+        m = _SVG_CLOSE.search(self._buf, start, len(self._buf) if i == -1 else i)
+        if m:
+            return m.end()
+        return i + 6 if i != -1 else -1
+
+    def _render_scene_block(self, source):
+        """장면 설명 JSON을 SVG로 그려서 현재 컷에 추가 (실패하면 None)"""
+        try:
+            scene = json.loads(source)
+            svg_code = render_scene(scene)
+        except ValueError:
+            return None
+        if self._scene is None:
+            self._scene = scene
+        self._svgs.append(svg_code)
+        return scene
+
+    def _skip_space(self, i):
+        buf = self._buf
+        while i < len(buf) and buf[i].isspace():
+            i += 1
+        return i
+
+    def _open_svg(self, block_start, svg_start, fenced):
+        self._pieces.append(self._buf[self._pos:block_start])
+        self._pos = block_start
+        self._svg_start = svg_start
+        self._scan = svg_start + 4
+        self._fenced = fenced
+        self._state = _SVG
+
+    def _current_part(self):
+        part = {
+            "cut_number": len(self.parts) + 1,
+            "text_content": "".join(self._pieces).strip(),
+            "svg_code": self._svgs[0] if self._svgs else None
+        }
+        if len(self._svgs) > 1:
+            part["svg_codes"] = list(self._svgs)
+        if self._scene is not None:
+            part["scene"] = self._scene
+        return part
+
+    def _emit_cut(self):
+        part = self._current_part()
+        if part != self._emitted:
+            self._emitted = part
+            self._events.append(("cut", part))
+
+    def _finish_segment(self):
+        if self._state == _TITLE:
+            title = "".join(self._pieces).strip()
+            # "제목:" 부분 제거
+            if title.startswith("제목:"):
+                title = title.replace("제목:", "").strip()
+            self.title = title or "제목 없음"
+            self._events.append(("title", self.title))
+            self._state = _TEXT
+        else:
+            self._emit_cut()
+            self.parts.append(self._emitted)
+        self._pieces = []
+        self._svgs = []
+        self._scene = None
+        self._emitted = None
+
+
+def iter_story_events(chunks):
+    """스트리밍 응답 조각을 받아 제목과 각 컷이 완성되는 대로 이벤트로 내보냄
+
+    ("title", 제목) 과 ("cut", part) 튜플을 순서대로 yield 한다.
+    컷은 SVG가 닫히면 바로 내보내고, 이후 내용이 더 붙으면 같은
+    cut_number 로 다시 내보낸다.
+    """
+    parser = StoryParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+def parse_story_parts(response_text):
+    """응답 텍스트를 파싱하여 구조화된 데이터로 변환"""
+    parser = StoryParser()
+    parser.feed(response_text)
+    parser.close()
+    return parser.title, parser.parts
+
+
+def compose_response_text(title, parts):
+    """제목과 컷 목록을 한 번에 생성한 응답과 같은 형식의 텍스트로 합침
+
+    parse_story_parts()로 다시 파싱하면 같은 제목과 컷이 나온다.
+    """
+    sections = [f"제목: {title}"]
+    for part in parts:
+        section = _SEPARATOR.sub("", part["text_content"])
+        svg_codes = part.get("svg_codes") or ([part["svg_code"]] if part.get("svg_code") else [])
+        if part.get("scene") is not None:
+            # 장면 설명에서 그린 SVG는 장면 블록으로 되돌려 씀
+            section += f"\n```scene\n{json.dumps(part['scene'], ensure_ascii=False)}\n```"
+            svg_codes = svg_codes[1:]
+        for svg_code in svg_codes:
+            section += f"\n```svg\n{svg_code}\n```"
+        sections.append(section)
+    return "\n||||\n".join(sections)
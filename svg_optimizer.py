@@ -0,0 +1,340 @@
+"""파싱한 SVG를 저장/표시 전에 가볍게 만드는 최적화 단계
+
+- 주석과 태그 사이 공백 제거
+- 좌표/크기를 소수 첫째 자리로 반올림 (1 보다 작은 값은 유효 숫자 두 자리)
+- 뒤에 그려지는 불투명 사각형(들)에 완전히 가려지는 도형 제거
+- 여러 컷에 똑같이 반복되는 캐릭터 부품은 화면에 그릴 때 <defs>/<use>로 공유
+
+보이는 결과는 그대로 두는 것이 원칙이라, 확실하지 않은 경우
+(변환/투명도/스타일이 있는 도형 등)는 손대지 않는다.
+"""
+import hashlib
+import re
+import xml.etree.ElementTree as ET
+
+SVG_NS = "http://www.w3.org/2000/svg"
+XLINK_NS = "http://www.w3.org/1999/xlink"
+ET.register_namespace("", SVG_NS)
+ET.register_namespace("xlink", XLINK_NS)
+
+# 반올림할 숫자 속성 (투명도는 작은 차이도 보이므로 그대로 둠)
+_NUMERIC_ATTRS = {
+    "x", "y", "width", "height", "cx", "cy", "r", "rx", "ry",
+    "x1", "y1", "x2", "y2", "stroke-width", "font-size",
+}
+# 숫자 목록이 들어 있는 속성
+_NUMBER_LIST_ATTRS = {"points", "d"}
+_DECIMAL = re.compile(r"-?\d+\.\d+")
+_COMMENT = re.compile(r"<!--.*?-->", re.DOTALL)
+_BETWEEN_TAGS = re.compile(r">\s+<")
+
+# 가려짐 판단에서 제외하는 속성 (결과를 확신할 수 없음)
+# 안 보이는(display/visibility) 사각형은 아무것도 가리지 않고, style 은 이런 속성을 담을 수 있음
+_UNSAFE_ATTRS = {
+    "transform", "style", "filter", "mask", "clip-path", "class", "id", "display", "visibility",
+}
+# <use>로 공유하는 요소 (루트 <svg> 나 <g> 바로 아래에 있을 때만)
+# 그라디언트/패턴/defs/clipPath/mask/symbol/marker/text 안에는 <use> 를 둘 수 없으므로 들어가지 않음
+_SHAREABLE_TAGS = {"path", "rect", "circle", "ellipse", "line", "polygon", "polyline", "g"}
+# <use href="#p12345678"/> 와 id="p12345678" 의 길이 (공유해서 줄어드는지 판단용)
+_USE_LENGTH = 24
+_ID_LENGTH = 14
+
+
+def _fmt(value):
+    """숫자를 짧게 표기 (소수 첫째 자리까지, 1 보다 작으면 유효 숫자 두 자리)
+
+    0.04 같은 작은 굵기/좌표가 0 이 되어 도형이 사라지지 않게 한다.
+    """
+    if 0 < abs(value) < 1:
+        return f"{value:.2g}".replace("e-0", "e-")
+    value = round(value, 1)
+    if value == int(value):
+        return str(int(value))
+    return str(value)
+
+
+def _round_attr(value):
+    try:
+        return _fmt(float(value))
+    except ValueError:
+        return value
+
+
+def _round_number_list(value):
+    return _DECIMAL.sub(lambda m: _fmt(float(m.group())), value)
+
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _float(element, name, default=0.0):
+    try:
+        return float(element.get(name, default))
+    except ValueError:
+        return None
+
+
+def _stroke_margin(element):
+    if element.get("stroke") in (None, "none"):
+        return 0.0
+    width = _float(element, "stroke-width", 1.0)
+    return None if width is None else width / 2
+
+
+def _bbox(element):
+    """도형이 칠하는 영역의 외곽 사각형 (계산할 수 없으면 None)"""
+    if any(name in element.attrib for name in _UNSAFE_ATTRS) or len(element):
+        return None
+    tag = _local(element.tag)
+    margin = _stroke_margin(element)
+    if margin is None:
+        return None
+    if tag == "rect":
+        x, y, w, h = (_float(element, n) for n in ("x", "y", "width", "height"))
+        if None in (x, y, w, h):
+            return None
+        box = (x, y, x + w, y + h)
+    elif tag == "circle":
+        cx, cy, r = (_float(element, n) for n in ("cx", "cy", "r"))
+        if None in (cx, cy, r):
+            return None
+        box = (cx - r, cy - r, cx + r, cy + r)
+    elif tag == "ellipse":
+        cx, cy, rx, ry = (_float(element, n) for n in ("cx", "cy", "rx", "ry"))
+        if None in (cx, cy, rx, ry):
+            return None
+        box = (cx - rx, cy - ry, cx + rx, cy + ry)
+    elif tag == "line":
+        x1, y1, x2, y2 = (_float(element, n) for n in ("x1", "y1", "x2", "y2"))
+        if None in (x1, y1, x2, y2):
+            return None
+        box = (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+    elif tag in ("polygon", "polyline"):
+        try:
+            numbers = [float(n) for n in re.split(r"[\s,]+", element.get("points", "").strip()) if n]
+        except ValueError:
+            return None
+        if len(numbers) < 2 or len(numbers) % 2:
+            return None
+        xs, ys = numbers[0::2], numbers[1::2]
+        box = (min(xs), min(ys), max(xs), max(ys))
+    else:
+        return None
+    return (box[0] - margin, box[1] - margin, box[2] + margin, box[3] + margin)
+
+
+def _opaque_rect(element):
+    """다른 도형을 완전히 덮을 수 있는 불투명 사각형이면 그 영역"""
+    if _local(element.tag) != "rect" or element.get("rx") or element.get("ry"):
+        return None
+    fill = (element.get("fill") or "black").strip().lower()
+    if fill in ("none", "transparent") or fill.startswith(("url(", "rgba", "hsla")):
+        return None
+    if len(fill) in (5, 9) and fill.startswith("#"):
+        return None  # #rgba / #rrggbbaa 반투명 색
+    for name in ("opacity", "fill-opacity"):
+        if element.get(name) is not None and _float(element, name) != 1.0:
+            return None
+    box = _bbox(element)
+    if box is None:
+        return None
+    # 테두리는 반투명일 수 있으니 채우기 영역만 덮는 것으로 봄
+    margin = _stroke_margin(element) or 0.0
+    return (box[0] + margin, box[1] + margin, box[2] - margin, box[3] - margin)
+
+
+def _subtract(box, cover):
+    """box 에서 cover 를 뺀 나머지 사각형 목록"""
+    x0, y0, x1, y1 = box
+    cx0, cy0, cx1, cy1 = cover
+    if cx0 >= x1 or cx1 <= x0 or cy0 >= y1 or cy1 <= y0:
+        return [box]
+    rest = []
+    if cy0 > y0:
+        rest.append((x0, y0, x1, cy0))
+    if cy1 < y1:
+        rest.append((x0, cy1, x1, y1))
+    top, bottom = max(y0, cy0), min(y1, cy1)
+    if cx0 > x0:
+        rest.append((x0, top, cx0, bottom))
+    if cx1 < x1:
+        rest.append((cx1, top, x1, bottom))
+    return rest
+
+
+def _is_covered(box, covers):
+    remaining = [box]
+    for cover in covers:
+        remaining = [piece for r in remaining for piece in _subtract(r, cover)]
+        if not remaining:
+            return True
+    return False
+
+
+def _drop_occluded(root):
+    """뒤에 그려지는 불투명 사각형들에 완전히 가려지는 최상위 도형 제거"""
+    children = list(root)
+    covers = []
+    # 뒤에서부터 훑으면서 지금까지 나온(=나중에 그려지는) 불투명 사각형으로 판단
+    for child in reversed(children):
+        box = _bbox(child)
+        if box is not None and covers and _is_covered(box, covers):
+            root.remove(child)
+            continue
+        cover = _opaque_rect(child)
+        if cover is not None:
+            covers.append(cover)
+
+
+def _clean(element):
+    for child in element.iter():
+        if child.text is not None and not child.text.strip():
+            child.text = None
+        if child.tail is not None and not child.tail.strip():
+            child.tail = None
+        for name, value in list(child.attrib.items()):
+            local = _local(name)
+            if local in _NUMERIC_ATTRS:
+                child.set(name, _round_attr(value))
+            elif local in _NUMBER_LIST_ATTRS:
+                child.set(name, _round_number_list(value))
+
+
+def _minify_text(svg_code):
+    """XML로 읽을 수 없는 SVG는 주석과 태그 사이 공백만 제거"""
+    svg_code = _COMMENT.sub("", svg_code)
+    return _BETWEEN_TAGS.sub("><", svg_code).strip()
+
+
+def optimize_svg(svg_code):
+    """SVG 하나를 최적화한 문자열 반환 (보이는 결과는 그대로)"""
+    if not svg_code:
+        return svg_code
+    root = _parse_svg(svg_code)
+    if root is None:
+        return _minify_text(svg_code)
+    had_namespace = "xmlns" in svg_code
+    _clean(root)
+    _drop_occluded(root)
+    if had_namespace:
+        root.set("xmlns", SVG_NS)
+    optimized = _to_string(root)
+    # 최적화 결과가 더 길어지는 경우는 없어야 하지만 혹시 모르니 짧은 쪽 사용
+    minified = _minify_text(svg_code)
+    return optimized if len(optimized) <= len(minified) else minified
+
+
+def optimize_parts(parts_data):
+    """parse_story_parts() 결과의 모든 SVG를 최적화한 새 목록 반환"""
+    optimized = []
+    for part in parts_data:
+        part = dict(part)
+        if part.get("svg_code"):
+            part["svg_code"] = optimize_svg(part["svg_code"])
+        if part.get("svg_codes"):
+            part["svg_codes"] = [optimize_svg(svg_code) for svg_code in part["svg_codes"]]
+        optimized.append(part)
+    return optimized
+
+
+def _parse_svg(svg_code):
+    """SVG 문자열을 네임스페이스 없는 트리로 읽기 (<svg> 가 아니면 None)"""
+    try:
+        root = ET.fromstring(svg_code)
+    except ET.ParseError:
+        return None
+    if _local(root.tag) != "svg":
+        return None
+    for element in root.iter():
+        if element.tag.startswith(f"{{{SVG_NS}}}"):
+            element.tag = _local(element.tag)
+    return root
+
+
+def _to_string(element):
+    # 자식마다 xmlns 가 붙지 않도록 네임스페이스를 떼고 직렬화
+    return ET.tostring(element, encoding="unicode").replace(" />", "/>")
+
+
+def _element_key(element):
+    tail, element.tail = element.tail, None
+    key = _to_string(element)
+    element.tail = tail
+    return key
+
+
+def _shareable(parent):
+    """<use> 로 바꿀 수 있는 요소들 (parent 아래의 도형/그룹, <g> 안으로만 내려감)"""
+    for child in parent:
+        if child.tag in _SHAREABLE_TAGS:
+            yield child
+            if child.tag == "g":
+                yield from _shareable(child)
+
+
+def _replace_shared(parent, shared, used):
+    for index, child in enumerate(list(parent)):
+        if child.tag not in _SHAREABLE_TAGS:
+            continue
+        element_id = shared.get(_element_key(child))
+        if element_id is None:
+            if child.tag == "g":
+                _replace_shared(child, shared, used)
+            continue
+        use = ET.Element("use", {"href": f"#{element_id}"})
+        use.tail = child.tail
+        parent.remove(child)
+        parent.insert(index, use)
+        used.add(element_id)
+
+
+def share_repeated_parts(svg_codes):
+    """여러 SVG에 똑같이 반복되는 부품을 한 번만 정의하고 <use>로 참조
+
+    (공유 정의 SVG, 바뀐 SVG 목록)을 반환한다. 공유 정의 SVG는 같은 HTML
+    문서 안에 먼저 넣어야 하며, 공유할 부품이 없으면 빈 문자열이다.
+    id는 부품 내용의 해시라서 같은 페이지에 여러 번 들어가도 충돌하지 않는다.
+    """
+    roots = [_parse_svg(svg_code) if svg_code else None for svg_code in svg_codes]
+    counts = {}
+    for root in roots:
+        if root is None:
+            continue
+        keys = set()
+        for element in _shareable(root):
+            # id가 있는 요소는 복제하면 id가 겹치므로 공유하지 않음
+            if not any(e.get("id") for e in element.iter()):
+                keys.add(_element_key(element))
+        for key in keys:
+            counts[key] = counts.get(key, 0) + 1
+    shared = {
+        key: "p" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:8]
+        for key, count in counts.items()
+        # 한 번 정의 + count 번 참조가 count 번 반복보다 짧을 때만
+        if count > 1 and len(key) + _ID_LENGTH + count * _USE_LENGTH < count * len(key)
+    }
+    if not shared:
+        return "", list(svg_codes)
+
+    used = set()
+    rewritten = []
+    for svg_code, root in zip(svg_codes, roots):
+        if root is None:
+            rewritten.append(svg_code)
+            continue
+        _replace_shared(root, shared, used)
+        root.set("xmlns", SVG_NS)
+        rewritten.append(_to_string(root))
+
+    defs = "".join(
+        re.sub(r"^<(\w+)", lambda m: f'<{m.group(1)} id="{element_id}"', key, count=1)
+        for key, element_id in shared.items()
+        if element_id in used
+    )
+    sprite = (
+        f'<svg xmlns="{SVG_NS}" width="0" height="0" style="position:absolute" aria-hidden="true">'
+        f"<defs>{defs}</defs></svg>"
+    )
+    return sprite, rewritten
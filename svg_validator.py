@@ -0,0 +1,426 @@
+"""모델이 그린 컷 SVG 검사 및 간단한 자동 수리
+
+검사 항목:
+- XML 형식 (끝이 잘린 응답, 이스케이프 안 된 & 등)
+- viewBox="0 0 400 400"
+- 흰 배경 / 바닥 / 벽
+- 캐릭터: 두더지 13개 요소(몸통, 머리, 코, 눈 2, 입, 팔 2, 다리 2) 또는 페럿 얼굴
+  (<g transform="translate(..) scale(..)"> 안의 캐릭터는 변환을 적용한 좌표로 검사)
+- 좌표가 0~400 안에 있는지
+
+배경이 없거나, 팔다리가 빠졌거나, 좌표가 조금 벗어난 정도는 여기서 고치고,
+그래도 남는 문제가 있는 컷만 모델에 다시 요청한다.
+"""
+import re
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+
+SVG_NS = "http://www.w3.org/2000/svg"
+CANVAS_SIZE = 400
+VIEWBOX = f"0 0 {CANVAS_SIZE} {CANVAS_SIZE}"
+
+# 프롬프트 체크리스트의 기본 도형 (빠졌을 때 채워 넣음)
+_BACKGROUND = {"width": "400", "height": "400", "fill": "white"}
+_FLOOR = {"x": "0", "y": "300", "width": "400", "height": "100", "fill": "#ddd"}
+_WALL = {"x": "0", "y": "0", "width": "400", "height": "300", "fill": "#f0f0f0"}
+_LIMB_STYLE = {"stroke": "#666", "stroke-linecap": "round"}
+
+# 좌표로 쓰이는 속성 (범위 검사/보정 대상)
+_POINT_ATTRS = ("x", "y", "cx", "cy", "x1", "y1", "x2", "y2")
+# 이 정도 굵기 이상의 선은 팔다리로 봄
+_LIMB_MIN_WIDTH = 5
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+_TRANSFORM = re.compile(r"(\w+)\s*\(([^)]*)\)")
+# 숫자가 모두 (x, y) 쌍인 절대 좌표 경로 (변환 적용 가능)
+_ABSOLUTE_PATH = re.compile(r"[MLQCTSZ\d\s.,-]*")
+# 변환 없음 (x' = a*x + e, y' = d*y + f 의 a, d, e, f)
+_IDENTITY = (1.0, 1.0, 0.0, 0.0)
+_BARE_AMPERSAND = re.compile(r"&(?!#?\w+;)")
+
+
+@dataclass
+class SvgReport:
+    """SVG 하나의 검사/수리 결과"""
+
+    svg_code: str
+    problems: list = field(default_factory=list)  # 고치지 못한 문제
+    repairs: list = field(default_factory=list)  # 자동으로 고친 내용
+
+    @property
+    def ok(self):
+        return not self.problems
+
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _num(element, name, default=None):
+    try:
+        return float(element.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _fmt(value):
+    return str(int(value)) if value == int(value) else str(round(value, 1))
+
+
+def _parse(svg_code, repairs):
+    """SVG 문자열을 네임스페이스 없는 트리로 읽기 (간단한 형식 오류는 고쳐서)"""
+    candidates = [svg_code]
+    fixed = _BARE_AMPERSAND.sub("&amp;", svg_code)
+    # 응답이 중간에 잘려서 </svg> 가 없는 경우 마지막 완성된 태그까지만 살림
+    if "</svg>" not in fixed:
+        fixed = fixed[:fixed.rfind(">") + 1] + "</svg>"
+    if fixed != svg_code:
+        candidates.append(fixed)
+
+    for i, candidate in enumerate(candidates):
+        try:
+            root = ET.fromstring(candidate)
+        except ET.ParseError:
+            continue
+        if _local(root.tag) != "svg":
+            return None
+        for element in root.iter():
+            element.tag = _local(element.tag)
+        if i:
+            repairs.append("XML 형식 수정")
+        return root
+    return None
+
+
+def _parse_transform(text):
+    """transform 속성을 (a, d, e, f) 로, 회전/기울이기가 있으면 None"""
+    a, d, e, f = _IDENTITY
+    for name, args in _TRANSFORM.findall(text or ""):
+        values = [float(n) for n in _NUMBER.findall(args)]
+        if name == "translate" and values:
+            step = (1.0, 1.0, values[0], values[1] if len(values) > 1 else 0.0)
+        elif name == "scale" and values:
+            step = (values[0], values[1] if len(values) > 1 else values[0], 0.0, 0.0)
+        elif name == "matrix" and len(values) == 6 and values[1] == values[2] == 0:
+            step = (values[0], values[3], values[4], values[5])
+        elif name == "rotate" and values and values[0] == 0:
+            continue
+        else:
+            return None
+        # 목록의 앞쪽 변환이 바깥쪽
+        a, d, e, f = a * step[0], d * step[1], a * step[2] + e, d * step[3] + f
+    return a, d, e, f
+
+
+def _walk(parent, matrix=_IDENTITY):
+    """(요소, 캔버스 좌표로의 변환) 을 그리는 순서대로 (지원하지 않는 변환 안이면 None)"""
+    for child in parent:
+        inside = matrix
+        if matrix is not None and child.get("transform") is not None:
+            step = _parse_transform(child.get("transform"))
+            if step is None:
+                inside = None
+            else:
+                a, d, e, f = matrix
+                inside = (a * step[0], d * step[1], a * step[2] + e, d * step[3] + f)
+        yield child, inside
+        yield from _walk(child, inside)
+
+
+def _placed(element, matrix):
+    """변환을 적용한 캔버스 좌표의 복사본 (검사용)"""
+    a, d, e, f = matrix
+    placed = ET.Element(element.tag, element.attrib)
+    for names, scale, offset in ((("x", "cx", "x1", "x2"), a, e), (("y", "cy", "y1", "y2"), d, f)):
+        for name in names:
+            value = _num(element, name)
+            if value is not None:
+                placed.set(name, _fmt(scale * value + offset))
+    for name, scale in (("rx", abs(a)), ("width", abs(a)), ("ry", abs(d)), ("height", abs(d)),
+                        ("r", (abs(a) + abs(d)) / 2), ("stroke-width", (abs(a) + abs(d)) / 2)):
+        value = _num(element, name)
+        if value is not None:
+            placed.set(name, _fmt(scale * value))
+
+    def place_pairs(text):
+        numbers = [float(n) for n in _NUMBER.findall(text)]
+        pairs = zip(numbers[0::2], numbers[1::2])
+        return " ".join(f"{_fmt(a * x + e)},{_fmt(d * y + f)}" for x, y in pairs)
+
+    if element.get("points"):
+        placed.set("points", place_pairs(element.get("points")))
+    if element.get("d"):
+        if _ABSOLUTE_PATH.fullmatch(element.get("d")):
+            placed.set("d", "M " + place_pairs(element.get("d")))
+        else:
+            # 상대 좌표/호가 섞인 경로는 점을 옮길 수 없으므로 검사에서 뺌
+            del placed.attrib["d"]
+    return placed
+
+
+def _is_full_rect(element):
+    return (
+        element.tag == "rect"
+        and _num(element, "x", 0) <= 0 and _num(element, "y", 0) <= 0
+        and _num(element, "width", 0) >= CANVAS_SIZE and _num(element, "height", 0) >= CANVAS_SIZE
+    )
+
+
+def _find_background(root):
+    """흰 배경(첫 요소가 캔버스 전체 사각형), 바닥, 벽이 있는지"""
+    children = list(root)
+    has_background = bool(children) and _is_full_rect(children[0])
+    has_floor = has_wall = False
+    for element in children:
+        if element.tag != "rect" or _is_full_rect(element):
+            continue
+        x, y = _num(element, "x", 0), _num(element, "y", 0)
+        width, height = _num(element, "width", 0), _num(element, "height", 0)
+        if width < CANVAS_SIZE * 0.75 or x > CANVAS_SIZE / 4:
+            continue
+        if y <= 10 and height >= CANVAS_SIZE * 0.4:
+            has_wall = True
+        elif CANVAS_SIZE / 2 <= y and y + height >= CANVAS_SIZE - 10:
+            has_floor = True
+    return has_background, has_floor, has_wall
+
+
+def _start_point(element):
+    """선/경로의 시작점과 끝점"""
+    if element.tag == "line":
+        return (_num(element, "x1", 0), _num(element, "y1", 0)), (_num(element, "x2", 0), _num(element, "y2", 0))
+    if element.tag in ("polyline", "path"):
+        numbers = [float(n) for n in _NUMBER.findall(element.get("points") or element.get("d") or "")]
+        if len(numbers) >= 4:
+            return (numbers[0], numbers[1]), (numbers[-2], numbers[-1])
+    return None
+
+
+def _anchor(element):
+    """얼굴 요소 판단용 기준점 (원/타원은 중심, 나머지는 첫 점)"""
+    if element.tag in ("circle", "ellipse"):
+        return _num(element, "cx", 0), _num(element, "cy", 0)
+    if element.tag == "line":
+        return _num(element, "x1", 0), _num(element, "y1", 0)
+    numbers = [float(n) for n in _NUMBER.findall(element.get("points") or element.get("d") or "")]
+    if len(numbers) >= 2:
+        return numbers[0], numbers[1]
+    return None
+
+
+def _find_mole(elements):
+    """두더지 부위 찾기 (몸통/머리/얼굴 요소 수/팔다리 위치)"""
+    ellipses = [
+        e for e in elements
+        if e.tag == "ellipse" and _num(e, "rx", 0) >= 25 and _num(e, "ry", 0) >= _num(e, "rx", 0)
+    ]
+    if not ellipses:
+        return None
+    body = max(ellipses, key=lambda e: _num(e, "rx", 0) * _num(e, "ry", 0))
+    cx, cy = _num(body, "cx", 0), _num(body, "cy", 0)
+    rx, ry = _num(body, "rx", 0), _num(body, "ry", 0)
+
+    head = None
+    for e in elements:
+        if e is body or e.tag not in ("ellipse", "circle"):
+            continue
+        hrx = _num(e, "rx", _num(e, "r", 0))
+        if hrx >= 20 and _num(e, "cy", 0) < cy and abs(_num(e, "cx", 0) - cx) <= rx:
+            head = e
+            break
+
+    face = 0
+    if head is not None:
+        hx, hy = _num(head, "cx", 0), _num(head, "cy", 0)
+        hrx = _num(head, "rx", _num(head, "r", 0))
+        hry = _num(head, "ry", _num(head, "r", 0))
+        for e in elements:
+            if e is head or e is body:
+                continue
+            point = _anchor(e)
+            if point and abs(point[0] - hx) <= hrx and abs(point[1] - hy) <= hry:
+                face += 1
+
+    limbs = set()
+    for e in elements:
+        if _num(e, "stroke-width", 0) < _LIMB_MIN_WIDTH:
+            continue
+        ends = _start_point(e)
+        if ends is None:
+            continue
+        (x1, y1), (x2, y2) = ends
+        if abs(x1 - cx) > rx * 2 or abs(y1 - cy) > ry * 2:
+            continue  # 몸통과 떨어진 선은 팔다리가 아님
+        side = "left" if min(x1, x2) < cx else "right"
+        kind = "arm" if y1 < cy + ry * 0.5 else "leg"
+        limbs.add((kind, side))
+    return {"body": body, "head": head, "face": face, "limbs": limbs}
+
+
+def _default_limb(body, kind, side):
+    """몸통 크기에 맞춘 기본 팔/다리 (프롬프트 예시와 같은 비율)"""
+    cx, cy = _num(body, "cx", 0), _num(body, "cy", 0)
+    sx, sy = _num(body, "rx", 50) / 50, _num(body, "ry", 70) / 70
+    sign = -1 if side == "left" else 1
+    if kind == "arm":
+        x1, y1, x2, y2 = cx + sign * 50 * sx, cy - 20 * sy, cx + sign * 70 * sx, cy - 40 * sy
+        width = 8
+    else:
+        x1, y1, x2, y2 = cx + sign * 30 * sx, cy + 70 * sy, cx + sign * 40 * sx, cy + 130 * sy
+        width = 10
+    attrs = {"x1": x1, "y1": y1, "x2": x2, "y2": y2}
+    attrs = {name: _fmt(min(max(value, 0), CANVAS_SIZE)) for name, value in attrs.items()}
+    attrs.update(_LIMB_STYLE, **{"stroke-width": str(width)})
+    return ET.Element("line", attrs)
+
+
+def _find_ferrets(elements):
+    """페럿 얼굴(역삼각형 polygon)들의 (왼쪽, 위, 오른쪽, 아래)"""
+    faces = []
+    for e in elements:
+        if e.tag != "polygon":
+            continue
+        numbers = [float(n) for n in _NUMBER.findall(e.get("points", ""))]
+        if len(numbers) == 6 and max(numbers[0::2]) - min(numbers[0::2]) >= 40:
+            faces.append((min(numbers[0::2]), min(numbers[1::2]), max(numbers[0::2]), max(numbers[1::2])))
+    return faces
+
+
+def _in_ferret(element, faces):
+    """페럿 얼굴 위아래(머리카락~몸통) 영역에 중심이 있는 몸통/머리 크기의 원/타원인지"""
+    if element.tag not in ("ellipse", "circle") or _num(element, "rx", _num(element, "r", 0)) < 20:
+        return False
+    x, y = _anchor(element)
+    for left, top, right, bottom in faces:
+        height = bottom - top
+        if left <= x <= right and top - height <= y <= bottom + height * 2.5:
+            return True
+    return False
+
+
+def _clamp_points(elements, repairs):
+    """변환이 없는 요소의 좌표를 0~400 으로 보정"""
+    clamped = False
+    for element in elements:
+        for name in _POINT_ATTRS:
+            value = _num(element, name)
+            if value is not None and not 0 <= value <= CANVAS_SIZE:
+                element.set(name, _fmt(min(max(value, 0), CANVAS_SIZE)))
+                clamped = True
+        points = element.get("points")
+        if points:
+            numbers = [float(n) for n in _NUMBER.findall(points)]
+            if any(not 0 <= n <= CANVAS_SIZE for n in numbers):
+                pairs = zip(numbers[0::2], numbers[1::2])
+                element.set("points", " ".join(
+                    f"{_fmt(min(max(x, 0), CANVAS_SIZE))},{_fmt(min(max(y, 0), CANVAS_SIZE))}" for x, y in pairs
+                ))
+                clamped = True
+    if clamped:
+        repairs.append("범위를 벗어난 좌표 보정")
+
+
+def repair_svg(svg_code):
+    """SVG 하나를 검사하고 고칠 수 있는 문제는 고친 SvgReport 반환"""
+    report = SvgReport(svg_code=svg_code or "")
+    if not svg_code or not svg_code.strip():
+        report.problems.append("그림 없음")
+        return report
+
+    root = _parse(svg_code, report.repairs)
+    if root is None:
+        report.problems.append("SVG 형식 오류")
+        return report
+
+    # viewBox
+    view_box = " ".join((root.get("viewBox") or "").replace(",", " ").split())
+    if not view_box:
+        root.set("viewBox", VIEWBOX)
+        report.repairs.append("viewBox 추가")
+    elif view_box != VIEWBOX:
+        report.problems.append(f"viewBox가 {VIEWBOX}가 아님 ({view_box})")
+    for name in ("width", "height"):
+        if root.get(name) is None:
+            root.set(name, str(CANVAS_SIZE))
+
+    # 배경 (흰 배경 → 바닥/벽 순서로 맨 아래에 깔기)
+    has_background, has_floor, has_wall = _find_background(root)
+    if not has_background:
+        root.insert(0, ET.Element("rect", _BACKGROUND))
+        report.repairs.append("흰 배경 추가")
+    if not has_wall:
+        root.insert(1, ET.Element("rect", _WALL))
+        report.repairs.append("벽 추가")
+    if not has_floor:
+        root.insert(1, ET.Element("rect", _FLOOR))
+        report.repairs.append("바닥 추가")
+
+    # 변환(transform) 안의 요소는 좌표계가 달라서 좌표 보정에서 제외
+    walked = list(_walk(root))
+    _clamp_points([element for element, matrix in walked if matrix == _IDENTITY], report.repairs)
+
+    # 캐릭터 (변환 안의 요소는 캔버스 좌표로 옮겨서 검사, 원래 요소는 sources 로 찾음)
+    sources = {}
+    for element, matrix in walked:
+        if matrix is not None:
+            sources[element if matrix == _IDENTITY else _placed(element, matrix)] = element
+    placed = list(sources)
+    # 페럿 몸통/머리카락 타원을 두더지 몸통/머리로 보지 않도록 두더지 찾기에서 뺌
+    ferrets = _find_ferrets(placed)
+    mole = _find_mole([e for e in placed if not _in_ferret(e, ferrets)])
+    if mole is None:
+        unchecked = any(matrix is None for _, matrix in walked)
+        # 회전 등 옮길 수 없는 변환 안에 그린 캐릭터는 확인할 수 없으므로 실패로 보지 않음
+        if not ferrets and not unchecked:
+            report.problems.append("캐릭터(두더지/페럿)가 없음")
+    else:
+        if mole["head"] is None:
+            report.problems.append("두더지 머리 없음")
+        elif mole["face"] < 4:
+            report.problems.append(f"두더지 얼굴 요소 부족 (코/눈/입 {mole['face']}개)")
+        missing = [
+            (kind, side) for kind in ("arm", "leg") for side in ("left", "right")
+            if (kind, side) not in mole["limbs"]
+        ]
+        if missing:
+            # 몸통과 같은 그룹(같은 좌표계)에, 몸통 바로 뒤(머리/얼굴보다 아래)에 그려서 가리지 않게 함
+            body = sources[mole["body"]]
+            parent = next(p for p in root.iter() if body in list(p))
+            body_index = list(parent).index(body)
+            for kind, side in missing:
+                parent.insert(body_index + 1, _default_limb(body, kind, side))
+            names = {"arm": "팔", "leg": "다리", "left": "왼쪽", "right": "오른쪽"}
+            missing_names = ", ".join(f"{names[side]} {names[kind]}" for kind, side in missing)
+            report.repairs.append(f"빠진 팔다리 추가 ({missing_names})")
+
+    if report.repairs:
+        root.set("xmlns", SVG_NS)
+        report.svg_code = ET.tostring(root, encoding="unicode").replace(" />", "/>")
+    return report
+
+
+def check_parts(parts_data):
+    """컷별로 SVG를 검사/수리
+
+    (수리된 parts, {컷 번호: 남은 문제}, {컷 번호: 고친 내용}) 을 반환한다.
+    scene_renderer 가 그린 컷은 항상 올바르므로 검사하지 않는다.
+    """
+    checked = []
+    failed = {}
+    repaired = {}
+    for part in parts_data:
+        part = dict(part)
+        if part.get("scene") is not None:
+            checked.append(part)
+            continue
+        reports = [repair_svg(svg_code) for svg_code in part.get("svg_codes") or [part.get("svg_code")]]
+        problems = [problem for report in reports for problem in report.problems]
+        repairs = [repair for report in reports for repair in report.repairs]
+        part["svg_code"] = reports[0].svg_code
+        if part.get("svg_codes"):
+            part["svg_codes"] = [report.svg_code for report in reports]
+        if problems:
+            failed[part["cut_number"]] = problems
+        if repairs:
+            repaired[part["cut_number"]] = repairs
+        checked.append(part)
+    return checked, failed, repaired
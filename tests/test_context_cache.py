@@ -0,0 +1,39 @@
+"""context_cache 동시 사용 테스트 (가짜 백엔드 사용)"""
+import threading
+
+from backends import FakeBackend, FakeSettings
+from context_cache import CONTEXT_CACHE_MIN_CHARS, ContextCachedModel
+
+PROMPT = "프롬프트" * CONTEXT_CACHE_MIN_CHARS
+
+
+class BarrierBackend(FakeBackend):
+    """두 스레드가 모두 캐시를 만들기 시작해야 진행하는 백엔드"""
+
+    def __init__(self):
+        super().__init__(FakeSettings())
+        self.barrier = threading.Barrier(2, timeout=5)
+
+    def create_context_cache(self, model_name, system_prompt, ttl):
+        # 잠금을 잡은 채 만들면 두 번째 스레드가 여기 오지 못해 BrokenBarrierError
+        self.barrier.wait()
+        return super().create_context_cache(model_name, system_prompt, ttl)
+
+
+def test_concurrent_creates_keep_one_cache():
+    backend = BarrierBackend()
+    model = ContextCachedModel(backend, "fake", PROMPT)
+    results = []
+
+    def call():
+        results.append(model.generate_content("두더지와 페럿").text)
+
+    threads = [threading.Thread(target=call) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 2
+    assert model.stats["cache_creates"] == 2 and model.stats["cached_calls"] == 2
+    assert list(backend.context_caches) == [model._cache.name]
+    assert model.generate_content("두더지와 페럿").text == results[0]
@@ -0,0 +1,51 @@
+"""model_client 마감 시간 / 빠른 모델 대체 테스트 (가짜 백엔드 사용)"""
+import pytest
+from google.api_core import exceptions as api_exceptions
+
+from backends import FakeBackend, FakeSettings
+from model_client import LatencyTracker, ResilientModel
+from prompts import SYSTEM_PROMPT
+
+EPISODE = "두더지와 페럿이 비 오는 날 우산을 같이 쓴다"
+DEADLINE = 0.3
+
+
+def fake_model(**settings):
+    backend = FakeBackend(FakeSettings(**settings))
+    return backend, backend.create_inline_model("fake", SYSTEM_PROMPT)
+
+
+def resilient(primary, fallback=None):
+    return ResilientModel(primary, fallback, deadline=DEADLINE, tracker=LatencyTracker())
+
+
+def test_slow_but_progressing_stream_finishes():
+    backend, model = fake_model()
+    text = backend.response_for(SYSTEM_PROMPT, EPISODE)
+    # 조각 사이는 마감 시간보다 짧지만 전체는 마감 시간의 몇 배
+    backend.settings.chunk_chars = len(text) // 8 + 1
+    backend.settings.chunk_delay = DEADLINE / 3
+    client = resilient(("quality", model))
+    response = client.generate_content(EPISODE, stream=True)
+    assert "".join(chunk.text for chunk in response) == text
+    assert client.stats["timeouts"] == 0
+
+
+def test_stalled_stream_times_out():
+    backend, model = fake_model(chunk_chars=100, chunk_delay=DEADLINE * 3)
+    response = resilient(("quality", model)).generate_content(EPISODE, stream=True)
+    with pytest.raises(api_exceptions.DeadlineExceeded):
+        for _ in response:
+            pass
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_quality_timeout_falls_back_to_fast_model(stream):
+    _, slow = fake_model(latency=(5.0, 5.0))
+    backend, fast = fake_model()
+    client = resilient(("quality", slow), ("fast", fast))
+    response = client.generate_content(EPISODE, stream=stream)
+    text = "".join(chunk.text for chunk in response) if stream else response.text
+    assert response.model_name == "fast"
+    assert text == backend.response_for(SYSTEM_PROMPT, EPISODE)
+    assert client.stats["fallbacks"] == 1 and client.stats["timeouts"] == 0
@@ -0,0 +1,118 @@
+"""story_parser 파싱 테스트 (스트리밍 조각 나누기와 상관없이 같은 결과여야 함)"""
+import random
+
+import pytest
+
+from scene_renderer import render_scene
+from story_parser import compose_response_text, iter_story_events, parse_story_parts
+
+RECT = '<svg viewBox="0 0 400 400"><rect width="400" height="400" fill="white"/></svg>'
+CIRCLE = '<svg viewBox="0 0 400 400"><circle cx="200" cy="200" r="50"/></svg>'
+SCENE = {
+    "shot": "full",
+    "characters": [{"type": "mole", "x": "center", "expression": "happy", "pose": "arms_up"}],
+}
+
+
+def cut(number, text, *svgs, scene=None):
+    part = {"cut_number": number, "text_content": text, "svg_code": svgs[0] if svgs else None}
+    if len(svgs) > 1:
+        part["svg_codes"] = list(svgs)
+    if scene is not None:
+        part["scene"] = scene
+    return part
+
+
+def test_multiple_svgs_in_one_cut():
+    text = f"제목: 두더지의 하루\n||||\n1컷 본문\n```svg\n{RECT}\n```\n{CIRCLE}\n||||\n2컷 본문"
+    assert parse_story_parts(text) == ("두더지의 하루", [
+        cut(1, "1컷 본문", RECT, CIRCLE),
+        cut(2, "2컷 본문"),
+    ])
+
+
+@pytest.mark.parametrize("text, expected", [
+    # 닫히지 않은 SVG는 원문 그대로 본문에 남음
+    (
+        '제목: T\n||||\n본문\n```svg\n<svg viewBox="0 0 400 400"><rect/>',
+        [cut(1, '본문\n```svg\n<svg viewBox="0 0 400 400"><rect/>')],
+    ),
+    # SVG가 닫히기 전에 다음 컷이 시작됨
+    (
+        "제목: T\n||||\n본문\n```svg\n<svg><rect/>\n||||\n다음 컷",
+        [cut(1, "본문\n```svg\n<svg><rect/>"), cut(2, "다음 컷")],
+    ),
+    # SVG는 닫혔지만 펜스가 닫히지 않음
+    (
+        f"제목: T\n||||\n본문\n```svg\n{RECT}\n다음 줄",
+        [cut(1, "본문\n\n다음 줄", RECT)],
+    ),
+    # 펜스만 열고 SVG가 없음
+    (
+        "제목: T\n||||\n본문\n```svg\n그림 없음",
+        [cut(1, "본문\n```svg\n그림 없음")],
+    ),
+])
+def test_unterminated_fences(text, expected):
+    assert parse_story_parts(text) == ("T", expected)
+
+
+def test_uppercase_xml_and_bare_svg():
+    # 뒤 컷에 소문자 </svg> 가 있어도 대문자 닫는 태그에서 끝나야 함
+    upper = RECT.replace("<svg", "<SVG").replace("</svg>", "</SVG>")
+    text = (
+        f"제목: T\n||||\n대문자\n```SVG\n{upper}\n```"
+        f"\n||||\nxml 펜스\n```xml\n{RECT}\n```"
+        f"\n||||\n펜스 없이 {CIRCLE} 끝"
+    )
+    assert parse_story_parts(text) == ("T", [
+        cut(1, "대문자", upper),
+        cut(2, "xml 펜스", RECT),
+        cut(3, "펜스 없이  끝", CIRCLE),
+    ])
+
+
+def test_three_and_four_bar_separators():
+    text = "제목: T\n|||\n첫 컷\n||||\n둘째 컷\n|||\n셋째 컷"
+    assert parse_story_parts(text) == ("T", [cut(1, "첫 컷"), cut(2, "둘째 컷"), cut(3, "셋째 컷")])
+    assert parse_story_parts("제목 없이 || 두 막대\n||||\n컷") == ("제목 없이 || 두 막대", [cut(1, "컷")])
+
+
+STORY = compose_response_text("두더지와 페럿", [
+    cut(1, "장면 설명 컷", render_scene(SCENE), scene=SCENE),
+    cut(2, "그림 두 개", RECT, CIRCLE),
+    cut(3, "그림 없는 컷"),
+]) + (
+    f"\n|||\n대문자 ```SVG\n{RECT.upper()}\n```\n||||\n펜스 없는 {CIRCLE} 컷"
+    "\n||||\n닫히지 않은 ```xml\n<svg><rect/>"
+)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_chunking_does_not_change_parts(seed):
+    rng = random.Random(seed)
+    chunks, i = [], 0
+    while i < len(STORY):
+        size = rng.choice([1, 2, 3, 7, 50, 400])
+        chunks.append(STORY[i:i + size])
+        i += size
+    title, parts = None, {}
+    for kind, value in iter_story_events(chunks):
+        if kind == "title":
+            title = value
+        else:
+            parts[value["cut_number"]] = value
+    assert (title, list(parts.values())) == parse_story_parts(STORY)
+
+
+def test_compose_round_trip_with_scene():
+    parts = [
+        cut(1, "장면 설명만", render_scene(SCENE), scene=SCENE),
+        cut(2, "장면 설명 + SVG", render_scene(SCENE), RECT, scene=SCENE),
+        cut(3, "SVG 두 개", RECT, CIRCLE),
+        cut(4, "본문의 ||| 구분자는 지워짐"),
+    ]
+    title, parsed = parse_story_parts(compose_response_text("두더지와 페럿", parts))
+    assert title == "두더지와 페럿"
+    assert parsed[:3] == parts[:3]
+    assert parsed[3] == cut(4, "본문의  구분자는 지워짐")
@@ -0,0 +1,66 @@
+"""svg_optimizer 최적화 테스트 (보이는 결과가 바뀌지 않아야 함)"""
+import pytest
+
+from svg_optimizer import optimize_svg, share_repeated_parts
+
+
+def svg(body):
+    return f'<svg viewBox="0 0 400 400">{body}</svg>'
+
+
+def test_rounds_coordinates():
+    assert optimize_svg(svg('<circle cx="10.04" cy="20.96" r="5.55"/>')) == svg('<circle cx="10" cy="21" r="5.5"/>')
+
+
+@pytest.mark.parametrize("attr", ["opacity", "fill-opacity", "stroke-opacity"])
+def test_keeps_opacity(attr):
+    shape = f'<circle cx="10" cy="10" r="5" {attr}="0.04"/>'
+    assert optimize_svg(svg(shape)) == svg(shape)
+
+
+def test_keeps_small_sizes():
+    shape = '<line x1="0" y1="0" x2="5" y2="5" stroke="#000" stroke-width="0.04"/>'
+    assert optimize_svg(svg(shape)) == svg(shape)
+    assert optimize_svg(svg('<path d="M 0.123 0 L 5 5"/>')) == svg('<path d="M 0.12 0 L 5 5"/>')
+
+
+def test_drops_shape_under_opaque_rect():
+    cover = '<rect width="400" height="400" fill="white"/>'
+    assert optimize_svg(svg('<circle cx="10" cy="10" r="5"/>' + cover)) == svg(cover)
+
+
+@pytest.mark.parametrize("hidden", [
+    'display="none"',
+    'visibility="hidden"',
+    'style="display:none"',
+    'style="visibility: hidden"',
+    'clip-path="url(#c)"',
+    'mask="url(#m)"',
+    'filter="url(#f)"',
+])
+def test_keeps_shape_under_hidden_or_clipped_rect(hidden):
+    drawing = svg(f'<circle cx="10" cy="10" r="5"/><rect width="400" height="400" fill="white" {hidden}/>')
+    assert optimize_svg(drawing) == drawing
+
+
+def test_shares_repeated_shapes():
+    body = '<ellipse cx="200" cy="220" rx="50" ry="70" fill="#999"/><circle cx="200" cy="120" r="6" fill="black"/>'
+    svgs = [svg(body + f'<rect x="{i}" y="0" width="10" height="10"/>') for i in range(4)]
+    sprite, shared = share_repeated_parts(svgs)
+    assert "<ellipse" in sprite
+    assert all("<use href=" in code and "<ellipse" not in code for code in shared)
+
+
+def test_never_shares_gradient_stops_or_text():
+    gradient = (
+        '<defs><linearGradient id="sky" x1="0" y1="0" x2="0" y2="1">'
+        '<stop offset="0" stop-color="#87ceeb"/><stop offset="1" stop-color="#ffffff"/>'
+        '</linearGradient></defs>'
+    )
+    label = '<text x="200" y="40" font-size="16" text-anchor="middle"><tspan fill="#333">두더지와 페럿의 툰 공장</tspan></text>'
+    svgs = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 400 400">{gradient}'
+        f'<rect width="400" height="{300 + i}" fill="url(#sky)"/>{label}</svg>'
+        for i in range(4)
+    ]
+    assert share_repeated_parts(svgs) == ("", svgs)
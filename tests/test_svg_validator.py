@@ -0,0 +1,76 @@
+"""svg_validator 검사/수리 테스트"""
+import re
+
+import pytest
+
+from prompts import SYSTEM_PROMPT
+from scene_renderer import ferret_parts, mole_parts, render_scene
+from svg_validator import repair_svg
+
+BACKGROUND = (
+    '<rect width="400" height="400" fill="white"/>'
+    '<rect x="0" y="300" width="400" height="100" fill="#ddd"/>'
+    '<rect x="0" y="0" width="400" height="300" fill="#f0f0f0"/>'
+)
+# 시스템 프롬프트의 페럿 디자인 (얼굴, 머리카락, 눈)
+FERRET_TEMPLATE = (
+    '<polygon points="200,80 160,150 240,150" fill="#fff" stroke="#333" stroke-width="2"/>'
+    '<ellipse cx="200" cy="90" rx="45" ry="25" fill="#ffd700" opacity="0.8"/>'
+    '<polygon points="185,120 190,115 195,120 190,125" fill="black"/>'
+)
+
+
+def svg(body):
+    return f'<svg width="400" height="400" viewBox="0 0 400 400" xmlns="http://www.w3.org/2000/svg">{body}</svg>'
+
+
+def test_prompt_examples_pass_unchanged():
+    for example in re.findall(r"<svg.*?</svg>", SYSTEM_PROMPT, re.S):
+        report = repair_svg(example)
+        assert report.ok and not report.repairs
+
+
+def test_ferret_template_passes():
+    report = repair_svg(svg(BACKGROUND + FERRET_TEMPLATE))
+    assert report.ok and not report.repairs
+
+
+def test_ferret_body_gets_no_mole_limbs():
+    # 팔다리 없는 페럿 (몸통 타원이 두더지 몸통 크기)
+    report = repair_svg(svg(BACKGROUND + "".join(ferret_parts()[:5])))
+    assert report.ok
+    assert not report.repairs
+
+
+@pytest.mark.parametrize("shot", ["full", "medium", "closeup"])
+@pytest.mark.parametrize("types", [["mole"], ["ferret"], ["mole", "ferret"], ["ferret", "mole"]])
+@pytest.mark.parametrize("x", ["left", "center", "right"])
+def test_rendered_scenes_pass(shot, types, x):
+    positions = [x, "left" if x == "right" else "right"]
+    for expression in ("neutral", "surprised"):
+        characters = [
+            {"type": kind, "x": position, "expression": expression, "pose": "pointing"}
+            for kind, position in zip(types, positions)
+        ]
+        report = repair_svg(render_scene({"shot": shot, "characters": characters}))
+        assert report.ok, report.problems
+        assert not report.repairs
+
+
+def test_missing_limbs_added_inside_transformed_group():
+    mole = "".join(mole_parts()[:5])
+    report = repair_svg(svg(BACKGROUND + f'<g transform="translate(50 20) scale(0.8)">{mole}</g>'))
+    assert report.ok
+    assert report.repairs == ["빠진 팔다리 추가 (왼쪽 팔, 오른쪽 팔, 왼쪽 다리, 오른쪽 다리)"]
+    group = report.svg_code[report.svg_code.index("<g "):]
+    assert group.count("<line") == 4
+
+
+def test_rotated_character_is_not_failed():
+    mole = "".join(mole_parts())
+    assert repair_svg(svg(BACKGROUND + f'<g transform="rotate(10 200 200)">{mole}</g>')).ok
+
+
+def test_missing_character_fails():
+    report = repair_svg(svg(BACKGROUND))
+    assert report.problems == ["캐릭터(두더지/페럿)가 없음"]
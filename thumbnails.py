@@ -0,0 +1,444 @@
+"""저장된 콘티 썸네일 (갤러리용 작은 래스터 이미지)
+
+콘티 한 편의 썸네일은 앞의 네 컷을 2x2 로 붙인 작은 그림이다. 컷 SVG 해시로
+만든 키로 디스크(저장 디렉토리 아래 thumbnails/)에 캐시하므로, 같은 그림은
+한 번만 래스터화한다. 저장할 때 미리 만들고, 없으면 처음 볼 때 만든다.
+
+래스터화는 cairosvg 가 있으면 그것을 쓰고, 없거나 cairo 라이브러리를
+불러올 수 없으면 Pillow 로 기본 도형(rect/circle/ellipse/line/polygon/
+polyline/path, g 의 transform)만 그리는 간이 렌더러를 쓴다. 간이 렌더러는
+글자(text)를 그리지 않는다. 썸네일이 작아서 알아보는 데는 충분하다.
+"""
+import io
+import math
+import os
+import re
+import threading
+import xml.etree.ElementTree as ET
+from hashlib import sha1
+
+from PIL import Image, ImageColor, ImageDraw, features
+
+import storage
+
+# 썸네일에서 컷 하나의 크기 (px), 전체는 2x2 라서 두 배
+CUT_SIZE = 120
+# 썸네일에 넣는 컷 수 (2x2)
+GRID = 2
+# 간이 렌더러의 계단 현상을 줄이려고 크게 그린 뒤 줄이는 배율
+SUPERSAMPLE = 2
+# 렌더러나 크기가 바뀌면 올려서 예전 캐시를 쓰지 않게 함
+THUMBNAIL_VERSION = 1
+# 원/타원을 다각형으로 그릴 때 꼭짓점 수, 곡선 한 조각을 나누는 수
+_ELLIPSE_POINTS = 48
+_CURVE_STEPS = 12
+
+# st.image 는 JPEG/PNG/GIF 바이트만 그대로 보내고 나머지(WebP 등)는 실행마다
+# 다시 인코딩하므로, 흰 바탕 썸네일은 JPEG 로 저장해 캐시 바이트를 그대로 쓰게 함
+_FORMAT = "JPEG" if features.check("jpg") else "PNG"
+_SUFFIX = ".jpg" if _FORMAT == "JPEG" else ".png"
+MIME_TYPE = "image/jpeg" if _FORMAT == "JPEG" else "image/png"
+
+_cairosvg = None
+_cairosvg_checked = False
+_cairosvg_lock = threading.Lock()
+
+_NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_PATH_TOKEN = re.compile(r"[MmLlHhVvCcSsQqTtAaZz]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_TRANSFORM = re.compile(r"(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)")
+_PATH_ARGS = {"M": 2, "L": 2, "H": 1, "V": 1, "C": 6, "S": 4, "Q": 4, "T": 2, "A": 7, "Z": 0}
+
+
+def thumbnail_dir():
+    """썸네일 캐시 디렉토리 (저장 위치를 바꾸면 같이 바뀜)"""
+    return storage.STORAGE_DIR / "thumbnails"
+
+
+def thumbnail_key(digests):
+    """앞의 네 컷 SVG 해시로 만든 캐시 키"""
+    cuts = list(digests[:GRID * GRID])
+    payload = f"{THUMBNAIL_VERSION}|{CUT_SIZE}|{_FORMAT}|" + ",".join(cuts)
+    return sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _thumbnail_path(key):
+    return thumbnail_dir() / key[:2] / f"{key}{_SUFFIX}"
+
+
+def _load_cairosvg():
+    """cairosvg 모듈 (없거나 cairo 를 불러올 수 없으면 None)"""
+    global _cairosvg, _cairosvg_checked
+    if not _cairosvg_checked:
+        with _cairosvg_lock:
+            if not _cairosvg_checked:
+                try:
+                    import cairosvg
+                    _cairosvg = cairosvg
+                except (ImportError, OSError):
+                    _cairosvg = None
+                _cairosvg_checked = True
+    return _cairosvg
+
+
+# ---------------------------------------------------------------------------
+# Pillow 간이 렌더러
+# ---------------------------------------------------------------------------
+
+def _numbers(text):
+    return [float(value) for value in _NUMBER.findall(text or "")]
+
+
+def _length(value, default=0.0):
+    numbers = _numbers(value)
+    return numbers[0] if numbers else default
+
+
+def _multiply(a, b):
+    """2x3 아핀 행렬 곱 a·b (점에 b 를 먼저, 그다음 a 를 적용)"""
+    return (
+        a[0] * b[0] + a[2] * b[1],
+        a[1] * b[0] + a[3] * b[1],
+        a[0] * b[2] + a[2] * b[3],
+        a[1] * b[2] + a[3] * b[3],
+        a[0] * b[4] + a[2] * b[5] + a[4],
+        a[1] * b[4] + a[3] * b[5] + a[5],
+    )
+
+
+def _parse_transform(text):
+    matrix = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+    for name, args in _TRANSFORM.findall(text or ""):
+        values = _numbers(args)
+        if name == "matrix" and len(values) == 6:
+            step = tuple(values)
+        elif name == "translate" and values:
+            step = (1.0, 0.0, 0.0, 1.0, values[0], values[1] if len(values) > 1 else 0.0)
+        elif name == "scale" and values:
+            step = (values[0], 0.0, 0.0, values[1] if len(values) > 1 else values[0], 0.0, 0.0)
+        elif name == "rotate" and values:
+            angle = math.radians(values[0])
+            cos, sin = math.cos(angle), math.sin(angle)
+            step = (cos, sin, -sin, cos, 0.0, 0.0)
+            if len(values) == 3:
+                cx, cy = values[1], values[2]
+                step = _multiply(_multiply((1.0, 0.0, 0.0, 1.0, cx, cy), step), (1.0, 0.0, 0.0, 1.0, -cx, -cy))
+        elif name == "skewX" and values:
+            step = (1.0, 0.0, math.tan(math.radians(values[0])), 1.0, 0.0, 0.0)
+        elif name == "skewY" and values:
+            step = (1.0, math.tan(math.radians(values[0])), 0.0, 1.0, 0.0, 0.0)
+        else:
+            continue
+        matrix = _multiply(matrix, step)
+    return matrix
+
+
+def _apply(matrix, points):
+    a, b, c, d, e, f = matrix
+    return [(a * x + c * y + e, b * x + d * y + f) for x, y in points]
+
+
+def _color(value, opacity):
+    """SVG 색 → RGBA (none/그라디언트 등은 None)"""
+    value = (value or "").strip()
+    if not value or value == "none" or value.startswith("url("):
+        return None
+    if value == "currentColor":
+        value = "black"
+    try:
+        rgb = ImageColor.getrgb(value)
+    except ValueError:
+        return None
+    alpha = rgb[3] if len(rgb) == 4 else 255
+    return rgb[:3] + (int(alpha * max(0.0, min(1.0, opacity))),)
+
+
+def _style(element, inherited):
+    """상속되는 칠/선 속성 (style 속성도 읽음)"""
+    style = dict(inherited)
+    declared = dict(element.attrib)
+    for declaration in (element.get("style") or "").split(";"):
+        name, _, value = declaration.partition(":")
+        if value:
+            declared[name.strip()] = value.strip()
+    for name in ("fill", "stroke", "stroke-width", "fill-opacity", "stroke-opacity"):
+        if name in declared:
+            style[name] = declared[name]
+    # opacity 는 상속이 아니라 곱해짐
+    style["opacity"] = inherited.get("opacity", 1.0) * _length(declared.get("opacity"), 1.0)
+    return style
+
+
+def _ellipse_points(cx, cy, rx, ry):
+    return [
+        (cx + rx * math.cos(2 * math.pi * i / _ELLIPSE_POINTS), cy + ry * math.sin(2 * math.pi * i / _ELLIPSE_POINTS))
+        for i in range(_ELLIPSE_POINTS)
+    ]
+
+
+def _bezier(points, start, controls, end):
+    for step in range(1, _CURVE_STEPS + 1):
+        t = step / _CURVE_STEPS
+        u = 1 - t
+        if len(controls) == 1:
+            (qx, qy), = controls
+            x = u * u * start[0] + 2 * u * t * qx + t * t * end[0]
+            y = u * u * start[1] + 2 * u * t * qy + t * t * end[1]
+        else:
+            (c1x, c1y), (c2x, c2y) = controls
+            x = u ** 3 * start[0] + 3 * u * u * t * c1x + 3 * u * t * t * c2x + t ** 3 * end[0]
+            y = u ** 3 * start[1] + 3 * u * u * t * c1y + 3 * u * t * t * c2y + t ** 3 * end[1]
+        points.append((x, y))
+
+
+def _path_subpaths(d):
+    """path d → [(점 목록, 닫힘 여부)] (곡선은 선분으로 나눔, 호는 끝점까지 직선)"""
+    tokens = _PATH_TOKEN.findall(d or "")
+    subpaths = []
+    points = []
+    closed = False
+    x = y = start_x = start_y = 0.0
+    last_control = None
+    command = None
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        if token.isalpha():
+            command = token
+            index += 1
+            if command in "Zz":
+                if points:
+                    subpaths.append((points, True))
+                points, closed = [], False
+                x, y = start_x, start_y
+                last_control = None
+                continue
+        elif command is None:
+            break
+        count = _PATH_ARGS[command.upper()]
+        args = tokens[index:index + count]
+        if len(args) < count or any(arg.isalpha() for arg in args):
+            break
+        index += count
+        values = [float(arg) for arg in args]
+        relative = command.islower()
+        upper = command.upper()
+        ox, oy = (x, y) if relative else (0.0, 0.0)
+        if upper == "M":
+            if points:
+                subpaths.append((points, closed))
+            x, y = ox + values[0], oy + values[1]
+            start_x, start_y = x, y
+            points, closed = [(x, y)], False
+            # M 뒤에 이어지는 좌표는 L 로 처리
+            command = "l" if relative else "L"
+            last_control = None
+            continue
+        if not points:
+            points = [(x, y)]
+        if upper == "L":
+            x, y = ox + values[0], oy + values[1]
+            points.append((x, y))
+            last_control = None
+        elif upper == "H":
+            x = (x if relative else 0.0) + values[0]
+            points.append((x, y))
+            last_control = None
+        elif upper == "V":
+            y = (y if relative else 0.0) + values[0]
+            points.append((x, y))
+            last_control = None
+        elif upper in ("Q", "T"):
+            if upper == "Q":
+                control = (ox + values[0], oy + values[1])
+                end = (ox + values[2], oy + values[3])
+            else:
+                control = (2 * x - last_control[0], 2 * y - last_control[1]) if last_control else (x, y)
+                end = (ox + values[0], oy + values[1])
+            _bezier(points, (x, y), [control], end)
+            last_control = control
+            x, y = end
+        elif upper in ("C", "S"):
+            if upper == "C":
+                first = (ox + values[0], oy + values[1])
+                second = (ox + values[2], oy + values[3])
+                end = (ox + values[4], oy + values[5])
+            else:
+                first = (2 * x - last_control[0], 2 * y - last_control[1]) if last_control else (x, y)
+                second = (ox + values[0], oy + values[1])
+                end = (ox + values[2], oy + values[3])
+            _bezier(points, (x, y), [first, second], end)
+            last_control = second
+            x, y = end
+        else:  # A
+            x, y = ox + values[5], oy + values[6]
+            points.append((x, y))
+            last_control = None
+    if points:
+        subpaths.append((points, closed))
+    return subpaths
+
+
+def _shape_subpaths(element, tag):
+    """도형 하나 → [(점 목록, 닫힘 여부)] (그리지 않는 요소는 빈 목록)"""
+    get = element.get
+    if tag == "rect":
+        x, y = _length(get("x")), _length(get("y"))
+        width, height = _length(get("width")), _length(get("height"))
+        if width <= 0 or height <= 0:
+            return []
+        return [([(x, y), (x + width, y), (x + width, y + height), (x, y + height)], True)]
+    if tag == "circle":
+        r = _length(get("r"))
+        return [(_ellipse_points(_length(get("cx")), _length(get("cy")), r, r), True)] if r > 0 else []
+    if tag == "ellipse":
+        rx, ry = _length(get("rx")), _length(get("ry"))
+        if rx <= 0 or ry <= 0:
+            return []
+        return [(_ellipse_points(_length(get("cx")), _length(get("cy")), rx, ry), True)]
+    if tag == "line":
+        return [([(_length(get("x1")), _length(get("y1"))), (_length(get("x2")), _length(get("y2")))], False)]
+    if tag in ("polygon", "polyline"):
+        values = _numbers(get("points"))
+        points = list(zip(values[0::2], values[1::2]))
+        return [(points, tag == "polygon")] if len(points) >= 2 else []
+    if tag == "path":
+        return _path_subpaths(get("d"))
+    return []
+
+
+def _draw_shape(image, subpaths, matrix, style):
+    opacity = style.get("opacity", 1.0)
+    fill = _color(style.get("fill", "black"), opacity * _length(style.get("fill-opacity"), 1.0))
+    stroke = _color(style.get("stroke", "none"), opacity * _length(style.get("stroke-opacity"), 1.0))
+    scale = math.sqrt(abs(matrix[0] * matrix[3] - matrix[1] * matrix[2]))
+    stroke_width = max(1, round(_length(style.get("stroke-width"), 1.0) * scale))
+    translucent = any(color is not None and color[3] < 255 for color in (fill, stroke))
+    # 반투명 도형은 따로 그려서 합성 (ImageDraw 는 덮어쓰기만 함)
+    layer = Image.new("RGBA", image.size, (0, 0, 0, 0)) if translucent else image
+    draw = ImageDraw.Draw(layer)
+    for points, closed in subpaths:
+        points = _apply(matrix, points)
+        if fill is not None and len(points) >= 3:
+            draw.polygon(points, fill=fill)
+        if stroke is not None and len(points) >= 2:
+            draw.line(points + points[:1] if closed else points, fill=stroke, width=stroke_width, joint="curve")
+    if translucent:
+        image.alpha_composite(layer)
+
+
+def _draw_element(image, element, matrix, style):
+    tag = element.tag.rsplit("}", 1)[-1]
+    if tag in ("defs", "title", "desc", "metadata", "style", "clipPath", "mask", "symbol", "text"):
+        return
+    if element.get("display") == "none" or element.get("visibility") == "hidden":
+        return
+    matrix = _multiply(matrix, _parse_transform(element.get("transform")))
+    style = _style(element, style)
+    if tag in ("g", "a", "svg"):
+        for child in element:
+            _draw_element(image, child, matrix, style)
+        return
+    subpaths = _shape_subpaths(element, tag)
+    if subpaths:
+        _draw_shape(image, subpaths, matrix, style)
+
+
+def _draw_svg(svg_code, size):
+    """Pillow 로 SVG 기본 도형만 그리기"""
+    canvas = size * SUPERSAMPLE
+    image = Image.new("RGBA", (canvas, canvas), (255, 255, 255, 255))
+    try:
+        root = ET.fromstring(svg_code)
+    except ET.ParseError:
+        return image.resize((size, size), Image.LANCZOS)
+    view_box = _numbers(root.get("viewBox"))
+    if len(view_box) == 4 and view_box[2] > 0 and view_box[3] > 0:
+        min_x, min_y, width, height = view_box
+    else:
+        min_x, min_y = 0.0, 0.0
+        width, height = _length(root.get("width"), 400.0), _length(root.get("height"), 400.0)
+    # preserveAspectRatio 기본값(xMidYMid meet) 처럼 가운데 맞춤
+    scale = canvas / max(width, height)
+    matrix = (scale, 0.0, 0.0, scale, (canvas - width * scale) / 2 - min_x * scale, (canvas - height * scale) / 2 - min_y * scale)
+    for child in root:
+        _draw_element(image, child, matrix, {"opacity": 1.0})
+    return image.resize((size, size), Image.LANCZOS)
+
+
+# ---------------------------------------------------------------------------
+# 썸네일
+# ---------------------------------------------------------------------------
+
+def rasterize_svg(svg_code, size=CUT_SIZE):
+    """SVG 하나를 size x size RGBA 이미지로"""
+    cairosvg = _load_cairosvg()
+    if cairosvg is not None:
+        try:
+            png = cairosvg.svg2png(bytestring=svg_code.encode("utf-8"), output_width=size, output_height=size)
+            return Image.open(io.BytesIO(png)).convert("RGBA")
+        except Exception:
+            # cairosvg 가 못 읽는 SVG 는 간이 렌더러로
+            pass
+    return _draw_svg(svg_code, size)
+
+
+def render_thumbnail(parts, cut_size=CUT_SIZE):
+    """앞의 네 컷을 2x2 로 붙인 썸네일 이미지 바이트 (캐시 없이 매번 그림)"""
+    image = Image.new("RGB", (cut_size * GRID, cut_size * GRID), (255, 255, 255))
+    for index, part in enumerate(parts[:GRID * GRID]):
+        if not part.get("svg_code"):
+            continue
+        cut = rasterize_svg(part["svg_code"], cut_size)
+        image.paste(cut, ((index % GRID) * cut_size, (index // GRID) * cut_size), cut)
+    # 컷 사이 구분선
+    draw = ImageDraw.Draw(image)
+    for line in range(1, GRID):
+        draw.line([(line * cut_size, 0), (line * cut_size, GRID * cut_size)], fill=(200, 200, 200), width=2)
+        draw.line([(0, line * cut_size), (GRID * cut_size, line * cut_size)], fill=(200, 200, 200), width=2)
+    buffer = io.BytesIO()
+    if _FORMAT == "JPEG":
+        image.save(buffer, format="JPEG", quality=85, optimize=True)
+    else:
+        image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def _write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def ensure_thumbnail(parts):
+    """parts 의 썸네일 바이트 (캐시에 없으면 만들어서 저장)"""
+    key = thumbnail_key([storage.svg_digest(part["svg_code"]) if part.get("svg_code") else "" for part in parts])
+    path = _thumbnail_path(key)
+    try:
+        return path.read_bytes()
+    except FileNotFoundError:
+        pass
+    data = render_thumbnail(parts)
+    try:
+        _write(path, data)
+    except OSError:
+        # 캐시에 못 써도 이번 화면에는 보여줌
+        pass
+    return data
+
+
+def get_thumbnail(handle):
+    """목록 핸들(StoryHandle)의 썸네일 바이트 (콘티를 읽을 수 없으면 None)
+
+    카탈로그에 있는 컷 SVG 해시로 캐시를 먼저 찾고, 없을 때만 본문을 읽어서 만든다.
+    """
+    if handle.svgs:
+        try:
+            return _thumbnail_path(thumbnail_key(handle.svgs)).read_bytes()
+        except FileNotFoundError:
+            pass
+    story = handle.load()
+    if story is None:
+        return None
+    return ensure_thumbnail(story.get("parts") or [])